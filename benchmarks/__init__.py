@@ -0,0 +1 @@
+"""性能基准测试,在仓库根目录下以 python -m benchmarks.<模块名> 运行"""
@@ -0,0 +1,158 @@
+# benchmarks/bench_load_balancing.py
+"""
+多服务负载均衡基准测试: 请求分布、服务故障移出与恢复后重新加入
+
+任一检查失败时以状态码1退出:
+    - balanced: 没有失败的请求,每个服务处理的请求数与平均值相差不超过--spread-tolerance
+    - one_down: 停止的服务被标记为不健康,故障被发现前最多有--concurrency个请求分配给它或失败
+    - recovered: 重新启动的服务恢复健康并重新分到请求,没有失败的请求
+    - mixed_models: 两个服务安装的模型不同,只有一个服务安装了所用模型。没有失败的请求,
+      模型不存在的404最多有--concurrency个(发现前的请求换到另一个服务重新发送);
+      get_models列出两个服务的全部模型,api/show只发送到列出了该模型的服务
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+
+from benchmarks.fake_ollama import FakeOllamaConfig, FakeOllamaServer
+from ollama_vision.client import OllamaVisionClient
+from ollama_vision.exceptions import APIError
+from ollama_vision.metrics import MetricsRegistry
+
+
+def run_requests(client: OllamaVisionClient, count: int, concurrency: int) -> dict:
+    """并发发送count个对话请求,返回耗时与失败数"""
+    def one(_):
+        try:
+            client.chat("Describe the image.").collect()
+            return True
+        except APIError:
+            return False
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(one, range(count)))
+    elapsed = time.perf_counter() - started
+    return {"requests": count, "failed": results.count(False), "elapsed_s": elapsed, "throughput": count / elapsed}
+
+
+def distribution(client: OllamaVisionClient, before: dict) -> dict:
+    """各服务在本阶段处理的请求数和当前健康状态"""
+    return {
+        stats.url: {"requests": stats.requests - before.get(stats.url, 0), "healthy": stats.healthy}
+        for stats in client.endpoint_stats
+    }
+
+
+def snapshot(client: OllamaVisionClient) -> dict:
+    return {stats.url: stats.requests for stats in client.endpoint_stats}
+
+
+def check(results: dict, servers: int, concurrency: int, spread_tolerance: float) -> dict:
+    """按模块说明中的条件检查各阶段的结果,返回每项检查是否通过"""
+    balanced = [d["requests"] for d in results["balanced"]["distribution"].values()]
+    fair_share = sum(balanced) / servers
+    one_down = list(results["one_down"]["distribution"].values())
+    recovered = list(results["recovered"]["distribution"].values())
+    return {
+        "balanced_no_failures": results["balanced"]["failed"] == 0,
+        "balanced_spread": all(abs(n - fair_share) <= fair_share * spread_tolerance for n in balanced),
+        "down_marked_unhealthy": not one_down[-1]["healthy"],
+        "down_removed": one_down[-1]["requests"] + results["one_down"]["failed"] <= concurrency,
+        "recovered_healthy": recovered[-1]["healthy"],
+        "recovered_rejoined": recovered[-1]["requests"] > 0,
+        "recovered_no_failures": results["recovered"]["failed"] == 0,
+        "mixed_no_failures": results["mixed_models"]["failed"] == 0,
+        "mixed_not_found_bounded": results["mixed_models"]["chat_not_found"] <= concurrency,
+        "mixed_models_listed": results["mixed_models"]["models_listed"] == 2,
+        "mixed_show_routed": results["mixed_models"]["show_not_found"] == 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--servers", type=int, default=3)
+    parser.add_argument("--requests", type=int, default=60, help="每个阶段的请求数")
+    parser.add_argument("--concurrency", type=int, default=6)
+    parser.add_argument("--tokens", type=int, default=32)
+    parser.add_argument("--token-rate", type=float, default=400.0)
+    parser.add_argument("--health-interval", type=float, default=0.5)
+    parser.add_argument("--spread-tolerance", type=float, default=0.5, help="各服务请求数与平均值的最大相对偏差")
+    args = parser.parse_args()
+
+    config = FakeOllamaConfig(tokens=args.tokens, token_rate=args.token_rate)
+    servers = [FakeOllamaServer(config) for _ in range(args.servers)]
+    for server in servers:
+        server.start()
+    results = {}
+    try:
+        with OllamaVisionClient(
+                base_url=[server.url for server in servers], model=servers[0].model_names[0],
+                model_cache_path=None, metrics_registry=MetricsRegistry(),
+                health_check_interval=args.health_interval
+        ) as client:
+            # 1. 所有服务正常时的分布
+            before = snapshot(client)
+            results["balanced"] = run_requests(client, args.requests, args.concurrency)
+            results["balanced"]["distribution"] = distribution(client, before)
+
+            # 2. 停止最后一个服务,只有前几个请求失败,之后不再分配给它
+            failed = servers[-1]
+            failed.stop()
+            before = snapshot(client)
+            results["one_down"] = run_requests(client, args.requests, args.concurrency)
+            results["one_down"]["distribution"] = distribution(client, before)
+
+            # 3. 在同一端口重新启动,健康检查通过后重新加入
+            host, port = failed.url.rsplit(":", 1)
+            servers[-1] = FakeOllamaServer(config, host=host[len("http://"):], port=int(port))
+            servers[-1].start()
+            deadline = time.perf_counter() + args.health_interval * 10
+            while not client.endpoint_stats[-1].healthy and time.perf_counter() < deadline:
+                time.sleep(args.health_interval / 10)
+            before = snapshot(client)
+            results["recovered"] = run_requests(client, args.requests, args.concurrency)
+            results["recovered"]["distribution"] = distribution(client, before)
+
+            results["endpoint_stats"] = [asdict(stats) for stats in client.endpoint_stats]
+    finally:
+        for server in servers:
+            server.stop()
+
+    # 4. 第一个服务只安装了llava-bench-0,第二个服务还安装了llava-bench-1,请求使用llava-bench-1
+    servers = [
+        FakeOllamaServer(FakeOllamaConfig(models=1, tokens=args.tokens, token_rate=args.token_rate)),
+        FakeOllamaServer(FakeOllamaConfig(models=2, tokens=args.tokens, token_rate=args.token_rate)),
+    ]
+    for server in servers:
+        server.start()
+    try:
+        with OllamaVisionClient(
+                base_url=[server.url for server in servers], model=servers[1].model_names[1],
+                model_cache_path=None, metrics_registry=MetricsRegistry(),
+                health_check_interval=args.health_interval
+        ) as client:
+            # 还没有获取模型列表,发送到第一个服务的请求返回404后换到第二个服务
+            results["mixed_models"] = run_requests(client, args.requests, args.concurrency)
+            results["mixed_models"]["chat_not_found"] = servers[0].requests["not_found"]
+            models = client.get_models(force_refresh=True)
+            results["mixed_models"]["models_listed"] = len(models)
+            results["mixed_models"]["show_not_found"] = (
+                servers[0].requests["not_found"] - results["mixed_models"]["chat_not_found"]
+            )
+            results["mixed_models"]["endpoint_stats"] = [asdict(stats) for stats in client.endpoint_stats]
+    finally:
+        for server in servers:
+            server.stop()
+    results["checks"] = check(results, args.servers, args.concurrency, args.spread_tolerance)
+    results["passed"] = all(results["checks"].values())
+    print(json.dumps(results, indent=2))
+    sys.exit(0 if results["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# benchmarks/bench_metrics.py
+"""指标记录开销基准测试"""
+
+import argparse
+import json
+import statistics
+import time
+
+from benchmarks.fake_ollama import FakeOllamaConfig, FakeOllamaServer
+from ollama_vision.client import OllamaVisionClient
+from ollama_vision.metrics import ClientMetrics, MetricsRegistry
+
+
+def per_op_ns(func, iterations: int, repeat: int) -> float:
+    """返回最佳一次的单次调用耗时(纳秒)"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        best = min(best, time.perf_counter() - started)
+    return best / iterations * 1e9
+
+
+def bench_recording(iterations: int, repeat: int) -> dict:
+    """单个指标操作以及一次对话请求全部记录操作的耗时"""
+    metrics = ClientMetrics(MetricsRegistry())
+    model, endpoint = "llama3.2-vision:latest", "api/chat"
+    final = {"eval_count": 256, "prompt_eval_count": 1500}
+
+    def record_chat_request():
+        # 与一次带图片的流式对话记录的指标相同
+        metrics.requests.inc(model, endpoint)
+        metrics.payload_bytes.observe(1_500_000, model, endpoint)
+        metrics.encode_time.observe(0.004, model)
+        metrics.time_to_first_token.observe(0.35, model, endpoint)
+        metrics.latency.observe(4.2, model, endpoint)
+        metrics.record_chat(model, final)
+
+    return {
+        "counter_inc_ns": per_op_ns(lambda: metrics.requests.inc(model, endpoint), iterations, repeat),
+        "histogram_observe_ns": per_op_ns(lambda: metrics.latency.observe(0.42, model, endpoint), iterations, repeat),
+        "chat_request_ns": per_op_ns(record_chat_request, iterations, repeat),
+        "render_prometheus_us": per_op_ns(metrics.registry.render_prometheus, 200, repeat) / 1000,
+    }
+
+
+def bench_end_to_end(runs: int, tokens: int) -> dict:
+    """对模拟服务发送对话请求时,开启与关闭指标的单次请求耗时"""
+    results = {}
+    with FakeOllamaServer(FakeOllamaConfig(tokens=tokens)) as server:
+        for label, enabled in (("disabled", False), ("enabled", True)):
+            with OllamaVisionClient(
+                    base_url=server.url, model=server.model_names[0], model_cache_path=None,
+                    collect_metrics=enabled, metrics_registry=MetricsRegistry()
+            ) as client:
+                client.chat("warmup").collect()
+                timings = []
+                for _ in range(runs):
+                    started = time.perf_counter()
+                    client.chat("Describe the image.").collect()
+                    timings.append(time.perf_counter() - started)
+            results[f"{label}_median_ms"] = statistics.median(timings) * 1000
+    results["overhead_ms"] = results["enabled_median_ms"] - results["disabled_median_ms"]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=50, help="端到端测试的请求次数")
+    parser.add_argument("--tokens", type=int, default=64)
+    args = parser.parse_args()
+
+    results = {
+        "recording": bench_recording(args.iterations, args.repeat),
+        "end_to_end": bench_end_to_end(args.runs, args.tokens),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
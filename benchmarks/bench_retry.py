@@ -0,0 +1,97 @@
+# benchmarks/bench_retry.py
+"""
+重试与熔断基准测试: 暂时性错误的恢复、服务停止后的快速失败与恢复
+
+任一检查失败时以状态码1退出:
+    - transient: 服务返回预设次数的503后,请求经过重试成功
+    - server_down: 服务停止期间所有请求失败并触发熔断,熔断后的请求在--fast-fail-ms内直接失败
+    - recovered: 服务恢复、熔断时间过后的请求全部成功
+"""
+
+import argparse
+import json
+import sys
+import time
+from dataclasses import asdict
+
+from benchmarks.fake_ollama import FakeOllamaConfig, FakeOllamaServer
+from ollama_vision.client import OllamaVisionClient
+from ollama_vision.config import ENDPOINT_RESET_TIMEOUT
+from ollama_vision.exceptions import APIError, CircuitOpenError
+from ollama_vision.metrics import MetricsRegistry
+from ollama_vision.retry import RetryPolicy
+
+
+def timed_chat(client: OllamaVisionClient) -> dict:
+    """发送一次对话,返回耗时和结果"""
+    started = time.perf_counter()
+    try:
+        client.chat("Describe the image.").collect()
+        outcome = "ok"
+    except CircuitOpenError:
+        outcome = "circuit_open"
+    except APIError as e:
+        outcome = f"error {e.status_code or 'network'}"
+    return {"outcome": outcome, "elapsed_ms": (time.perf_counter() - started) * 1000}
+
+
+def check(results: dict, transient_failures: int, fast_fail_ms: float) -> dict:
+    """按模块说明中的条件检查各阶段的结果,返回每项检查是否通过"""
+    down = results["server_down"]
+    rejected = [r for r in down if r["outcome"] == "circuit_open"]
+    return {
+        "transient_recovered": results["transient"]["outcome"] == "ok"
+        and results["transient"]["server_failures"] == transient_failures,
+        "down_all_failed": all(r["outcome"] != "ok" for r in down),
+        "down_circuit_opened": bool(rejected),
+        "down_fails_fast": all(r["elapsed_ms"] <= fast_fail_ms for r in rejected[1:]),
+        "recovered_all_ok": all(r["outcome"] == "ok" for r in results["recovered"]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--transient-failures", type=int, default=2, help="模拟服务连续返回503的次数")
+    parser.add_argument("--down-requests", type=int, default=6, help="服务停止期间发送的请求数")
+    parser.add_argument("--backoff-base", type=float, default=0.1)
+    parser.add_argument("--fast-fail-ms", type=float, default=50.0, help="熔断后请求直接失败的最长耗时")
+    args = parser.parse_args()
+
+    config = FakeOllamaConfig(tokens=16)
+    server = FakeOllamaServer(config)
+    server.start()
+    policy = RetryPolicy(backoff_base=args.backoff_base)
+    results = {}
+    try:
+        with OllamaVisionClient(
+                base_url=server.url, model=server.model_names[0], model_cache_path=None,
+                metrics_registry=MetricsRegistry(), retry_policy=policy
+        ) as client:
+            # 1. 模型加载期间的暂时性503,重试后成功
+            config.fail_chats = args.transient_failures
+            results["transient"] = timed_chat(client)
+            results["transient"]["server_failures"] = server.requests["failed"]
+
+            # 2. 服务停止: 前几个请求重试后失败并触发熔断,之后的请求不发送直接失败
+            host, port = server.url[len("http://"):].rsplit(":", 1)
+            server.stop()
+            results["server_down"] = [timed_chat(client) for _ in range(args.down_requests)]
+
+            # 3. 服务恢复,熔断时间过后的第一个请求作为试探,成功后恢复正常
+            server = FakeOllamaServer(config, host=host, port=int(port))
+            server.start()
+            time.sleep(ENDPOINT_RESET_TIMEOUT)
+            results["recovered"] = [timed_chat(client) for _ in range(3)]
+
+            results["retry_stats"] = asdict(client.retry_stats)
+            results["endpoint_stats"] = [asdict(stats) for stats in client.endpoint_stats]
+    finally:
+        server.stop()
+    results["checks"] = check(results, args.transient_failures, args.fast_fail_ms)
+    results["passed"] = all(results["checks"].values())
+    print(json.dumps(results, indent=2))
+    sys.exit(0 if results["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# benchmarks/bench_startup.py
+"""
+主窗口启动到首次绘制的耗时基准测试(无界面运行,需要PyQt6)
+
+模拟服务的api/show有延迟时,比较三种启动方式:
+- blocking: 旧实现,在GUI线程中调用get_models,模型列表获取完成后窗口才能显示
+- background_cold: MainWindow,没有磁盘缓存,先显示加载状态,模型列表在后台获取
+- background_warm: MainWindow,磁盘缓存中有上一次的模型列表,首次绘制时就已显示;
+  后台刷新完成前用户切换了模型,刷新后检查选中的模型是否保留
+
+每种方式在单独的子进程中运行,测量:
+- first_paint_ms: 从创建窗口到窗口第一次绘制的耗时
+- models_at_first_paint: 首次绘制时下拉框中的模型数量
+- models_ready_ms: 到后台获取的模型列表显示完成的耗时
+
+任一检查失败时以状态码1退出:
+    - 后台加载的首次绘制不等待模型列表,早于api/show的延迟和blocking方式
+    - background_warm首次绘制时已经显示全部缓存的模型,刷新后加入新安装的模型并保留选中的模型
+    - background_cold刷新完成后显示全部模型
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+MODES = ("blocking", "background_cold", "background_warm")
+
+
+def wait_until(app, predicate, timeout: float = 60.0):
+    started = time.perf_counter()
+    while not predicate() and time.perf_counter() - started < timeout:
+        app.processEvents()
+        time.sleep(0.0005)
+
+
+def run_mode(mode: str, models: int, show_latency: float) -> dict:
+    """在当前进程中测量一种启动方式"""
+    from PyQt6.QtCore import QEvent, QObject
+    from PyQt6.QtWidgets import QApplication
+    from benchmarks.fake_ollama import FakeOllamaConfig, FakeOllamaServer
+    from ollama_vision.client import OllamaVisionClient
+    from ollama_vision.gui.main_window import MainWindow
+    from ollama_vision.gui.tasks import get_task_scheduler
+
+    class BlockingMainWindow(MainWindow):
+        """旧实现: 构造时在GUI线程中同步获取模型列表"""
+
+        def load_models(self, force_refresh: bool = False):
+            self.show_models(self.client.get_models(force_refresh))
+
+    class PaintWatcher(QObject):
+        def __init__(self):
+            super().__init__()
+            self.painted_at = None
+
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Type.Paint and self.painted_at is None:
+                self.painted_at = time.perf_counter()
+            return False
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    config = FakeOllamaConfig(models=models)
+    with tempfile.TemporaryDirectory() as directory, FakeOllamaServer(config) as server:
+        cache_path = os.path.join(directory, "models.json")
+        if mode == "background_warm":
+            # 上一次运行留下的磁盘缓存
+            with OllamaVisionClient(base_url=server.url, model_cache_path=cache_path) as client:
+                client.get_models()
+        config.show_latency = show_latency
+
+        client = OllamaVisionClient(base_url=server.url, model=server.model_names[0], model_cache_path=cache_path)
+        # 上次运行后新安装了一个模型,后台刷新需要为它调用api/show
+        if mode == "background_warm":
+            config.models = models + 1
+        watcher = PaintWatcher()
+        started = time.perf_counter()
+        window = (BlockingMainWindow if mode == "blocking" else MainWindow)(client)
+        window.installEventFilter(watcher)
+        window.show()
+        wait_until(app, lambda: watcher.painted_at is not None)
+        models_at_first_paint = sum(1 for i in range(window.model_combo.count()) if window.model_combo.itemData(i))
+
+        if mode == "background_warm":
+            # 刷新完成前切换到另一个模型
+            window.model_combo.setCurrentIndex(1)
+        chosen = window.model_combo.currentData()
+        wait_until(app, lambda: window.refresh_btn.isEnabled())
+        ready = time.perf_counter()
+        result = {
+            "first_paint_ms": round((watcher.painted_at - started) * 1000, 1),
+            "models_at_first_paint": models_at_first_paint,
+            "models_ready_ms": round((ready - started) * 1000, 1),
+            "models_after_refresh": window.model_combo.count(),
+            "selection_preserved": window.model_combo.currentData() == chosen if mode == "background_warm" else None,
+        }
+        window.close()
+        get_task_scheduler().wait_for_done()
+        client.close()
+        return result
+
+
+def check(results: dict, models: int, show_latency: float) -> dict:
+    """按模块说明中的条件检查各方式的结果,返回每项检查是否通过"""
+    blocking, cold, warm = results["blocking"], results["background_cold"], results["background_warm"]
+    return {
+        "background_paints_before_models": all(
+            r["first_paint_ms"] < min(show_latency * 1000, blocking["first_paint_ms"]) for r in (cold, warm)
+        ),
+        "warm_models_at_first_paint": warm["models_at_first_paint"] == models,
+        "warm_refresh_adds_model": warm["models_after_refresh"] == models + 1,
+        "warm_selection_preserved": warm["selection_preserved"] is True,
+        "cold_models_after_refresh": cold["models_after_refresh"] == models,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="主窗口启动到首次绘制的耗时基准测试")
+    parser.add_argument("--models", type=int, default=8)
+    parser.add_argument("--show-latency", type=float, default=0.3, help="api/show的响应延迟(秒)")
+    parser.add_argument("--run", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if importlib.util.find_spec("PyQt6") is None:
+        print(json.dumps({"skipped": "PyQt6 not installed"}))
+        return
+
+    if args.run:
+        print(json.dumps(run_mode(args.run, args.models, args.show_latency)))
+        return
+
+    results = {"models": args.models, "show_latency_s": args.show_latency}
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_startup", "--run", mode, "--models", str(args.models),
+             "--show-latency", str(args.show_latency)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+    results["checks"] = check(results, args.models, args.show_latency)
+    results["passed"] = all(results["checks"].values())
+    print(json.dumps(results, indent=2))
+    sys.exit(0 if results["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# benchmarks/bench_stream_decoder.py
+"""api/chat流解码器的逐token开销基准测试"""
+
+import argparse
+import io
+import json
+import time
+
+import requests
+
+from ollama_vision.client import extract_assistant_content
+from ollama_vision.stream_decoder import JSON_BACKEND, iter_chat_stream
+
+
+def make_stream(tokens: int) -> bytes:
+    """生成与Ollama格式一致(紧凑JSON)的NDJSON响应体"""
+    lines = []
+    for i in range(tokens):
+        lines.append(json.dumps({
+            "model": "llama3.2-vision:latest",
+            "created_at": "2024-11-01T08:00:00.000000Z",
+            "message": {"role": "assistant", "content": f" tok{i % 97}"},
+            "done": False
+        }, separators=(",", ":")))
+    lines.append(json.dumps({
+        "model": "llama3.2-vision:latest",
+        "created_at": "2024-11-01T08:00:01.000000Z",
+        "message": {"role": "assistant", "content": ""},
+        "done": True,
+        "total_duration": 1, "load_duration": 1, "prompt_eval_count": 1,
+        "prompt_eval_duration": 1, "eval_count": tokens, "eval_duration": 1
+    }, separators=(",", ":")))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def make_response(body: bytes) -> requests.Response:
+    """构造一个从内存读取的流式响应"""
+    response = requests.Response()
+    response.raw = io.BytesIO(body)
+    response.status_code = 200
+    return response
+
+
+def run_baseline(body: bytes) -> int:
+    """原先的实现: iter_lines默认缓冲区 + 逐行json.loads"""
+    count = 0
+    for line in make_response(body).iter_lines():
+        if line:
+            try:
+                content = extract_assistant_content(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+            if content:
+                count += 1
+    return count
+
+
+def run_decoder(body: bytes, coalesce_chars: int = 0) -> int:
+    count = 0
+    for chunk in iter_chat_stream(make_response(body), coalesce_chars=coalesce_chars):
+        if chunk.content:
+            count += 1
+    return count
+
+
+def measure(func, body: bytes, tokens: int, repeat: int) -> float:
+    """返回最佳一次的逐token耗时(纳秒)"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(body)
+        best = min(best, time.perf_counter() - start)
+    return best / tokens * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tokens", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    body = make_stream(args.tokens)
+    results = {
+        "json_backend": JSON_BACKEND,
+        "tokens": args.tokens,
+        "baseline_ns_per_token": measure(run_baseline, body, args.tokens, args.repeat),
+        "decoder_ns_per_token": measure(run_decoder, body, args.tokens, args.repeat),
+        "decoder_coalesced_ns_per_token": measure(
+            lambda b: run_decoder(b, coalesce_chars=64), body, args.tokens, args.repeat
+        ),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# benchmarks/bench_task_scheduler.py
+"""
+界面任务调度器基准测试(无界面运行,需要PyQt6)
+
+- overhead: 执行大量短任务时,每个任务一个QThread与共用TaskScheduler的单任务开销
+- priority: 线程全部占用时,后提交的高优先级任务是否先于排队的低优先级任务执行
+- cancellation: 排队中被取消的任务是否被跳过
+- stats: 调度统计以及按任务名称记录的排队、执行时间
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+
+from ollama_vision.metrics import MetricsRegistry
+
+try:
+    from ollama_vision.gui.tasks import CallableTask, TaskPriority, TaskScheduler
+except ImportError:
+    CallableTask = None
+
+
+def wait_until(app, predicate, timeout: float = 60.0):
+    started = time.perf_counter()
+    while not predicate() and time.perf_counter() - started < timeout:
+        app.processEvents()
+        time.sleep(0.0002)
+
+
+def bench_overhead(app, scheduler, count: int) -> dict:
+    """
+    count个空任务,分别用QThread和调度器执行
+
+    start_us是GUI线程创建并启动每个任务的耗时,total_us是到GUI线程收到全部完成信号为止的平均耗时。
+    """
+    from PyQt6.QtCore import QThread
+
+    class NoopThread(QThread):
+        def run(self):
+            pass
+
+    done = []
+    threads = []
+    started = time.perf_counter()
+    for _ in range(count):
+        thread = NoopThread()
+        thread.finished.connect(lambda: done.append(1))
+        thread.start()
+        threads.append(thread)
+    thread_start = (time.perf_counter() - started) / count
+    wait_until(app, lambda: len(done) == count)
+    for thread in threads:
+        thread.wait()
+        thread.deleteLater()
+    per_thread = (time.perf_counter() - started) / count
+
+    done.clear()
+    started = time.perf_counter()
+    for _ in range(count):
+        task = CallableTask(lambda: None, name="noop")
+        task.done.connect(lambda: done.append(1))
+        scheduler.submit(task)
+    task_start = (time.perf_counter() - started) / count
+    wait_until(app, lambda: len(done) == count)
+    per_task = (time.perf_counter() - started) / count
+    return {
+        "tasks": count,
+        "qthread": {"start_us": round(thread_start * 1e6, 1), "total_us": round(per_thread * 1e6, 1)},
+        "scheduler": {"start_us": round(task_start * 1e6, 1), "total_us": round(per_task * 1e6, 1)},
+    }
+
+
+def bench_priority(app, scheduler) -> dict:
+    """占满所有线程后提交20个低优先级任务和1个高优先级任务,记录执行顺序"""
+    release = threading.Event()
+    order = []
+    blockers = [scheduler.submit(CallableTask(release.wait, name="blocker")) for _ in range(scheduler.max_workers)]
+    wait_until(app, lambda: scheduler.stats().running == scheduler.max_workers, 5)
+    tasks = [scheduler.submit(CallableTask(order.append, "low", name="low", priority=TaskPriority.LOW))
+             for _ in range(20)]
+    tasks.append(scheduler.submit(CallableTask(order.append, "high", name="high", priority=TaskPriority.HIGH)))
+    release.set()
+    wait_until(app, lambda: all(task.wait(0) for task in tasks + blockers))
+    return {"high_priority_position": order.index("high"), "tasks": len(order)}
+
+
+def bench_cancellation(app, scheduler) -> dict:
+    """排队中的任务被取消后不执行"""
+    release = threading.Event()
+    ran = []
+    blockers = [scheduler.submit(CallableTask(release.wait, name="blocker")) for _ in range(scheduler.max_workers)]
+    wait_until(app, lambda: scheduler.stats().running == scheduler.max_workers, 5)
+    before = scheduler.stats().cancelled
+    queued = [scheduler.submit(CallableTask(ran.append, 1, name="queued")) for _ in range(50)]
+    for task in queued:
+        task.cancel()
+    release.set()
+    wait_until(app, lambda: all(task.wait(0) for task in queued + blockers))
+    return {"queued": len(queued), "ran": len(ran), "counted_cancelled": scheduler.stats().cancelled - before}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="界面任务调度器基准测试")
+    parser.add_argument("--tasks", type=int, default=500)
+    args = parser.parse_args()
+
+    if CallableTask is None:
+        print(json.dumps({"skipped": "PyQt6 not installed"}))
+        return
+
+    from PyQt6.QtCore import QCoreApplication
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+    registry = MetricsRegistry()
+    scheduler = TaskScheduler(metrics_registry=registry)
+
+    results = {
+        "max_workers": scheduler.max_workers,
+        "overhead": bench_overhead(app, scheduler, args.tasks),
+        "priority": bench_priority(app, scheduler),
+        "cancellation": bench_cancellation(app, scheduler),
+        "stats": scheduler.stats().__dict__,
+    }
+    wait_time = registry.get("ollama_vision_gui_task_wait_seconds")
+    run_time = registry.get("ollama_vision_gui_task_run_seconds")
+    results["latency_ms"] = {
+        name: {
+            "count": wait_time.count(name),
+            "mean_wait": round(wait_time.sum(name) / wait_time.count(name) * 1000, 3),
+            "mean_run": round(run_time.sum(name) / run_time.count(name) * 1000, 3),
+        }
+        for name in ("noop", "blocker", "low", "high", "queued")
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
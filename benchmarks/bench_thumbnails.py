@@ -0,0 +1,150 @@
+# benchmarks/bench_thumbnails.py
+"""
+大图缩略图的解码开销基准测试(无界面运行,需要PyQt6)
+
+比较两种生成缩略图的方式:
+- full_decode: 旧实现,在GUI线程中QPixmap(path)解码原图后再缩放
+- thumbnail_cache: ThumbnailCache,在线程池中按缩略图尺寸解码
+
+每种方式在单独的子进程中运行,测量:
+- gui_blocked_ms: 期间GUI事件循环最长一次没有响应的时间
+- ready_ms: 从请求到缩略图可以显示的时间
+- peak_rss_mb: 进程峰值内存相对开始时的增量
+- repeat_us: 同一张图片再次请求的耗时(缓存命中)
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+MODES = ("full_decode", "thumbnail_cache")
+
+
+def peak_rss_mb() -> float:
+    """进程的峰值常驻内存(MB)
+
+    优先读取/proc中的VmHWM: ru_maxrss在exec后保留父进程的峰值,子进程测得的增量会偏小。
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_image(path: str, megapixels: float):
+    """生成一张带渐变的JPEG,尺寸比例4:3"""
+    from PyQt6.QtGui import QColor, QImage, QLinearGradient, QPainter
+
+    height = int((megapixels * 1e6 * 3 / 4) ** 0.5)
+    width = height * 4 // 3
+    image = QImage(width, height, QImage.Format.Format_RGB32)
+    painter = QPainter(image)
+    gradient = QLinearGradient(0, 0, width, height)
+    gradient.setColorAt(0, QColor("#2563EB"))
+    gradient.setColorAt(1, QColor("#F59E0B"))
+    painter.fillRect(image.rect(), gradient)
+    painter.end()
+    image.save(path, "JPEG", 90)
+
+
+def run_mode(mode: str, path: str, size: int) -> dict:
+    """在当前进程中测量一种方式"""
+    from PyQt6.QtCore import QTimer, Qt
+    from PyQt6.QtGui import QPixmap
+    from PyQt6.QtWidgets import QApplication
+    from ollama_vision.gui.thumbnails import ThumbnailCache
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    cache = ThumbnailCache()
+
+    # 每毫秒记录一次事件循环的心跳,最大间隔即GUI被阻塞的时间
+    beats = [time.perf_counter()]
+    heartbeat = QTimer()
+    heartbeat.setInterval(1)
+    heartbeat.timeout.connect(lambda: beats.append(time.perf_counter()))
+    heartbeat.start()
+    for _ in range(20):
+        app.processEvents()
+        time.sleep(0.001)
+
+    baseline = peak_rss_mb()
+    ready = []
+
+    def full_decode():
+        QPixmap(path).scaled(size, size, Qt.AspectRatioMode.KeepAspectRatio,
+                             Qt.TransformationMode.SmoothTransformation)
+        ready.append(time.perf_counter())
+
+    cache.thumbnail_ready.connect(lambda *_: ready.append(time.perf_counter()))
+    requested = time.perf_counter()
+    beats.append(requested)
+    QTimer.singleShot(0, full_decode if mode == "full_decode" else lambda: cache.get(path, size))
+    while not ready and time.perf_counter() - requested < 60:
+        app.processEvents()
+        time.sleep(0.0005)
+    for _ in range(20):
+        app.processEvents()
+        time.sleep(0.001)
+    heartbeat.stop()
+
+    gaps = [b - a for a, b in zip(beats, beats[1:]) if a >= requested]
+    started = time.perf_counter()
+    if mode == "full_decode":
+        QPixmap(path).scaled(size, size, Qt.AspectRatioMode.KeepAspectRatio)
+    else:
+        assert cache.get(path, size) is not None
+    repeat = time.perf_counter() - started
+    return {
+        "gui_blocked_ms": round(max(gaps) * 1000, 2) if gaps else None,
+        "ready_ms": round((ready[0] - requested) * 1000, 2) if ready else None,
+        "peak_rss_mb": round(peak_rss_mb() - baseline, 1),
+        "repeat_us": round(repeat * 1e6, 1),
+        "cache": cache.stats().__dict__ if mode == "thumbnail_cache" else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="大图缩略图的解码开销基准测试")
+    parser.add_argument("--megapixels", type=float, default=40.0)
+    parser.add_argument("--size", type=int, default=100, help="缩略图边长")
+    parser.add_argument("--run", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--image", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if importlib.util.find_spec("PyQt6") is None:
+        print(json.dumps({"skipped": "PyQt6 not installed"}))
+        return
+
+    if args.run:
+        print(json.dumps(run_mode(args.run, args.image, args.size)))
+        return
+
+    results = {"megapixels": args.megapixels}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "scan.jpg")
+        make_image(path, args.megapixels)
+        results["file_mb"] = round(os.path.getsize(path) / 2 ** 20, 1)
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_thumbnails", "--run", mode, "--image", path,
+                 "--size", str(args.size)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            results[mode] = json.loads(output.strip().splitlines()[-1])
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# benchmarks/bench_token_rendering.py
+"""
+流式输出渲染开销基准测试(无界面运行,需要PyQt6)
+
+比较回复区在不同长度下每个token的平均处理耗时(追加文本+排版+重绘):
+- legacy_label: 旧实现,每个token执行QLabel.setText(text() + token)
+- document_per_token: 逐token追加到TranscriptView中的消息,不合并
+- document_batched: 经TokenBatcher每帧合并一次后追加(GUI当前的实现)
+
+每个窗口统计window个token的平均耗时,耗时不随已输出长度增长即为常数开销。
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Callable, Dict, List
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+def make_tokens(count: int) -> List[str]:
+    """模拟OCR输出: 每12个token换一行"""
+    return ["\n" if i % 12 == 11 else " token" for i in range(count)]
+
+
+def run(tokens: List[str], feed: Callable[[str], None], frame: Callable[[], None], tokens_per_frame: int,
+        window: int) -> Dict[str, object]:
+    """逐个输入token,每tokens_per_frame个处理一次事件,返回各窗口的平均耗时(微秒/token)"""
+    windows = []
+    frames = 0
+    started = time.perf_counter()
+    for i, token in enumerate(tokens, 1):
+        feed(token)
+        if i % tokens_per_frame == 0:
+            frame()
+            frames += 1
+        if i % window == 0:
+            now = time.perf_counter()
+            windows.append((now - started) / window * 1e6)
+            started = now
+    return {
+        "tokens": len(tokens),
+        "frames": frames,
+        "us_per_token_by_window": [round(w, 1) for w in windows],
+        "last_to_first_ratio": round(windows[-1] / windows[0], 2) if windows else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流式输出渲染开销基准测试")
+    parser.add_argument("--tokens", type=int, default=20000)
+    parser.add_argument("--legacy-tokens", type=int, default=4000, help="旧实现耗时随长度平方增长,单独限制")
+    parser.add_argument("--window", type=int, default=1000)
+    parser.add_argument("--tokens-per-frame", type=int, default=4, help="每帧到达的token数,200 tok/s约为3-4")
+    args = parser.parse_args()
+
+    try:
+        from functools import partial
+        from PyQt6.QtWidgets import QApplication, QLabel, QScrollArea
+        from ollama_vision.gui.token_batcher import TokenBatcher
+        from ollama_vision.gui.transcript import TranscriptView
+    except ImportError:
+        print(json.dumps({"skipped": "PyQt6 not installed"}))
+        return
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+
+    def host(widget):
+        area = QScrollArea()
+        area.setWidgetResizable(True)
+        area.setWidget(widget)
+        area.resize(800, 600)
+        area.show()
+        app.processEvents()
+        return area
+
+    def transcript():
+        view = TranscriptView()
+        view.resize(800, 600)
+        view.show()
+        message_id = view.transcript.add_message("assistant")
+        app.processEvents()
+        return view, partial(view.transcript.append_text, message_id)
+
+    results = {}
+
+    # 旧实现: QLabel整体替换文本,每个token都会排版和重绘一次
+    label = QLabel()
+    label.setWordWrap(True)
+    area = host(label)
+    results["legacy_label"] = run(
+        make_tokens(args.legacy_tokens), lambda t: label.setText(label.text() + t), app.processEvents, 1, args.window
+    )
+    area.close()
+
+    # 文档追加,不合并
+    view, append = transcript()
+    results["document_per_token"] = run(make_tokens(args.tokens), append, app.processEvents, 1, args.window)
+    view.close()
+
+    # 文档追加,每帧合并一次
+    view, append = transcript()
+    batcher = TokenBatcher()
+    batcher.flushed.connect(append)
+
+    def frame():
+        batcher.flush()
+        app.processEvents()
+
+    results["document_batched"] = run(make_tokens(args.tokens), batcher.append, frame, args.tokens_per_frame,
+                                      args.window)
+    results["document_batched"]["text_intact"] = view.transcript.message(0).text == "".join(make_tokens(args.tokens))
+    view.close()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
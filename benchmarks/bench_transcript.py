@@ -0,0 +1,234 @@
+# benchmarks/bench_transcript.py
+"""
+长对话记录的内存与滚动性能基准测试(无界面运行,需要PyQt6)
+
+比较两种对话记录实现在大量消息下的表现:
+- widgets: 旧实现,每条消息一个QFrame+QLabel,全部放在QScrollArea中
+- transcript: TranscriptView,模型/视图结构,只为可见消息排版和绘制
+
+每个场景在单独的子进程中运行,测量:
+- fill_s: 添加全部消息并完成首次显示的耗时
+- rss_mb: 添加前后的常驻内存增量
+- scroll: 从顶部逐屏滚动到底部时每帧的耗时(毫秒)
+- stream_us_per_token: 在长对话底部流式追加回复时每个token的耗时
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+IMPLEMENTATIONS = ("widgets", "transcript")
+
+
+def rss_mb() -> float:
+    """当前进程的常驻内存(MB),不支持/proc时返回峰值"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_text(i: int) -> str:
+    """模拟一轮对话的内容,助手回复较长"""
+    if i % 2 == 0:
+        return f"第{i // 2}张图片里有什么?"
+    return "\n".join(f"第{line}行识别结果: 发票编号 {i:06d}, 金额 {line * 37.5:.2f} 元" for line in range(1 + i % 12))
+
+
+def make_images(directory: str, count: int) -> List[str]:
+    """生成几张较大的测试图片"""
+    from PyQt6.QtGui import QColor, QImage
+
+    paths = []
+    for i in range(count):
+        image = QImage(1600, 1200, QImage.Format.Format_RGB32)
+        image.fill(QColor.fromHsv(i * 60 % 360, 160, 220))
+        path = os.path.join(directory, f"image_{i}.png")
+        image.save(path)
+        paths.append(path)
+    return paths
+
+
+def frame_stats(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "frames": len(ordered),
+        "median_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+class WidgetsTranscript:
+    """旧实现: 每条消息一个带样式表的QFrame"""
+
+    def __init__(self):
+        from PyQt6.QtCore import Qt
+        from PyQt6.QtGui import QPixmap
+        from PyQt6.QtWidgets import QFrame, QHBoxLayout, QLabel, QScrollArea, QVBoxLayout, QWidget
+
+        self._classes = QFrame, QHBoxLayout, QLabel, QVBoxLayout, QPixmap, Qt
+        self.widget = QScrollArea()
+        self.widget.setWidgetResizable(True)
+        container = QWidget()
+        self.layout = QVBoxLayout(container)
+        self.layout.setAlignment(Qt.AlignmentFlag.AlignTop)
+        self.layout.setSpacing(16)
+        self.widget.setWidget(container)
+        self.labels = {}
+
+    def add_message(self, role: str, text: str = "", images: List[str] = ()) -> int:
+        QFrame, QHBoxLayout, QLabel, QVBoxLayout, QPixmap, Qt = self._classes
+        frame = QFrame()
+        frame.setStyleSheet("QFrame { background: #F7F7F7; border-radius: 8px; border: 1px solid #E0E0E0; }")
+        layout = QVBoxLayout(frame)
+        layout.addWidget(QLabel("👤 用户" if role == "user" else "🤖 助手"))
+        if images:
+            row = QHBoxLayout()
+            for path in images:
+                thumbnail = QLabel()
+                thumbnail.setPixmap(QPixmap(path).scaled(
+                    100, 100, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation
+                ))
+                row.addWidget(thumbnail)
+            layout.addLayout(row)
+        label = QLabel(text)
+        label.setWordWrap(True)
+        label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
+        layout.addWidget(label)
+        self.layout.addWidget(frame)
+        self.labels[len(self.labels)] = label
+        return len(self.labels) - 1
+
+    def append_text(self, message_id: int, text: str):
+        label = self.labels[message_id]
+        label.setText(label.text() + text)
+
+    def scroll_bar(self):
+        return self.widget.verticalScrollBar()
+
+
+class ViewTranscript:
+    """新实现: TranscriptView"""
+
+    def __init__(self):
+        from ollama_vision.gui.transcript import TranscriptView
+
+        self.widget = TranscriptView()
+        self.add_message = self.widget.transcript.add_message
+        self.append_text = self.widget.transcript.append_text
+
+    def scroll_bar(self):
+        return self.widget.verticalScrollBar()
+
+
+def run_scenario(implementation: str, messages: int, image_every: int, stream_tokens: int) -> Dict[str, object]:
+    """在当前进程中运行一个场景"""
+    from PyQt6.QtWidgets import QApplication
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    with tempfile.TemporaryDirectory() as directory:
+        images = make_images(directory, 4)
+        transcript = WidgetsTranscript() if implementation == "widgets" else ViewTranscript()
+        transcript.widget.resize(800, 600)
+        transcript.widget.show()
+        app.processEvents()
+
+        before = rss_mb()
+        started = time.perf_counter()
+        for i in range(messages):
+            role = "user" if i % 2 == 0 else "assistant"
+            attached = images[:1 + i % len(images)] if role == "user" and image_every and i % image_every == 0 else []
+            transcript.add_message(role, make_text(i), attached)
+        app.processEvents()
+        fill = time.perf_counter() - started
+        after_fill = rss_mb()
+
+        # 从顶部逐屏向下滚动,每步重绘一次
+        scroll_bar = transcript.scroll_bar()
+        scroll_bar.setValue(0)
+        app.processEvents()
+        step = max(transcript.widget.viewport().height() // 2, 1)
+        frames = []
+        value = 0
+        while value < scroll_bar.maximum() and len(frames) < 2000:
+            value += step
+            frame_started = time.perf_counter()
+            scroll_bar.setValue(value)
+            transcript.widget.viewport().repaint()
+            app.processEvents()
+            frames.append(time.perf_counter() - frame_started)
+        after_scroll = rss_mb()
+
+        # 在底部流式追加回复,每帧到达4个token
+        message_id = transcript.add_message("assistant")
+        scroll_bar.setValue(scroll_bar.maximum())
+        app.processEvents()
+        started = time.perf_counter()
+        for i in range(stream_tokens):
+            transcript.append_text(message_id, "\n" if i % 12 == 11 else " token")
+            if i % 4 == 3:
+                app.processEvents()
+        app.processEvents()
+        stream = time.perf_counter() - started
+
+        result = {
+            "messages": messages,
+            "fill_s": round(fill, 3),
+            "rss_mb": round(after_fill - before, 1),
+            "rss_after_scroll_mb": round(after_scroll - before, 1),
+            "scroll": frame_stats(frames) if frames else None,
+            "stream_us_per_token": round(stream / max(stream_tokens, 1) * 1e6, 1),
+        }
+        if implementation == "transcript":
+            result["layouts_cached"] = len(transcript.widget.delegate._layouts)
+        transcript.widget.close()
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="长对话记录的内存与滚动性能基准测试")
+    parser.add_argument("--messages", type=int, nargs="+", default=[1000, 5000, 10000])
+    parser.add_argument("--widgets-max", type=int, default=2000, help="旧实现只测试不超过该数量的场景")
+    parser.add_argument("--image-every", type=int, default=10, help="每隔多少条消息附带图片,0表示不带图片")
+    parser.add_argument("--stream-tokens", type=int, default=2000)
+    parser.add_argument("--run", choices=IMPLEMENTATIONS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if importlib.util.find_spec("PyQt6") is None:
+        print(json.dumps({"skipped": "PyQt6 not installed"}))
+        return
+
+    if args.run:
+        print(json.dumps(run_scenario(args.run, args.messages[0], args.image_every, args.stream_tokens)))
+        return
+
+    # 每个场景单独运行一个进程,避免内存测量互相影响
+    results = {}
+    for implementation in IMPLEMENTATIONS:
+        for count in args.messages:
+            if implementation == "widgets" and count > args.widgets_max:
+                continue
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_transcript", "--run", implementation,
+                 "--messages", str(count), "--image-every", str(args.image_every),
+                 "--stream-tokens", str(args.stream_tokens)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            results[f"{implementation}_{count}"] = json.loads(output.strip().splitlines()[-1])
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
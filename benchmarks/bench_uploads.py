@@ -0,0 +1,158 @@
+# benchmarks/bench_uploads.py
+"""
+图片上传(编码)耗时基准测试(无界面运行,需要PyQt6)
+
+一次选择多张图片时,比较:
+- legacy_threads: 旧实现,每张图片一个QThread,先模拟1秒上传进度再编码
+- upload_pool: UploadTask,在界面共用的任务调度器中分块编码并报告实际进度
+- chat_widget: 经ChatWidget.add_uploads添加图片,测量到发送按钮可用的时间
+
+编码缓存在每个场景前清空,测量的是实际读取和编码的耗时。
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+def make_files(directory: str, count: int, size_mb: float) -> List[str]:
+    """生成count个指定大小的.jpg文件(内容为随机字节,编码不解析图片内容)"""
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"scan_{i}.jpg")
+        with open(path, "wb") as f:
+            f.write(os.urandom(int(size_mb * 2 ** 20)))
+        paths.append(path)
+    return paths
+
+
+def wait_until(app, predicate, timeout: float = 120.0):
+    started = time.perf_counter()
+    while not predicate() and time.perf_counter() - started < timeout:
+        app.processEvents()
+        time.sleep(0.0005)
+
+
+def run_legacy(app, paths: List[str]) -> dict:
+    """旧实现: 每张图片一个QThread,固定1秒的模拟进度后编码"""
+    from PyQt6.QtCore import QThread, pyqtSignal
+    from ollama_vision.image_utils import encode_image
+
+    class LegacyUploadThread(QThread):
+        progress = pyqtSignal(int)
+        finished = pyqtSignal(str)
+
+        def __init__(self, image_path):
+            super().__init__()
+            self.image_path = image_path
+
+        def run(self):
+            for i in range(0, 101, 10):
+                self.progress.emit(i)
+                time.sleep(0.1)
+            encoded = encode_image(self.image_path)
+            self.progress.emit(100)
+            self.finished.emit(encoded)
+
+    done = []
+    threads = []
+    started = time.perf_counter()
+    for path in paths:
+        thread = LegacyUploadThread(path)
+        thread.finished.connect(lambda _: done.append(time.perf_counter()))
+        thread.start()
+        threads.append(thread)
+    wait_until(app, lambda: len(done) == len(paths))
+    for thread in threads:
+        thread.wait()
+    return {
+        "all_done_s": round(max(done) - started, 3),
+        "first_done_s": round(min(done) - started, 3),
+        "threads_started": len(threads),
+    }
+
+
+def run_pool(app, paths: List[str]) -> dict:
+    """UploadTask: 界面共用的任务调度器,分块报告实际进度"""
+    from ollama_vision.gui.chat_thread import UploadTask
+    from ollama_vision.gui.tasks import get_task_scheduler
+
+    done = []
+    progress = {path: [] for path in paths}
+    tasks = []
+    started = time.perf_counter()
+    for path in paths:
+        task = UploadTask(path)
+        task.progress.connect(progress[path].append)
+        task.finished.connect(lambda _: done.append(time.perf_counter()))
+        get_task_scheduler().submit(task)
+        tasks.append(task)
+    wait_until(app, lambda: len(done) == len(paths))
+    return {
+        "all_done_s": round(max(done) - started, 3),
+        "first_done_s": round(min(done) - started, 3),
+        "pool_size": get_task_scheduler().max_workers,
+        "progress_updates_per_file": round(sum(len(p) for p in progress.values()) / len(paths), 1),
+        "progress_monotonic_to_100": all(p == sorted(p) and p[-1] == 100 for p in progress.values()),
+    }
+
+
+def run_chat_widget(app, paths: List[str]) -> dict:
+    """经ChatWidget添加图片,记录发送按钮可用的时间"""
+    from benchmarks.fake_ollama import FakeOllamaServer
+    from ollama_vision.client import OllamaVisionClient
+    from ollama_vision.gui.chat_widget import ChatWidget
+
+    with FakeOllamaServer() as server, OllamaVisionClient(
+            base_url=server.url, model=server.model_names[0], model_cache_path=None
+    ) as client:
+        widget = ChatWidget(client)
+        widget.input_box.setPlainText("识别这些图片")
+        started = time.perf_counter()
+        widget.add_uploads(paths)
+        enabled_early = widget.send_btn.isEnabled()
+        wait_until(app, widget.send_btn.isEnabled)
+        enabled = time.perf_counter()
+        result = {
+            "send_enabled_before_encode": enabled_early,
+            "send_enabled_s": round(enabled - started, 3),
+            "all_encoded": all(upload.encoded_image for upload in widget.uploads),
+        }
+        widget.remove_uploads()
+        widget.close()
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="图片上传耗时基准测试")
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--size-mb", type=float, default=4.0)
+    args = parser.parse_args()
+
+    try:
+        from PyQt6.QtWidgets import QApplication
+    except ImportError:
+        print(json.dumps({"skipped": "PyQt6 not installed"}))
+        return
+
+    from ollama_vision.image_utils import get_image_cache
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    results = {"files": args.files, "size_mb": args.size_mb}
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_files(directory, args.files, args.size_mb)
+        for name, scenario in (("legacy_threads", run_legacy), ("upload_pool", run_pool),
+                               ("chat_widget", run_chat_widget)):
+            get_image_cache().clear()
+            results[name] = scenario(app, paths)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# benchmarks/check_import_time.py
+"""
+导入耗时预算检查
+
+每个场景在新的Python进程中重复运行,取耗时的中位数与预算比较,同时检查:
+- 场景结束时没有加载不应加载的重依赖(requests、aiohttp、Pillow、PyQt6等)
+- 导入ollama_vision没有给根日志记录器添加处理器或修改日志级别
+
+任一场景超出预算或检查失败时以状态码1退出,可以直接用在CI中:
+
+    python -m benchmarks.check_import_time
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# 场景名称 -> (执行的代码, 预算毫秒数, 结束时不应加载的模块)
+HEAVY_MODULES = ("requests", "urllib3", "aiohttp", "PIL", "PyQt6", "http.server")
+SCENARIOS: Dict[str, Tuple[str, float, Tuple[str, ...]]] = {
+    "import ollama_vision": (
+        "import ollama_vision",
+        50.0,
+        HEAVY_MODULES + ("ollama_vision.client", "ollama_vision.async_client", "ollama_vision.chat_interface"),
+    ),
+    "import client": (
+        "from ollama_vision.client import OllamaVisionClient",
+        150.0,
+        HEAVY_MODULES,
+    ),
+    "create client": (
+        "from ollama_vision.client import OllamaVisionClient\n"
+        "OllamaVisionClient(model_cache_path=None).close()",
+        150.0,
+        HEAVY_MODULES,
+    ),
+}
+
+# 计时前只导入time,标准库的json、logging等也计入场景的耗时
+_PROBE = """
+import time
+started = time.perf_counter()
+exec(compile({code!r}, "<scenario>", "exec"))
+elapsed = time.perf_counter() - started
+import json, logging, sys
+root = logging.getLogger()
+print(json.dumps({{
+    "ms": elapsed * 1000,
+    "loaded": [name for name in {forbidden!r} if name in sys.modules],
+    "logging_changed": bool(root.handlers) or root.level != logging.WARNING,
+}}))
+"""
+
+
+def run_scenario(code: str, forbidden: Tuple[str, ...], repeat: int) -> Tuple[List[float], List[str], bool]:
+    """在新的进程中运行repeat次,返回每次的耗时、加载了的禁止模块和日志设置是否被修改"""
+    timings = []
+    loaded = set()
+    logging_changed = False
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(code=code, forbidden=forbidden)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        timings.append(result["ms"])
+        loaded.update(result["loaded"])
+        logging_changed = logging_changed or result["logging_changed"]
+    return timings, sorted(loaded), logging_changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导入耗时预算检查")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="按比例放宽预算,用于较慢的机器")
+    args = parser.parse_args()
+
+    results = {}
+    for name, (code, budget, forbidden) in SCENARIOS.items():
+        timings, loaded, logging_changed = run_scenario(code, forbidden, args.repeat)
+        median = statistics.median(timings)
+        results[name] = {
+            "median_ms": round(median, 1),
+            "min_ms": round(min(timings), 1),
+            "budget_ms": budget * args.budget_scale,
+            "heavy_modules_loaded": loaded,
+            "logging_changed": logging_changed,
+            "passed": median <= budget * args.budget_scale and not loaded and not logging_changed,
+        }
+    results["passed"] = all(result["passed"] for result in results.values())
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    sys.exit(0 if results["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+# benchmarks/fake_ollama.py
+"""
+模拟Ollama服务的本地HTTP服务器
+
+实现api/tags、api/ps、api/show、api/generate(预加载)和api/chat(流式与非流式),
+可配置模型数量、首字延迟和token速率,用于在没有真实Ollama和GPU的环境下
+测量本项目自身的开销。与Ollama一样,请求api/tags未列出的模型时返回404。也可以单独运行,供GUI手动测试:
+
+    python -m benchmarks.fake_ollama --port 11434 --token-rate 30
+"""
+
+import argparse
+import json
+import socket
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Set
+
+FAKE_MODEL_FAMILY = "llava"
+
+
+@dataclass
+class FakeOllamaConfig:
+    """模拟服务的行为参数"""
+    models: int = 3  # api/tags返回的模型数量
+    tokens: int = 64  # 每次回复的token数
+    token_rate: float = 0.0  # 每秒输出的token数,为0时不限速
+    first_token_latency: float = 0.0  # 收到请求到输出第一个token之间的延迟(秒)
+    show_latency: float = 0.0  # api/show的响应延迟(秒)
+    load_duration: float = 0.0  # api/generate预加载模型的耗时(秒)
+    token_text: str = " token"  # 每个token的文本
+    fail_chats: int = 0  # 之后的多少个api/chat请求直接返回fail_status,用于测试重试
+    fail_status: int = 503
+
+
+def _model_name(index: int) -> str:
+    return f"{FAKE_MODEL_FAMILY}-bench-{index}:latest"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # 逐token的小块写入不能被Nagle算法攒批,否则首字延迟会多出几十毫秒
+    disable_nagle_algorithm = True
+    server: "_Server"
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.track(self.connection, True)
+
+    def finish(self):
+        try:
+            super().finish()
+        finally:
+            self.server.track(self.connection, False)
+
+    # ---- 请求与响应的读写 ----
+
+    def _read_body(self) -> Dict[str, Any]:
+        """读取请求体,同时支持Content-Length和分块传输(流式请求体)"""
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            parts = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                parts.append(self.rfile.read(size))
+                self.rfile.readline()
+            raw = b"".join(parts)
+        else:
+            raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        return json.loads(raw) if raw else {}
+
+    def _send_json(self, data: Any, status: int = 200):
+        body = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    # ---- 路由 ----
+
+    def do_GET(self):
+        self.server.count(self.path)
+        if self.path == "/api/tags":
+            self._send_json({"models": self.server.tags()})
+        elif self.path == "/api/ps":
+            self._send_json({"models": self.server.running()})
+        else:
+            self._send_json({"error": f"unknown endpoint {self.path}"}, status=404)
+
+    def do_POST(self):
+        self.server.count(self.path)
+        try:
+            data = self._read_body()
+        except ValueError:
+            self._send_json({"error": "invalid JSON body"}, status=400)
+            return
+
+        model = data.get("name") if self.path == "/api/show" else data.get("model")
+        if self.path in ("/api/show", "/api/generate", "/api/chat") and not self.server.has_model(model):
+            self.server.count("not_found")
+            self._send_json({"error": f"model '{model}' not found"}, status=404)
+        elif self.path == "/api/show":
+            self._handle_show(data)
+        elif self.path == "/api/generate":
+            self._handle_generate(data)
+        elif self.path == "/api/chat":
+            self._handle_chat(data)
+        else:
+            self._send_json({"error": f"unknown endpoint {self.path}"}, status=404)
+
+    def _handle_show(self, data: Dict[str, Any]):
+        config = self.server.config
+        if config.show_latency:
+            time.sleep(config.show_latency)
+        self._send_json({
+            "description": "fake model for benchmarks",
+            "format": "gguf",
+            "families": [FAKE_MODEL_FAMILY, "clip"],
+            "capabilities": {"vision": True},
+            "parameters": {},
+            "size": 4 * 1024 ** 3,
+        })
+
+    def _handle_generate(self, data: Dict[str, Any]):
+        config = self.server.config
+        if config.load_duration:
+            time.sleep(config.load_duration)
+        self.server.load(data.get("model", ""))
+        self._send_json({
+            "model": data.get("model", ""),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "response": "",
+            "done": True,
+            "done_reason": "load",
+            "load_duration": int(config.load_duration * 1e9),
+        })
+
+    def _handle_chat(self, data: Dict[str, Any]):
+        config = self.server.config
+        model = data.get("model", "")
+        if self.server.take_failure():
+            self._send_json({"error": "server busy"}, status=config.fail_status)
+            return
+        self.server.load(model)
+        started = time.perf_counter()
+        if config.first_token_latency:
+            time.sleep(config.first_token_latency)
+
+        def final(eval_started: float) -> Dict[str, Any]:
+            now = time.perf_counter()
+            return {
+                "model": model,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "done": True,
+                "done_reason": "stop",
+                "total_duration": int((now - started) * 1e9),
+                "load_duration": 0,
+                "prompt_eval_count": sum(len(m.get("content", "")) for m in data.get("messages", [])) // 4 + 1,
+                "prompt_eval_duration": int((eval_started - started) * 1e9),
+                "eval_count": config.tokens,
+                "eval_duration": int((now - eval_started) * 1e9),
+            }
+
+        if not data.get("stream", True):
+            eval_started = time.perf_counter()
+            if config.token_rate:
+                time.sleep(config.tokens / config.token_rate)
+            response = final(eval_started)
+            response["message"] = {"role": "assistant", "content": config.token_text * config.tokens}
+            self._send_json(response)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        line = json.dumps({
+            "model": model,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "message": {"role": "assistant", "content": config.token_text},
+            "done": False,
+        }, separators=(",", ":")).encode("utf-8") + b"\n"
+
+        eval_started = time.perf_counter()
+        try:
+            for i in range(config.tokens):
+                if config.token_rate:
+                    # 按绝对时间对齐,避免逐token sleep的误差累积
+                    delay = eval_started + i / config.token_rate - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                self._write_chunk(line)
+            self._write_chunk(json.dumps(final(eval_started), separators=(",", ":")).encode("utf-8") + b"\n")
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端提前断开,与真实服务一样停止生成
+            self.server.count("disconnected")
+            self.close_connection = True
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config: FakeOllamaConfig):
+        super().__init__(address, _Handler)
+        self.config = config
+        self.requests: Counter = Counter()
+        self.loaded: List[str] = []  # 已"加载"的模型,按加载顺序
+        self._connections: Set[socket.socket] = set()
+        self._lock = threading.Lock()
+
+    def track(self, connection: socket.socket, active: bool):
+        with self._lock:
+            if active:
+                self._connections.add(connection)
+            else:
+                self._connections.discard(connection)
+
+    def close_connections(self):
+        """断开所有长连接,模拟服务停止"""
+        with self._lock:
+            connections = list(self._connections)
+        for connection in connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def count(self, path: str):
+        with self._lock:
+            self.requests[path] += 1
+
+    def take_failure(self) -> bool:
+        """消耗一次预设的失败"""
+        with self._lock:
+            if self.config.fail_chats > 0:
+                self.config.fail_chats -= 1
+                self.requests["failed"] += 1
+                return True
+            return False
+
+    def load(self, model: str):
+        with self._lock:
+            if model and model not in self.loaded:
+                self.loaded.append(model)
+
+    def running(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{"name": model, "model": model, "size_vram": 4 * 1024 ** 3} for model in self.loaded]
+
+    def has_model(self, model: Optional[str]) -> bool:
+        return any(model == _model_name(i) for i in range(self.config.models))
+
+    def tags(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "name": _model_name(i),
+                "model": _model_name(i),
+                "modified_at": "2024-11-01T08:00:00Z",
+                "size": 4 * 1024 ** 3,
+                "digest": f"{i:064x}",
+            }
+            for i in range(self.config.models)
+        ]
+
+
+class FakeOllamaServer:
+    """
+    在后台线程中运行的模拟Ollama服务
+
+    用法:
+        with FakeOllamaServer(FakeOllamaConfig(token_rate=50)) as server:
+            client = OllamaVisionClient(base_url=server.url, model=server.model_names[0])
+    """
+
+    def __init__(self, config: Optional[FakeOllamaConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        """
+        初始化模拟服务
+
+        Args:
+            config: 行为参数,运行中修改会对之后的请求生效
+            host: 监听地址
+            port: 监听端口,为0时自动分配
+        """
+        self._server = _Server((host, port), config or FakeOllamaConfig())
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "FakeOllamaServer":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @property
+    def config(self) -> FakeOllamaConfig:
+        return self._server.config
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def model_names(self) -> List[str]:
+        return [_model_name(i) for i in range(self.config.models)]
+
+    @property
+    def requests(self) -> Counter:
+        """按路径统计的请求数"""
+        return self._server.requests
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, name="fake-ollama", daemon=True)
+            self._thread.start()
+
+    def serve_forever(self):
+        """在当前线程中运行,直到被中断"""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+        self._server.close_connections()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模拟Ollama服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--models", type=int, default=3)
+    parser.add_argument("--tokens", type=int, default=64)
+    parser.add_argument("--token-rate", type=float, default=30.0)
+    parser.add_argument("--first-token-latency", type=float, default=0.2)
+    parser.add_argument("--show-latency", type=float, default=0.0)
+    parser.add_argument("--load-duration", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = FakeOllamaConfig(
+        models=args.models,
+        tokens=args.tokens,
+        token_rate=args.token_rate,
+        first_token_latency=args.first_token_latency,
+        show_latency=args.show_latency,
+        load_duration=args.load_duration,
+    )
+    server = FakeOllamaServer(config, host=args.host, port=args.port)
+    print(f"Fake Ollama listening on {server.url} with models: {', '.join(server.model_names)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
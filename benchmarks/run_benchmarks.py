@@ -0,0 +1,220 @@
+# benchmarks/run_benchmarks.py
+"""
+端到端基准测试套件
+
+针对bundled的模拟Ollama服务(benchmarks.fake_ollama)测量本项目自身的开销:
+- chat: 首字延迟(TTFT)和每秒token数
+- chat_thread: 经由GUI的ChatTask信号送达主线程时的TTFT和每秒token数(需要PyQt6)
+- encode_image: 不同图片大小下的编码吞吐量
+- get_models: 模型列表加载耗时随模型数量的变化
+
+结果以JSON输出,便于比较不同版本:
+
+    python -m benchmarks.run_benchmarks --output results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from benchmarks.fake_ollama import FakeOllamaConfig, FakeOllamaServer
+from ollama_vision.client import OllamaVisionClient
+from ollama_vision.image_utils import encode_image
+from ollama_vision.stream_decoder import JSON_BACKEND
+
+SECTIONS = ("chat", "chat_thread", "encode_image", "get_models")
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """返回一组测量值的统计摘要"""
+    ordered = sorted(values)
+    return {
+        "median": statistics.median(ordered),
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "min": ordered[0],
+        "max": ordered[-1],
+    }
+
+
+def from_timestamps(started: float, received: List[float]) -> Dict[str, float]:
+    """根据每块输出的到达时间计算TTFT和首字之后的token速率"""
+    if not received:
+        return {"ttft": time.perf_counter() - started, "tokens_per_sec": 0.0, "tokens": 0}
+    span = received[-1] - received[0]
+    return {
+        "ttft": received[0] - started,
+        "tokens_per_sec": (len(received) - 1) / span if span > 0 else 0.0,
+        "tokens": len(received),
+    }
+
+
+def measure_stream(stream: Iterable[Any], started: float) -> Dict[str, float]:
+    """消费一个输出流,返回TTFT和首字之后的token速率"""
+    return from_timestamps(started, [time.perf_counter() for _ in stream])
+
+
+def collect(runs: List[Dict[str, float]], config: FakeOllamaConfig) -> Dict[str, Any]:
+    return {
+        "server_token_rate": config.token_rate,
+        "server_first_token_latency": config.first_token_latency,
+        "tokens": config.tokens,
+        "runs": len(runs),
+        "ttft_ms": summarize([run["ttft"] * 1000 for run in runs]),
+        "tokens_per_sec": summarize([run["tokens_per_sec"] for run in runs]),
+    }
+
+
+def bench_chat(config: FakeOllamaConfig, runs: int) -> Dict[str, Any]:
+    """OllamaVisionClient.chat的TTFT与吞吐量"""
+    with FakeOllamaServer(config) as server:
+        with OllamaVisionClient(base_url=server.url, model=server.model_names[0], model_cache_path=None) as client:
+            list(client.chat("warmup"))
+            results = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                results.append(measure_stream(client.chat("Describe the image."), started))
+    return collect(results, config)
+
+
+def bench_chat_thread(config: FakeOllamaConfig, runs: int) -> Optional[Dict[str, Any]]:
+    """ChatTask的TTFT与吞吐量,按信号在主线程被处理的时间计算"""
+    try:
+        from PyQt6.QtCore import QCoreApplication, QEventLoop
+        from ollama_vision.gui.chat_thread import ChatTask
+        from ollama_vision.gui.tasks import get_task_scheduler
+    except ImportError:
+        return None
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+    with FakeOllamaServer(config) as server:
+        with OllamaVisionClient(base_url=server.url, model=server.model_names[0], model_cache_path=None) as client:
+            results = []
+            for i in range(runs + 1):
+                received: List[float] = []
+                loop = QEventLoop()
+                task = ChatTask(client, "Describe the image.")
+                task.response_received.connect(lambda _: received.append(time.perf_counter()))
+                task.done.connect(loop.quit)
+                started = time.perf_counter()
+                get_task_scheduler().submit(task)
+                loop.exec()
+                task.wait()
+                # 处理任务结束后剩余的排队信号,使调度器释放对任务的引用
+                app.processEvents()
+                if i > 0:  # 第一次用于预热连接
+                    results.append(from_timestamps(started, received))
+    return collect(results, config)
+
+
+def bench_encode_image(sizes_kb: List[int], repeat: int) -> List[Dict[str, Any]]:
+    """encode_image在不同文件大小下的吞吐量(不使用缓存)以及缓存命中的耗时"""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size_kb in sizes_kb:
+            path = Path(tmp) / f"bench_{size_kb}kb.png"
+            path.write_bytes(os.urandom(size_kb * 1024))
+
+            def best_of(func: Callable[[], Any]) -> float:
+                best = float("inf")
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    func()
+                    best = min(best, time.perf_counter() - started)
+                return best
+
+            uncached = best_of(lambda: encode_image(path, use_cache=False))
+            encode_image(path)
+            cached = best_of(lambda: encode_image(path))
+            results.append({
+                "size_kb": size_kb,
+                "uncached_ms": uncached * 1000,
+                "uncached_mb_per_sec": size_kb / 1024 / uncached,
+                "cached_ms": cached * 1000,
+            })
+    return results
+
+
+def bench_get_models(model_counts: List[int], show_latency: float) -> List[Dict[str, Any]]:
+    """get_models耗时随模型数量的变化,分别测量无缓存和磁盘缓存命中两种情况"""
+    results = []
+    for count in model_counts:
+        config = FakeOllamaConfig(models=count, show_latency=show_latency)
+        with FakeOllamaServer(config) as server, tempfile.TemporaryDirectory() as tmp:
+            cache_path = Path(tmp) / "models.json"
+            timings = {}
+            show_requests = {}
+            # populate只用于写入磁盘缓存,warm时使用新的客户端读取缓存
+            for label, path in (("cold", None), ("populate", cache_path), ("warm", cache_path)):
+                shows_before = server.requests["/api/show"]
+                with OllamaVisionClient(base_url=server.url, model_cache_path=path) as client:
+                    started = time.perf_counter()
+                    models = client.get_models(force_refresh=True)
+                    timings[label] = (time.perf_counter() - started) * 1000
+                show_requests[label] = server.requests["/api/show"] - shows_before
+            results.append({
+                "models": count,
+                "vision_models": len(models),
+                "show_latency_ms": show_latency * 1000,
+                "cold_ms": timings["cold"],
+                "warm_ms": timings["warm"],
+                "cold_show_requests": show_requests["cold"],
+                "warm_show_requests": show_requests["warm"],
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ollama Vision端到端基准测试")
+    parser.add_argument("--only", nargs="+", choices=SECTIONS, help="只运行指定的测试项")
+    parser.add_argument("--runs", type=int, default=20, help="chat类测试的重复次数")
+    parser.add_argument("--tokens", type=int, default=256, help="每次回复的token数")
+    parser.add_argument("--token-rate", type=float, default=200.0, help="限速场景下服务端的token速率")
+    parser.add_argument("--first-token-latency", type=float, default=0.02, help="限速场景下服务端的首字延迟(秒)")
+    parser.add_argument("--image-sizes", type=int, nargs="+", default=[64, 512, 2048, 8192], help="图片大小(KB)")
+    parser.add_argument("--model-counts", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--show-latency", type=float, default=0.005, help="api/show的模拟延迟(秒)")
+    parser.add_argument("--output", help="同时将结果写入该文件")
+    args = parser.parse_args()
+    sections = args.only or SECTIONS
+
+    # 不限速的场景测量客户端本身的上限,限速场景检查能否跟上接近真实的输出速度
+    scenarios = {
+        "unthrottled": FakeOllamaConfig(tokens=args.tokens),
+        "throttled": FakeOllamaConfig(
+            tokens=args.tokens, token_rate=args.token_rate, first_token_latency=args.first_token_latency
+        ),
+    }
+
+    results: Dict[str, Any] = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "json_backend": JSON_BACKEND,
+        }
+    }
+    if "chat" in sections:
+        results["chat"] = {name: bench_chat(config, args.runs) for name, config in scenarios.items()}
+    if "chat_thread" in sections:
+        thread_results = {name: bench_chat_thread(config, args.runs) for name, config in scenarios.items()}
+        results["chat_thread"] = thread_results if all(thread_results.values()) else None
+    if "encode_image" in sections:
+        results["encode_image"] = bench_encode_image(args.image_sizes, repeat=5)
+    if "get_models" in sections:
+        results["get_models"] = bench_get_models(args.model_counts, args.show_latency)
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
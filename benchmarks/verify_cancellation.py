@@ -0,0 +1,196 @@
+# benchmarks/verify_cancellation.py
+"""
+验证取消请求后连接立即断开、模拟服务在限定时间内停止生成
+
+分别在输出过程中、等待第一个token时和连接建立之前取消,检查:
+    - 读取线程在限定时间内以RequestCancelled结束
+    - 模拟服务检测到连接断开,不再继续输出剩余的token
+    - 安装了PyQt6时,ChatTask.cancel()同样在限定时间内结束任务
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+
+from benchmarks.fake_ollama import FakeOllamaConfig, FakeOllamaServer
+from ollama_vision.cancellation import CancellationToken
+from ollama_vision.client import OllamaVisionClient
+from ollama_vision.exceptions import RequestCancelled
+from ollama_vision.metrics import MetricsRegistry
+
+
+def wait_for(predicate, timeout: float) -> float:
+    """等待predicate成立,返回等待的秒数,超时返回inf"""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if predicate():
+            return time.perf_counter() - started
+        time.sleep(0.001)
+    return float("inf")
+
+
+def cancel_chat(client: OllamaVisionClient, server: FakeOllamaServer, after_tokens: int, cancel_delay: float,
+                timeout: float) -> dict:
+    """
+    在后台线程中对话,收到after_tokens个输出或经过cancel_delay秒后取消
+
+    Returns:
+        取消到读取线程结束、到服务端检测到断开的耗时,以及收到的输出数
+    """
+    token = CancellationToken()
+    received = []
+    outcome = {}
+    got_tokens = threading.Event()
+    disconnected_before = server.requests["disconnected"]
+
+    def reader():
+        try:
+            for content in client.chat("Describe the image.", cancel=token):
+                received.append(content)
+                if len(received) >= after_tokens:
+                    got_tokens.set()
+            outcome["result"] = "completed"
+        except RequestCancelled:
+            outcome["result"] = "cancelled"
+        except Exception as e:
+            outcome["result"] = f"error: {e!r}"
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    if after_tokens:
+        got_tokens.wait(timeout)
+    else:
+        time.sleep(cancel_delay)
+
+    cancelled_at = time.perf_counter()
+    token.cancel()
+    thread.join(timeout)
+    reader_exit = time.perf_counter() - cancelled_at
+    server_stop = wait_for(lambda: server.requests["disconnected"] > disconnected_before, timeout)
+    return {
+        "result": outcome.get("result", "still running"),
+        "tokens_received": len(received),
+        "reader_exit_ms": reader_exit * 1000,
+        "server_stop_ms": (reader_exit + server_stop) * 1000 if server_stop != float("inf") else None,
+    }
+
+
+def cancel_before_connect(server: FakeOllamaServer, timeout: float) -> dict:
+    """
+    在连接池新建连接、尚未连上服务时取消,检查请求不会被发送出去
+
+    连接建立前socket还不存在,取消时无法断开;连上后必须立即断开,
+    否则要等服务输出第一个token(加载模型)后读取线程才会结束。
+    """
+    token = CancellationToken()
+    outcome = {}
+    cancelled_at = []
+    chats_before = server.requests["/api/chat"]
+
+    with OllamaVisionClient(base_url=server.url, model=server.model_names[0], model_cache_path=None,
+                            metrics_registry=MetricsRegistry()) as client:
+        on_new_connection = client._http._on_new_connection
+
+        def cancel_on_new_connection():
+            on_new_connection()
+            cancelled_at.append(time.perf_counter())
+            token.cancel()
+
+        # 会话在第一次请求时才创建,此时替换回调对新建的连接生效
+        client._http._on_new_connection = cancel_on_new_connection
+        try:
+            client.chat("Describe the image.", cancel=token).collect()
+            outcome["result"] = "completed"
+        except RequestCancelled:
+            outcome["result"] = "cancelled"
+        except Exception as e:
+            outcome["result"] = f"error: {e!r}"
+        finished = time.perf_counter()
+
+    return {
+        "result": outcome["result"],
+        "reader_exit_ms": (finished - cancelled_at[0]) * 1000 if cancelled_at else None,
+        "chat_requests_received": server.requests["/api/chat"] - chats_before,
+    }
+
+
+def cancel_chat_task(client: OllamaVisionClient, timeout: float) -> dict:
+    """用ChatTask.cancel()取消GUI的回复任务,返回任务结束的耗时"""
+    try:
+        from PyQt6.QtCore import QCoreApplication
+        from ollama_vision.gui.chat_thread import ChatTask
+        from ollama_vision.gui.tasks import get_task_scheduler
+    except ImportError:
+        return {"skipped": "PyQt6 not installed"}
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    task = ChatTask(client, "Describe the image.")
+    received = []
+    errors = []
+    task.response_received.connect(received.append)
+    task.error_occurred.connect(errors.append)
+    get_task_scheduler().submit(task)
+    wait_for(lambda: (app.processEvents(), len(received) >= 3)[1], timeout)
+
+    cancelled_at = time.perf_counter()
+    task.cancel()
+    finished = task.wait(timeout)
+    elapsed = time.perf_counter() - cancelled_at
+    app.processEvents()
+    return {"finished": finished, "task_exit_ms": elapsed * 1000, "errors": errors}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="验证取消请求")
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--token-rate", type=float, default=50.0)
+    parser.add_argument("--first-token-latency", type=float, default=1.0)
+    parser.add_argument("--bound", type=float, default=0.5, help="允许的最长停止时间(秒)")
+    args = parser.parse_args()
+
+    config = FakeOllamaConfig(tokens=args.tokens, token_rate=args.token_rate)
+    results = {}
+    with FakeOllamaServer(config) as server, OllamaVisionClient(
+            base_url=server.url, model=server.model_names[0], model_cache_path=None,
+            metrics_registry=MetricsRegistry()
+    ) as client:
+        results["while_streaming"] = cancel_chat(client, server, after_tokens=5, cancel_delay=0, timeout=5)
+
+        # 等待第一个token时取消,连接阻塞在读取响应头上
+        config.first_token_latency = args.first_token_latency
+        results["before_first_token"] = cancel_chat(
+            client, server, after_tokens=0, cancel_delay=args.first_token_latency / 4, timeout=5
+        )
+        results["before_connect"] = cancel_before_connect(server, timeout=5)
+        config.first_token_latency = 0.0
+
+        results["chat_task"] = cancel_chat_task(client, timeout=5)
+
+        # 取消不影响之后的请求
+        config.tokens = 8
+        results["next_request_ok"] = client.chat("Describe the image.").collect() != ""
+        results["endpoint_failures"] = client.endpoint_stats[0].failures
+
+    bound_ms = args.bound * 1000
+    checks = [
+        results["while_streaming"]["result"] == "cancelled",
+        results["while_streaming"]["reader_exit_ms"] < bound_ms,
+        (results["while_streaming"]["server_stop_ms"] or float("inf")) < bound_ms,
+        results["before_first_token"]["result"] == "cancelled",
+        results["before_first_token"]["reader_exit_ms"] < bound_ms,
+        results["before_connect"]["result"] == "cancelled",
+        (results["before_connect"]["reader_exit_ms"] or float("inf")) < bound_ms,
+        results["before_connect"]["chat_requests_received"] == 0,
+        results["chat_task"].get("skipped") or results["chat_task"]["task_exit_ms"] < bound_ms,
+        results["next_request_ok"],
+        results["endpoint_failures"] == 0,
+    ]
+    results["passed"] = all(checks)
+    print(json.dumps(results, indent=2))
+    sys.exit(0 if results["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
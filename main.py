@@ -1,15 +1,17 @@
-
 # main.py
 """主程序入口"""
 
-from ollama_vision.chat_interface import start_chat
+import logging
+import sys
 
-from ollama_vision.gui.main_window import MainWindow
 from PyQt6.QtWidgets import QApplication
-import sys
+
+from ollama_vision.gui.main_window import MainWindow
 
 if __name__ == "__main__":
+    # 日志由程序入口配置,导入ollama_vision不会修改全局日志设置
+    logging.basicConfig(level=logging.INFO)
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
-    sys.exit(app.exec())
\ No newline at end of file
+    sys.exit(app.exec())
@@ -4,9 +4,32 @@ Ollama Vision Client
 A Python client for interacting with Ollama vision models
 """
 
+import importlib
+import logging
+
 __version__ = "0.1.0"
 
-from ollama_vision.client import OllamaVisionClient
-from ollama_vision.chat_interface import start_chat
+__all__ = ['OllamaVisionClient', 'AsyncOllamaVisionClient', 'start_chat']
+
+# 导出的名称在第一次访问时才导入所在模块,import ollama_vision本身不会加载requests、aiohttp等依赖
+_LAZY_EXPORTS = {
+    'OllamaVisionClient': 'ollama_vision.client',
+    'AsyncOllamaVisionClient': 'ollama_vision.async_client',
+    'start_chat': 'ollama_vision.chat_interface',
+}
+
+# 库本身不配置日志,由使用方的程序决定日志级别和输出位置
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
 
-__all__ = ['OllamaVisionClient', 'start_chat']
\ No newline at end of file
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_EXPORTS))
@@ -0,0 +1,444 @@
+# ollama_vision/async_client.py
+"""基于asyncio的Ollama视觉模型客户端模块"""
+
+import asyncio
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Dict, List, Optional, Union
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp是可选依赖,只有异步客户端需要
+    aiohttp = None
+
+from ollama_vision.client import encode_images, build_chat_messages, extract_assistant_content
+from ollama_vision.config import (
+    DEFAULT_BASE_URL, DEFAULT_MODEL, DEFAULT_TEMPERATURE, CHAT_ENDPOINT, TAGS_ENDPOINT, SHOW_ENDPOINT,
+    DEFAULT_POOL_SIZE, DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT, DEFAULT_SHOW_WORKERS,
+    DEFAULT_MODEL_CACHE_PATH, DEFAULT_KEEP_ALIVE, GENERATE_ENDPOINT
+)
+from ollama_vision.exceptions import APIError, ConfigurationError
+from ollama_vision.image_preprocess import PreprocessOptions
+from ollama_vision.models import ModelInfo, PreloadResult, select_vision_models
+from ollama_vision.model_cache import ModelMetadataCache, CacheStats, split_cached
+from ollama_vision.stream_decoder import ChatChunk, NDJSONChatDecoder
+from ollama_vision.chat_result import AsyncChatResult
+from ollama_vision.metrics import ClientMetrics, MetricsRegistry, get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncOllamaVisionClient:
+    """
+    OllamaVisionClient的asyncio版本
+
+    所有请求共享一个aiohttp连接池,单个事件循环即可并发驱动大量请求。
+    """
+
+    def __init__(
+            self,
+            base_url: str = DEFAULT_BASE_URL,
+            model: str = DEFAULT_MODEL,
+            temperature: float = DEFAULT_TEMPERATURE,
+            pool_size: int = DEFAULT_POOL_SIZE,
+            http_keep_alive: bool = True,
+            connect_timeout: Optional[float] = DEFAULT_CONNECT_TIMEOUT,
+            read_timeout: Optional[float] = DEFAULT_READ_TIMEOUT,
+            show_workers: int = DEFAULT_SHOW_WORKERS,
+            model_cache_path: Optional[Union[str, Path]] = DEFAULT_MODEL_CACHE_PATH,
+            preprocess_images: bool = False,
+            image_options: Optional[PreprocessOptions] = None,
+            coalesce_chars: int = 0,
+            coalesce_interval: float = 0.0,
+            keep_alive: Optional[Union[str, int]] = DEFAULT_KEEP_ALIVE,
+            collect_metrics: bool = True,
+            metrics_registry: Optional[MetricsRegistry] = None
+    ):
+        """
+        初始化异步客户端,参数含义与OllamaVisionClient相同
+
+        Args:
+            base_url: Ollama服务的基础URL
+            model: 要使用的模型名称
+            temperature: 生成温度参数(0-1之间)
+            pool_size: 连接池大小,即同时打开的最大连接数
+            http_keep_alive: 是否复用HTTP连接
+            connect_timeout: 建立连接的超时时间(秒)
+            read_timeout: 两次读取响应数据之间的超时时间(秒)。非流式的对话和预加载在生成或加载完成前
+                不返回任何数据,这两类请求不限制读取时间
+            show_workers: 并发获取模型详情(api/show)的最大请求数
+            model_cache_path: 模型元数据磁盘缓存文件路径,为None时不使用磁盘缓存
+            preprocess_images: 是否在发送前将图片缩放到模型的目标分辨率并重新编码
+            image_options: 自定义的图片预处理参数,默认按当前模型自动选择
+            coalesce_chars: 将细碎的token合并到至少该字符数再输出,为0时逐token输出
+            coalesce_interval: 合并输出时最长等待的时间(秒),为0时不限制
+            keep_alive: 模型在显存中的默认保留时间(如"10m"、3600、-1),None表示使用服务端默认值
+            collect_metrics: 是否记录请求数、错误数和耗时等指标
+            metrics_registry: 记录指标的注册表,默认为进程内共享的注册表
+
+        Raises:
+            ConfigurationError: 未安装aiohttp时
+        """
+        if aiohttp is None:
+            raise ConfigurationError("异步客户端需要aiohttp,请先执行 pip install aiohttp")
+
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.temperature = temperature
+        self.pool_size = pool_size
+        self.http_keep_alive = http_keep_alive
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.show_workers = show_workers
+        self._models_cache: List[ModelInfo] = []
+        self._last_error: Optional[str] = None
+        self._model_cache = ModelMetadataCache(model_cache_path) if model_cache_path else None
+        self.preprocess_images = preprocess_images
+        self.image_options = image_options
+        self.coalesce_chars = coalesce_chars
+        self.coalesce_interval = coalesce_interval
+        self.keep_alive = keep_alive
+        self._keep_alive_overrides: Dict[str, Union[str, int]] = {}
+        self._preloads: Dict[str, "asyncio.Task[PreloadResult]"] = {}
+        self._metrics = ClientMetrics(metrics_registry or get_metrics_registry()) if collect_metrics else None
+        self._session: Optional["aiohttp.ClientSession"] = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self):
+        """关闭客户端持有的所有HTTP连接"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def last_error(self) -> Optional[str]:
+        """返回最后一次错误信息"""
+        return self._last_error
+
+    @property
+    def image_preprocess_options(self) -> Optional[PreprocessOptions]:
+        """当前模型使用的图片预处理参数,未启用预处理时返回None"""
+        if not self.preprocess_images:
+            return None
+        return self.image_options or PreprocessOptions.for_model(self.model)
+
+    @property
+    def model_cache_stats(self) -> Optional[CacheStats]:
+        """返回模型元数据磁盘缓存的累计命中统计,未启用缓存时返回None"""
+        return self._model_cache.stats if self._model_cache else None
+
+    @property
+    def metrics(self) -> Optional[MetricsRegistry]:
+        """返回记录指标的注册表,未启用指标时返回None"""
+        return self._metrics.registry if self._metrics else None
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        """按需创建会话,必须在事件循环中调用"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                force_close=not self.http_keep_alive
+            )
+            timeout = aiohttp.ClientTimeout(
+                total=None,
+                connect=self.connect_timeout,
+                sock_read=self.read_timeout
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self._session
+
+    @asynccontextmanager
+    async def _make_request(
+            self,
+            endpoint: str,
+            data: Optional[Dict] = None,
+            method: str = "POST"
+    ) -> AsyncIterator["aiohttp.ClientResponse"]:
+        """发送HTTP请求到指定的endpoint,退出上下文时释放连接"""
+        url = f"{self.base_url}/{endpoint}"
+        metrics = self._metrics
+        model = (data.get("model") or data.get("name") or "") if data else ""
+        payload = json.dumps(data).encode("utf-8") if data is not None else None
+        if metrics:
+            metrics.requests.inc(model, endpoint)
+            if payload is not None:
+                metrics.payload_bytes.observe(len(payload), model, endpoint)
+        # 非流式的对话和预加载在完成前不发送任何数据,长时间的生成不能按读取超时中断
+        options = {}
+        if endpoint in (CHAT_ENDPOINT, GENERATE_ENDPOINT) and data and not data.get("stream", True):
+            options["timeout"] = aiohttp.ClientTimeout(total=None, connect=self.connect_timeout, sock_read=None)
+        try:
+            async with self._get_session().request(
+                    method, url, data=payload, headers={"Content-Type": "application/json"}, **options
+            ) as response:
+                if response.status >= 400:
+                    error_msg = await response.text()
+                    try:
+                        error_data = json.loads(error_msg)
+                        if 'error' in error_data:
+                            error_msg = error_data['error']
+                    except (ValueError, TypeError):
+                        pass
+                    error = APIError(f"API错误 ({response.status}): {error_msg}", status_code=response.status)
+                    if metrics:
+                        metrics.record_error(model, endpoint, error)
+                    raise error
+                yield response
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self._last_error = str(e)
+            if metrics:
+                metrics.record_error(model, endpoint, e)
+            raise APIError(f"请求失败: {str(e) or type(e).__name__}")
+
+    async def _request_json(self, endpoint: str, data: Optional[Dict] = None, method: str = "POST") -> Dict[str, Any]:
+        """发送非流式请求并解析JSON响应"""
+        started = time.perf_counter()
+        async with self._make_request(endpoint, data, method=method) as response:
+            response_data = await response.json(content_type=None)
+        if self._metrics:
+            model = (data.get("model") or data.get("name") or "") if data else ""
+            self._metrics.latency.observe(time.perf_counter() - started, model, endpoint)
+        return response_data
+
+    async def get_models(self, force_refresh: bool = False) -> List[ModelInfo]:
+        """
+        获取当前安装的模型列表
+
+        Args:
+            force_refresh: 是否强制刷新缓存
+
+        Returns:
+            支持vision功能的模型信息列表
+        """
+        if not force_refresh and self._models_cache:
+            return self._models_cache
+
+        try:
+            data = await self._request_json(TAGS_ENDPOINT, method="GET")
+        except Exception as e:
+            self._last_error = str(e)
+            logger.error(f"Error getting models: {e}")
+            raise APIError(f"获取模型列表失败: {str(e)}")
+
+        tags = [model_data for model_data in data.get('models', []) if model_data.get('name')]
+        logger.debug(f"Found {len(tags)} total models")
+
+        # 先查磁盘缓存,只有新增或变化的模型才需要调用api/show
+        all_models, to_fetch = split_cached(self._model_cache, tags)
+
+        # 并发获取模型详细信息,单个模型失败时跳过该模型
+        semaphore = asyncio.Semaphore(max(1, self.show_workers))
+
+        async def fetch(name: str, digest: str, modified_at: str) -> Optional[ModelInfo]:
+            async with semaphore:
+                try:
+                    show_data = await self._request_json(SHOW_ENDPOINT, {"name": name})
+                    return ModelInfo.from_show(name, show_data, digest=digest, modified_at=modified_at)
+                except Exception as e:
+                    self._last_error = str(e)
+                    logger.warning(f"Skipped model {name}, failed to get details: {e}")
+                    return None
+
+        for model in await asyncio.gather(*(fetch(*item) for item in to_fetch)):
+            if model is not None:
+                all_models.append(model)
+                if self._model_cache:
+                    self._model_cache.put(model)
+
+        if self._model_cache:
+            self._model_cache.retain(model_data['name'] for model_data in tags)
+            await asyncio.to_thread(self._model_cache.save)
+
+        models = select_vision_models(all_models)
+        self._models_cache = models
+        return models
+
+    def set_model(self, model_name: str, preload: bool = False):
+        """
+        切换使用的模型
+
+        Args:
+            model_name: 模型名称
+            preload: 是否在后台预加载该模型,必须在事件循环中调用
+        """
+        self.model = model_name
+        if preload:
+            self._start_preload(model_name)
+
+    def set_keep_alive(self, model_name: str, keep_alive: Optional[Union[str, int]]):
+        """
+        设置单个模型在显存中的保留时间
+
+        Args:
+            model_name: 模型名称
+            keep_alive: 保留时间(如"10m"、3600、-1),None表示恢复使用客户端的默认值
+        """
+        if keep_alive is None:
+            self._keep_alive_overrides.pop(model_name, None)
+        else:
+            self._keep_alive_overrides[model_name] = keep_alive
+
+    def keep_alive_for(self, model_name: str) -> Optional[Union[str, int]]:
+        """返回指定模型的保留时间,未设置时返回None"""
+        return self._keep_alive_overrides.get(model_name, self.keep_alive)
+
+    def _start_preload(self, model_name: str) -> "asyncio.Task[PreloadResult]":
+        """启动预加载任务,同一模型正在预加载时返回已有的任务"""
+        task = self._preloads.get(model_name)
+        if task is None or task.done():
+            task = asyncio.ensure_future(self._preload(model_name))
+            self._preloads[model_name] = task
+        return task
+
+    async def preload_model(self, model_name: Optional[str] = None) -> PreloadResult:
+        """
+        预加载模型到显存并等待加载完成
+
+        Args:
+            model_name: 模型名称,默认为当前模型
+
+        Returns:
+            预加载结果,失败时其中包含错误信息
+        """
+        # shield使调用方被取消时预加载仍在后台继续
+        return await asyncio.shield(self._start_preload(model_name or self.model))
+
+    def preload_status(self, model_name: Optional[str] = None) -> Optional[PreloadResult]:
+        """返回模型最近一次预加载的结果,尚未预加载或仍在加载中时返回None"""
+        task = self._preloads.get(model_name or self.model)
+        if task is None or not task.done() or task.cancelled():
+            return None
+        return task.result()
+
+    async def _preload(self, model_name: str) -> PreloadResult:
+        """执行预加载请求"""
+        data = {"model": model_name, "stream": False}
+        keep_alive = self.keep_alive_for(model_name)
+        if keep_alive is not None:
+            data["keep_alive"] = keep_alive
+
+        started = time.perf_counter()
+        try:
+            response_data = await self._request_json(GENERATE_ENDPOINT, data)
+            result = PreloadResult.from_response(model_name, response_data, time.perf_counter() - started)
+            logger.info(f"Preloaded model {model_name} in {result.load_duration:.2f}s")
+        except Exception as e:
+            self._last_error = str(e)
+            result = PreloadResult(model=model_name, elapsed=time.perf_counter() - started, error=str(e))
+            logger.warning(f"Failed to preload model {model_name}: {e}")
+        return result
+
+    def chat(
+            self,
+            prompt: str,
+            image_paths: Optional[List[Union[str, Path]]] = None,
+            system_prompt: Optional[str] = None,
+            stream: bool = True
+    ) -> AsyncChatResult:
+        """
+        与模型进行对话
+
+        迭代被取消或提前关闭(aclose)时会立即关闭底层连接,服务端随即停止生成。
+
+        Args:
+            prompt: 用户输入的提示词
+            image_paths: 图片文件路径列表(可选)
+            system_prompt: 系统提示词(可选)
+            stream: 是否使用流式输出
+
+        Returns:
+            可异步迭代的对话结果,逐段产出模型的输出,接收完毕后可从stats读取耗时统计
+        """
+        result = AsyncChatResult(self._iter_chat_chunks(
+            prompt, image_paths, system_prompt, stream, lambda started: result.mark_sent(started)
+        ))
+        return result
+
+    async def _iter_chat_chunks(
+            self,
+            prompt: str,
+            image_paths: Optional[List[Union[str, Path]]],
+            system_prompt: Optional[str],
+            stream: bool,
+            on_sent: Optional[Callable[[float], None]] = None
+    ) -> AsyncGenerator[ChatChunk, None]:
+        """
+        发送对话请求,逐个产出含有文本的输出块和带完整统计数据的结束块
+
+        on_sent在图片编码完成、发送请求前以开始时间调用,使耗时统计与指标使用同一起点。
+        """
+        metrics = self._metrics
+        model = self.model
+
+        # 图片编码涉及磁盘读取,放到线程中执行以免阻塞事件循环
+        images = None
+        if image_paths:
+            started = time.perf_counter()
+            images = await asyncio.to_thread(encode_images, image_paths, self.image_preprocess_options)
+            if metrics:
+                metrics.encode_time.observe(time.perf_counter() - started, model)
+        messages = build_chat_messages(prompt, images, system_prompt)
+
+        # 构建请求数据
+        data = {
+            "model": self.model,
+            "messages": messages,
+            "stream": stream,
+            "temperature": self.temperature
+        }
+        keep_alive = self.keep_alive_for(self.model)
+        if keep_alive is not None:
+            data["keep_alive"] = keep_alive
+
+        started = time.perf_counter()
+        if on_sent is not None:
+            on_sent(started)
+        first_token = True
+
+        def check(chunk: ChatChunk):
+            """检查流中的错误并记录首字延迟和总耗时"""
+            nonlocal first_token
+            if chunk.error:
+                self._last_error = chunk.error
+                if metrics:
+                    metrics.record_error(model, CHAT_ENDPOINT, APIError(chunk.error), kind="stream")
+                raise APIError(f"API错误: {chunk.error}")
+            if metrics:
+                if first_token and (chunk.content or chunk.done):
+                    first_token = False
+                    metrics.time_to_first_token.observe(time.perf_counter() - started, model, CHAT_ENDPOINT)
+                if chunk.done:
+                    metrics.latency.observe(time.perf_counter() - started, model, CHAT_ENDPOINT)
+                    metrics.record_chat(model, chunk.data)
+
+        async with self._make_request(CHAT_ENDPOINT, data) as response:
+            completed = False
+            try:
+                if stream:
+                    decoder = NDJSONChatDecoder(self.coalesce_chars, self.coalesce_interval)
+                    async for raw in response.content.iter_any():
+                        for chunk in decoder.feed(raw):
+                            check(chunk)
+                            yield chunk
+                    for chunk in decoder.flush():
+                        check(chunk)
+                        yield chunk
+                else:
+                    response_data = await response.json(content_type=None)
+                    content = extract_assistant_content(response_data)
+                    chunk = ChatChunk(content=content or "", done=True, data=response_data)
+                    check(chunk)
+                    yield chunk
+                completed = True
+            finally:
+                # 未读完就退出(取消或提前关闭)时直接断开连接,不把半读的连接放回连接池
+                if not completed:
+                    response.close()
@@ -0,0 +1,125 @@
+# ollama_vision/batch.py
+"""批量OCR处理模块"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Generator, Iterable, List, Optional, Sequence, Union
+
+from ollama_vision.chat_result import ChatStats
+
+ImageItem = Union[str, Path, Sequence[Union[str, Path]]]
+
+
+@dataclass
+class BatchResult:
+    """单个批量任务的处理结果"""
+    index: int  # 在输入中的序号
+    image_paths: List[Union[str, Path]] = field(default_factory=list)
+    text: str = ""  # 模型输出的完整文本
+    error: Optional[str] = None  # 处理失败时的错误信息
+    queued_time: float = 0.0  # 从提交到开始处理的等待时间(秒)
+    first_token_time: Optional[float] = None  # 从开始处理到收到第一个输出的时间(秒)
+    elapsed: float = 0.0  # 处理耗时(秒)
+    stats: Optional[ChatStats] = None  # 服务端返回的耗时与token统计,失败时为None
+
+    @property
+    def ok(self) -> bool:
+        """是否处理成功"""
+        return self.error is None
+
+
+def _as_paths(item: ImageItem) -> List[Union[str, Path]]:
+    """单个路径或路径序列统一转换为路径列表"""
+    if isinstance(item, (str, Path)):
+        return [item]
+    return list(item)
+
+
+def run_batch(
+        chat: Callable[[List[Union[str, Path]]], Iterable[str]],
+        items: Iterable[ImageItem],
+        concurrency: int,
+        ordered: bool = False
+) -> Generator[BatchResult, None, None]:
+    """
+    以有限并发执行批量对话任务
+
+    同一时刻最多有concurrency个请求在处理,输入按需读取,因此可以传入很长的迭代器。
+    任务中的异常会记录在结果的error字段中,不会中断整个批次。
+
+    Args:
+        chat: 对单个任务的图片列表发起对话并返回输出片段的函数,返回ChatResult时会记录其统计
+        items: 图片路径或路径序列(一个任务多张图片)的可迭代对象
+        concurrency: 最大并发请求数
+        ordered: 为True时按输入顺序返回结果,否则按完成顺序返回
+
+    Returns:
+        生成器,逐个产出BatchResult
+    """
+    concurrency = max(1, concurrency)
+    # 按顺序输出时,先完成的结果需要暂存,限制暂存数量避免慢任务导致内存无限增长
+    window = concurrency * 2 if ordered else concurrency
+    source = enumerate(items)
+
+    def process(index: int, image_paths: List[Union[str, Path]], submitted: float) -> BatchResult:
+        started = time.perf_counter()
+        result = BatchResult(index=index, image_paths=image_paths, queued_time=started - submitted)
+        parts = []
+        try:
+            output = chat(image_paths)
+            for text in output:
+                if result.first_token_time is None:
+                    result.first_token_time = time.perf_counter() - started
+                parts.append(text)
+            result.stats = getattr(output, "stats", None)
+        except Exception as e:
+            result.error = str(e)
+        result.text = "".join(parts)
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ollama-batch") as executor:
+        pending = set()
+        buffered: Dict[int, BatchResult] = {}
+        next_index = 0
+        exhausted = False
+
+        def fill():
+            nonlocal exhausted
+            while not exhausted and len(pending) < concurrency and len(pending) + len(buffered) < window:
+                try:
+                    index, item = next(source)
+                except StopIteration:
+                    exhausted = True
+                    return
+                pending.add(executor.submit(process, index, _as_paths(item), time.perf_counter()))
+
+        try:
+            fill()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                pending.difference_update(done)
+
+                ready = []
+                for future in done:
+                    result = future.result()
+                    if ordered:
+                        buffered[result.index] = result
+                    else:
+                        ready.append(result)
+                if ordered:
+                    while next_index in buffered:
+                        ready.append(buffered.pop(next_index))
+                        next_index += 1
+                else:
+                    ready.sort(key=lambda r: r.index)
+
+                # 先补充新任务再产出结果,避免调用方处理结果时空占并发槽位
+                fill()
+                yield from ready
+        finally:
+            # 调用方提前结束迭代时,不再处理尚未开始的任务
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,70 @@
+# ollama_vision/cancellation.py
+"""请求取消模块"""
+
+import threading
+from typing import Callable, List
+
+from ollama_vision.exceptions import RequestCancelled
+
+
+class CancellationToken:
+    """
+    可以从其他线程取消请求的令牌
+
+    把令牌传给chat()等方法后,在任意线程调用cancel()会立即断开该请求正在使用的连接,
+    阻塞在读取响应上的线程随即以RequestCancelled结束,服务端检测到连接断开后停止生成。
+    一个令牌取消后不能恢复,每个请求应使用新的令牌。
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        """是否已经取消"""
+        return self._event.is_set()
+
+    def cancel(self):
+        """取消请求,可以重复调用"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def register(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        注册取消时执行的回调,已经取消时立即执行
+
+        Args:
+            callback: 回调函数,在调用cancel()的线程中执行
+
+        Returns:
+            注销该回调的函数
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._unregister(callback)
+        callback()
+        return lambda: None
+
+    def _unregister(self, callback: Callable[[], None]):
+        with self._lock:
+            try:
+                self._callbacks.remove(callback)
+            except ValueError:
+                pass
+
+    def raise_if_cancelled(self):
+        """已经取消时抛出RequestCancelled"""
+        if self._event.is_set():
+            raise RequestCancelled("请求已取消")
+
+    def wait(self, timeout: float) -> bool:
+        """等待最多timeout秒,期间被取消时提前返回True"""
+        return self._event.wait(timeout)
@@ -4,15 +4,18 @@
 
 from ollama_vision.client import OllamaVisionClient
 from ollama_vision.exceptions import OllamaClientError
+from ollama_vision.session import ConversationSession
 
 def start_chat():
     """启动一个支持图片上传的交互式聊天界面"""
     client = OllamaVisionClient()
+    session = ConversationSession(client)
     print(f"已连接到Ollama服务,使用{client.model}模型")
     print("\n基础命令:")
     print("- 输入 'quit' 或 'exit' 退出对话")
     print("- 输入 '/upload 图片路径' 上传图片")
     print("- 多个图片路径用空格分隔")
+    print("- 输入 '/reset' 清空对话上下文")
 
     current_images = []
 
@@ -21,6 +24,11 @@ def start_chat():
         if user_input.lower() in ['quit', 'exit']:
             break
 
+        if user_input == '/reset':
+            session.reset()
+            print("已清空对话上下文")
+            continue
+
         if user_input.startswith('/upload '):
             # 处理图片上传
             paths = user_input[8:].split()
@@ -30,7 +38,7 @@ def start_chat():
 
         print("\n助手: ", end="", flush=True)
         try:
-            for text in client.chat(user_input, image_paths=current_images):
+            for text in session.send(user_input, image_paths=current_images):
                 print(text, end="", flush=True)
             # 每次对话后清空图片列表
             current_images = []
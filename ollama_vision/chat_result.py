@@ -0,0 +1,179 @@
+# ollama_vision/chat_result.py
+"""对话结果与耗时统计模块"""
+
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from ollama_vision.stream_decoder import ChatChunk
+
+_NS = 1e9
+
+
+@dataclass
+class ChatStats:
+    """
+    单次对话的耗时与token统计
+
+    服务端字段取自Ollama最后一块响应(单位由纳秒换算为秒),
+    time_to_first_token和elapsed为客户端测量的时间。
+    """
+    model: str = ""
+    done_reason: str = ""
+    total_duration: float = 0.0  # 服务端处理请求的总耗时
+    load_duration: float = 0.0  # 加载模型的耗时
+    prompt_eval_count: int = 0  # 提示词(含图片)的token数
+    prompt_eval_duration: float = 0.0  # 处理提示词的耗时
+    eval_count: int = 0  # 生成的token数
+    eval_duration: float = 0.0  # 生成的耗时
+    time_to_first_token: Optional[float] = None  # 从发送请求到收到第一个输出的时间
+    elapsed: float = 0.0  # 从发送请求到接收完毕的时间
+    cached: bool = False  # 是否为结果缓存重放的回复,此时服务端字段为原始请求的统计
+
+    @property
+    def prompt_eval_rate(self) -> float:
+        """处理提示词的速度(token/秒)"""
+        return self.prompt_eval_count / self.prompt_eval_duration if self.prompt_eval_duration else 0.0
+
+    @property
+    def eval_rate(self) -> float:
+        """生成的速度(token/秒)"""
+        return self.eval_count / self.eval_duration if self.eval_duration else 0.0
+
+    @classmethod
+    def from_response(
+            cls,
+            data: Dict[str, Any],
+            time_to_first_token: Optional[float] = None,
+            elapsed: float = 0.0
+    ) -> "ChatStats":
+        """
+        根据api/chat的最后一块响应创建统计对象
+
+        Args:
+            data: 最后一块响应(done为true)的完整数据
+            time_to_first_token: 客户端测量的首字延迟(秒)
+            elapsed: 客户端测量的总耗时(秒)
+        """
+        return cls(
+            model=data.get("model", ""),
+            done_reason=data.get("done_reason", ""),
+            total_duration=data.get("total_duration", 0) / _NS,
+            load_duration=data.get("load_duration", 0) / _NS,
+            prompt_eval_count=data.get("prompt_eval_count", 0),
+            prompt_eval_duration=data.get("prompt_eval_duration", 0) / _NS,
+            eval_count=data.get("eval_count", 0),
+            eval_duration=data.get("eval_duration", 0) / _NS,
+            time_to_first_token=time_to_first_token,
+            elapsed=elapsed,
+            cached=bool(data.get("cached"))
+        )
+
+
+class _ResultBase:
+    """ChatResult与AsyncChatResult共用的状态"""
+
+    def __init__(self):
+        self.stats: Optional[ChatStats] = None  # 接收完毕后可用,中途停止或服务端未返回统计时为None
+        self.done = False  # 是否已完整接收(收到了服务端的结束块)
+        self.finished = False  # 输出流是否已经结束,服务端未发送结束块就断开时done仍为False
+        self._parts: List[str] = []
+        self._started = time.perf_counter()  # 由mark_sent更新为发送请求的时间,缓存重放时为创建时间
+        self._first_token: Optional[float] = None
+
+    @property
+    def text(self) -> str:
+        """目前为止收到的完整文本"""
+        return "".join(self._parts)
+
+    def mark_sent(self, started: float):
+        """
+        记录发送请求的时间,首字延迟和总耗时从这里开始计算
+
+        Args:
+            started: 第一次发送请求时的time.perf_counter(),与指标中的首字延迟使用同一起点
+        """
+        self._started = started
+
+    def _accept(self, chunk: ChatChunk) -> Optional[str]:
+        """记录一个输出块,返回需要产出的文本"""
+        if chunk.content:
+            if self._first_token is None:
+                self._first_token = time.perf_counter() - self._started
+            self._parts.append(chunk.content)
+        if chunk.done:
+            self._finish(chunk.data)
+        return chunk.content or None
+
+    def _finish(self, data: Optional[Dict[str, Any]]):
+        self.done = True
+        self.finished = True
+        if data is not None:
+            self.stats = ChatStats.from_response(data, self._first_token, time.perf_counter() - self._started)
+
+
+class ChatResult(_ResultBase):
+    """
+    对话的输出流
+
+    像生成器一样迭代得到模型输出的文本片段,接收完毕后可以从stats读取耗时统计。
+    提前停止时调用close()会立即关闭底层连接。
+    """
+
+    def __init__(self, chunks: Iterator[ChatChunk]):
+        """
+        Args:
+            chunks: 逐个产出ChatChunk的生成器,结束块带有完整的响应数据
+        """
+        super().__init__()
+        self._chunks = chunks
+
+    def __iter__(self) -> "ChatResult":
+        return self
+
+    def __next__(self) -> str:
+        for chunk in self._chunks:
+            content = self._accept(chunk)
+            if content:
+                return content
+        self.finished = True
+        raise StopIteration
+
+    def close(self):
+        """停止接收并关闭底层连接"""
+        self._chunks.close()
+
+    def collect(self) -> str:
+        """读取全部输出并返回完整文本"""
+        for _ in self:
+            pass
+        return self.text
+
+
+class AsyncChatResult(_ResultBase):
+    """ChatResult的异步版本,用async for迭代,提前停止时调用aclose()"""
+
+    def __init__(self, chunks: AsyncIterator[ChatChunk]):
+        super().__init__()
+        self._chunks = chunks
+
+    def __aiter__(self) -> "AsyncChatResult":
+        return self
+
+    async def __anext__(self) -> str:
+        async for chunk in self._chunks:
+            content = self._accept(chunk)
+            if content:
+                return content
+        self.finished = True
+        raise StopAsyncIteration
+
+    async def aclose(self):
+        """停止接收并关闭底层连接"""
+        await self._chunks.aclose()
+
+    async def collect(self) -> str:
+        """读取全部输出并返回完整文本"""
+        async for _ in self:
+            pass
+        return self.text
@@ -1,98 +1,115 @@
 # ollama_vision/client.py
 
-import requests
 import json
 import logging
-from typing import Optional, Dict, Generator, List, Union, Any
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Optional, Dict, Generator, Iterable, Iterator, List, Sequence, Set, Tuple, Union, Any
 from pathlib import Path
-from dataclasses import dataclass
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import replace
+
+from ollama_vision.config import (
+    DEFAULT_BASE_URL, DEFAULT_MODEL, DEFAULT_TEMPERATURE, CHAT_ENDPOINT, TAGS_ENDPOINT, SHOW_ENDPOINT, PS_ENDPOINT,
+    DEFAULT_POOL_SIZE, DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT, DEFAULT_SHOW_WORKERS,
+    DEFAULT_MODEL_CACHE_PATH, DEFAULT_BATCH_CONCURRENCY, STREAM_CHUNK_SIZE, DEFAULT_KEEP_ALIVE, GENERATE_ENDPOINT,
+    ENDPOINT_HEALTH_INTERVAL, IDEMPOTENT_ENDPOINTS
+)
+from ollama_vision.exceptions import APIError, CircuitOpenError, ConfigurationError, RequestCancelled
+from ollama_vision.http_pool import ConnectionPool, PoolStats
+from ollama_vision.cancellation import CancellationToken
+from ollama_vision.image_utils import encode_image, validate_image
+from ollama_vision.request_body import FileImage, StreamingJSONBody
+from ollama_vision.stream_decoder import ChatChunk, iter_chat_stream
+from ollama_vision.chat_result import ChatResult
+from ollama_vision.metrics import ClientMetrics, MetricsRegistry, get_metrics_registry
+from ollama_vision.result_cache import ResultCache, ResultCacheStats, hash_file, make_result_key
+from ollama_vision.endpoints import Endpoint, EndpointPool, EndpointStats
+from ollama_vision.retry import RetryPolicy, RetryStats
+from ollama_vision.image_preprocess import PreprocessOptions
+from ollama_vision.models import ModelInfo, PreloadResult, select_vision_models
+from ollama_vision.model_cache import ModelMetadataCache, CacheStats, split_cached
+from ollama_vision.batch import BatchResult, ImageItem, run_batch
+
+if TYPE_CHECKING:
+    import requests
 
-from ollama_vision.config import DEFAULT_BASE_URL, DEFAULT_MODEL, DEFAULT_TEMPERATURE, CHAT_ENDPOINT
-from ollama_vision.exceptions import APIError, ConfigurationError
-from ollama_vision.image_utils import encode_image
-
-# 配置日志
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 
-@dataclass
-class ModelInfo:
-    """模型信息数据类"""
-    name: str
-    description: str = ""
-    format: str = ""
-    family: str = ""
-    tag: str = "latest"
-    size: int = 0
-    capabilities: Dict[str, Any] = None
-    parameters: Dict[str, Any] = None
-
-    VISION_CAPABLE_FAMILIES = {
-        'llama', 'llava', 'bakllava', 'mixtral', 'yi', 'qwen'  # 支持视觉的模型系列
-    }
+def encode_images(
+        image_paths: List[Union[str, Path]],
+        preprocess: Optional[PreprocessOptions] = None,
+        stream_from_disk: bool = False
+) -> List[Union[str, FileImage]]:
+    """
+    将多个图片文件编码为base64字符串
 
-    VISION_CAPABILITY_INDICATORS = {
-        'vision', 'multimodal', 'image', 'visual', 'img', 'images'  # 可能表示视觉能力的关键字
-    }
+    Args:
+        image_paths: 图片文件路径列表
+        preprocess: 图片预处理参数(可选)
+        stream_from_disk: 为True且不需要预处理时只检查文件,返回在发送时才读取编码的FileImage
 
-    @property
-    def display_name(self) -> str:
-        """返回用于显示的模型名称"""
-        base_name = self.name.split(":")[0]
-        family = f"[{self.family}]" if self.family else ""
-        size = f"{self.size / 1024 / 1024 / 1024:.1f}GB" if self.size else ""
-        return f"{base_name} {family} {size}".strip()
+    Returns:
+        base64编码的图片字符串(或FileImage)列表
 
-    @property
-    def supports_vision(self) -> bool:
-        """检查是否支持视觉功能,使用更宽松的检测逻辑"""
+    Raises:
+        APIError: 任一图片处理失败时
+    """
+    images = []
+    for path in image_paths:
         try:
-            # 1. 检查模型家族
-            model_family = self.family.lower()
-            name_lower = self.name.lower()
-            for family in self.VISION_CAPABLE_FAMILIES:
-                if family in model_family or family in name_lower:
-                    logger.debug(f"Model {self.name} supports vision based on family/name match with {family}")
-                    return True
-
-            # 2. 检查capabilities
-            if self.capabilities:
-                for indicator in self.VISION_CAPABILITY_INDICATORS:
-                    if indicator in self.capabilities:
-                        value = self.capabilities[indicator]
-                        if isinstance(value, bool) and value:
-                            logger.debug(f"Model {self.name} supports vision based on capability {indicator}")
-                            return True
-                        elif isinstance(value, (str, dict)):
-                            logger.debug(f"Model {self.name} supports vision based on capability {indicator} presence")
-                            return True
-
-            # 3. 检查parameters
-            if self.parameters:
-                for indicator in self.VISION_CAPABILITY_INDICATORS:
-                    if indicator in self.parameters:
-                        value = self.parameters[indicator]
-                        if isinstance(value, bool) and value:
-                            logger.debug(f"Model {self.name} supports vision based on parameter {indicator}")
-                            return True
-                        elif isinstance(value, (str, dict)):
-                            logger.debug(f"Model {self.name} supports vision based on parameter {indicator} presence")
-                            return True
-
-            # 4. 检查描述
-            desc_lower = self.description.lower()
-            for indicator in self.VISION_CAPABILITY_INDICATORS:
-                if indicator in desc_lower:
-                    logger.debug(f"Model {self.name} supports vision based on description containing {indicator}")
-                    return True
-
-            logger.debug(f"Model {self.name} does not appear to support vision")
-            return False
-
+            if stream_from_disk and preprocess is None:
+                validate_image(path)
+                images.append(FileImage(Path(path)))
+            else:
+                images.append(encode_image(path, preprocess=preprocess))
         except Exception as e:
-            logger.error(f"Error checking vision support for model {self.name}: {e}")
-            return False
+            raise APIError(f"处理图片 {path} 失败: {str(e)}")
+    return images
+
+
+def build_chat_messages(
+        prompt: str,
+        images: Optional[List[Union[str, FileImage]]] = None,
+        system_prompt: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    构建api/chat请求的messages列表
+
+    Args:
+        prompt: 用户输入的提示词
+        images: base64编码的图片(或FileImage)列表(可选)
+        system_prompt: 系统提示词(可选)
+    """
+    messages = []
+
+    # 添加系统提示
+    if system_prompt:
+        messages.append({
+            "role": "system",
+            "content": system_prompt
+        })
+
+    # 处理用户消息
+    user_message = {
+        "role": "user",
+        "content": prompt
+    }
+    if images:
+        user_message["images"] = images
+
+    messages.append(user_message)
+    return messages
+
+
+def extract_assistant_content(response_data: Dict[str, Any]) -> Optional[str]:
+    """从api/chat的单个响应块中取出助手回复的文本,没有时返回None"""
+    message = response_data.get("message")
+    if message and message.get("role") == "assistant" and "content" in message:
+        return message["content"]
+    return None
 
 
 class OllamaVisionClient:
@@ -100,43 +117,333 @@ class OllamaVisionClient:
 
     def __init__(
             self,
-            base_url: str = DEFAULT_BASE_URL,
+            base_url: Union[str, Sequence[str]] = DEFAULT_BASE_URL,
             model: str = DEFAULT_MODEL,
-            temperature: float = DEFAULT_TEMPERATURE
+            temperature: float = DEFAULT_TEMPERATURE,
+            pool_size: int = DEFAULT_POOL_SIZE,
+            http_keep_alive: bool = True,
+            connect_timeout: Optional[float] = DEFAULT_CONNECT_TIMEOUT,
+            read_timeout: Optional[float] = DEFAULT_READ_TIMEOUT,
+            show_workers: int = DEFAULT_SHOW_WORKERS,
+            model_cache_path: Optional[Union[str, Path]] = DEFAULT_MODEL_CACHE_PATH,
+            preprocess_images: bool = False,
+            image_options: Optional[PreprocessOptions] = None,
+            stream_request_body: bool = False,
+            stream_chunk_size: int = STREAM_CHUNK_SIZE,
+            coalesce_chars: int = 0,
+            coalesce_interval: float = 0.0,
+            keep_alive: Optional[Union[str, int]] = DEFAULT_KEEP_ALIVE,
+            collect_metrics: bool = True,
+            metrics_registry: Optional[MetricsRegistry] = None,
+            result_cache: Optional[Union[str, Path, ResultCache]] = None,
+            health_check_interval: float = ENDPOINT_HEALTH_INTERVAL,
+            retry_policy: Optional[RetryPolicy] = None
     ):
         """
         初始化Ollama视觉模型客户端
 
         Args:
-            base_url: Ollama服务的基础URL
+            base_url: Ollama服务的基础URL,传入多个URL时每个请求分配给负载最低的服务
             model: 要使用的模型名称
             temperature: 生成温度参数(0-1之间)
+            pool_size: 连接池大小,即对每个服务保留的最大长连接数
+            http_keep_alive: 是否复用HTTP连接
+            connect_timeout: 建立连接的超时时间(秒)
+            read_timeout: 两次读取响应数据之间的超时时间(秒)。非流式的对话和预加载在生成或加载完成前
+                不返回任何数据,这两类请求不限制读取时间
+            show_workers: 并发获取模型详情(api/show)的最大线程数
+            model_cache_path: 模型元数据磁盘缓存文件路径,为None时不使用磁盘缓存
+            preprocess_images: 是否在发送前将图片缩放到模型的目标分辨率并重新编码
+            image_options: 自定义的图片预处理参数,默认按当前模型自动选择
+            stream_request_body: 是否以分块传输发送请求体,图片在发送时才从磁盘增量编码,
+                内存占用与图片大小和数量无关(启用预处理时图片已经足够小,不使用流式发送)
+            stream_chunk_size: 读取流式响应的缓冲区大小
+            coalesce_chars: 将细碎的token合并到至少该字符数再输出,为0时逐token输出
+            coalesce_interval: 合并输出时最长等待的时间(秒),为0时不限制
+            keep_alive: 模型在显存中的默认保留时间(如"10m"、3600、-1),None表示使用服务端默认值
+            collect_metrics: 是否记录请求数、错误数和耗时等指标
+            metrics_registry: 记录指标的注册表,默认为进程内共享的注册表
+            result_cache: chat()的结果缓存,可以是数据库文件路径或已配置的ResultCache,
+                为None时不缓存。相同模型版本、提示词、图片内容和参数的请求直接返回保存的回复
+            health_check_interval: 有多个服务时后台健康检查的间隔(秒)
+            retry_policy: 请求失败时的重试策略,默认为RetryPolicy(),RetryPolicy(max_attempts=1)表示不重试
         """
-        self.base_url = base_url.rstrip("/")
+        urls = [base_url] if isinstance(base_url, str) else list(base_url)
+        self.base_url = urls[0].rstrip("/")  # 第一个服务的地址,用于显示
         self.model = model
         self.temperature = temperature
         self._models_cache: List[ModelInfo] = []
         self._last_error: Optional[str] = None
+        self.show_workers = show_workers
+        self._model_cache = ModelMetadataCache(model_cache_path) if model_cache_path else None
+        self.preprocess_images = preprocess_images
+        self.image_options = image_options
+        self.stream_request_body = stream_request_body
+        self.stream_chunk_size = stream_chunk_size
+        self.coalesce_chars = coalesce_chars
+        self.coalesce_interval = coalesce_interval
+        self.keep_alive = keep_alive
+        self._keep_alive_overrides: Dict[str, Union[str, int]] = {}
+        self._preload_lock = threading.Lock()
+        self._closed = False
+        self._preload_executor: Optional[ThreadPoolExecutor] = None
+        self._preloads: Dict[str, Future] = {}
+        self._metrics = ClientMetrics(metrics_registry or get_metrics_registry()) if collect_metrics else None
+        # 传入路径时由客户端创建并负责关闭,传入实例时由调用方管理
+        self._owns_result_cache = result_cache is not None and not isinstance(result_cache, ResultCache)
+        self._result_cache = ResultCache(result_cache) if self._owns_result_cache else result_cache
+        self._model_digests: Dict[str, str] = {}
+        self.retry_policy = retry_policy or RetryPolicy()
+        self._retry_stats = RetryStats()
+        self._retry_lock = threading.Lock()
+        self._http = ConnectionPool(
+            pool_size=pool_size,
+            keep_alive=http_keep_alive,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout
+        )
+        self._endpoints = EndpointPool(urls, probe=self._probe_endpoint, health_interval=health_check_interval)
+        self._endpoints.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """关闭客户端持有的所有HTTP连接"""
+        with self._preload_lock:
+            self._closed = True
+            if self._preload_executor is not None:
+                self._preload_executor.shutdown(wait=False, cancel_futures=True)
+        if self._owns_result_cache:
+            self._result_cache.close()
+        self._endpoints.stop()
+        self._http.close()
 
     @property
     def last_error(self) -> Optional[str]:
         """返回最后一次错误信息"""
         return self._last_error
 
+    @property
+    def connection_stats(self) -> PoolStats:
+        """返回连接池的连接复用统计"""
+        return self._http.stats
+
+    @property
+    def image_preprocess_options(self) -> Optional[PreprocessOptions]:
+        """当前模型使用的图片预处理参数,未启用预处理时返回None"""
+        if not self.preprocess_images:
+            return None
+        return self.image_options or PreprocessOptions.for_model(self.model)
+
+    @property
+    def model_cache_stats(self) -> Optional[CacheStats]:
+        """返回模型元数据磁盘缓存的累计命中统计,未启用缓存时返回None"""
+        return self._model_cache.stats if self._model_cache else None
+
+    @property
+    def endpoint_stats(self) -> List[EndpointStats]:
+        """返回各服务的负载与健康状态"""
+        return self._endpoints.stats()
+
+    @property
+    def retry_stats(self) -> RetryStats:
+        """返回重试与熔断的累计统计"""
+        with self._retry_lock:
+            return replace(self._retry_stats)
+
+    @property
+    def result_cache_stats(self) -> Optional[ResultCacheStats]:
+        """返回结果缓存的累计命中统计,未启用缓存时返回None"""
+        return self._result_cache.stats if self._result_cache is not None else None
+
+    @property
+    def metrics(self) -> Optional[MetricsRegistry]:
+        """返回记录指标的注册表,未启用指标时返回None"""
+        return self._metrics.registry if self._metrics else None
+
+    def _probe_endpoint(self, url: str) -> List[str]:
+        """健康检查: 通过api/ps确认服务可用并返回已加载的模型"""
+        timeout = self._http.timeout[0] or DEFAULT_CONNECT_TIMEOUT
+        response = self._http.request("GET", f"{url}/{PS_ENDPOINT}", timeout=(timeout, timeout))
+        response.raise_for_status()
+        return [model_data.get("name", "") for model_data in response.json().get("models", [])]
+
+    def _send(
+            self,
+            endpoint: str,
+            data: Optional[Dict] = None,
+            method: str = "POST",
+            stream: bool = True,
+            body: Optional[StreamingJSONBody] = None,
+            route_model: str = "",
+            cancel: Optional[CancellationToken] = None,
+            target: Optional[Endpoint] = None
+    ) -> Tuple["requests.Response", Endpoint, float]:
+        """
+        选择服务并发送请求,失败时按重试策略等待后重新选择服务发送
+
+        Args:
+            route_model: 请求会加载的模型(chat和generate),只发送到安装了该模型的服务,
+                服务返回404(模型不存在)时立即换一个服务重新发送
+            cancel: 取消令牌,重试等待期间同样可以取消
+            target: 指定处理请求的服务,重试时也发送到该服务
+
+        Returns:
+            (响应, 处理请求的服务, 开始时间),调用方读取完响应后需要释放该服务
+        """
+        import requests  # 第一次发送请求时才导入
+
+        policy = self.retry_policy
+        idempotent = method == "GET" or endpoint in IDEMPOTENT_ENDPOINTS
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                server = self._endpoints.acquire(route_model, target)
+            except CircuitOpenError as e:
+                # 重试期间服务熔断时同样算作重试用尽
+                self._count_retry("exhausted" if attempt > 1 else "circuit_rejections")
+                if self._metrics:
+                    self._metrics.record_error(route_model, endpoint, e, kind="circuit_open")
+                raise
+            started = time.perf_counter()
+            try:
+                response = self._make_request(endpoint, data, method, stream, body, server, cancel)
+            except RequestCancelled:
+                self._endpoints.release(server, True, time.perf_counter() - started, route_model)
+                raise
+            except APIError as e:
+                # HTTP错误说明服务可以连接,只有由连接失败转换来的错误计入失败
+                connected = not isinstance(e.__cause__, requests.RequestException)
+                self._endpoints.release(server, connected, time.perf_counter() - started, route_model)
+                if (e.status_code == 404 and route_model and target is None
+                        and self._endpoints.mark_missing(server, route_model)):
+                    # 该服务没有安装请求的模型,服务端未处理请求,不等待直接换一个服务
+                    self._count_retry("retries")
+                    if self._metrics:
+                        self._metrics.retries.inc(route_model, endpoint)
+                    logger.warning(f"Model {route_model} not found on {server.url}, trying another endpoint")
+                    continue
+                if not policy.should_retry(e, attempt, idempotent):
+                    if attempt > 1:
+                        self._count_retry("exhausted")
+                    raise
+                delay = policy.delay(attempt)
+                self._count_retry("retries")
+                if self._metrics:
+                    self._metrics.retries.inc(route_model, endpoint)
+                logger.warning(f"{endpoint} attempt {attempt} failed ({e}), retrying in {delay:.2f}s")
+                if cancel is None:
+                    time.sleep(delay)
+                elif cancel.wait(delay):
+                    raise RequestCancelled("请求已取消")
+                continue
+            except BaseException:
+                # 发送请求体时读取图片失败等不是由服务引起的错误,释放服务但不计入失败
+                self._endpoints.release(server, True, time.perf_counter() - started, route_model)
+                raise
+            if attempt > 1:
+                self._count_retry("recovered")
+            return response, server, started
+
+    def _count_retry(self, field_name: str):
+        with self._retry_lock:
+            setattr(self._retry_stats, field_name, getattr(self._retry_stats, field_name) + 1)
+
+    @contextmanager
+    def _request(
+            self,
+            endpoint: str,
+            data: Optional[Dict] = None,
+            stream: bool = True,
+            body: Optional[StreamingJSONBody] = None,
+            route_model: str = "",
+            cancel: Optional[CancellationToken] = None
+    ) -> Iterator["requests.Response"]:
+        """
+        发送请求并在读取响应期间占用所选服务,退出时关闭响应并按结果更新服务的负载与健康状态
+
+        开始读取响应后出现的错误不再重试。
+        """
+        import requests
+
+        response, server, started = self._send(
+            endpoint, data, stream=stream, body=body, route_model=route_model, cancel=cancel
+        )
+        connected = True
+        try:
+            yield response
+        except requests.RequestException as e:
+            if cancel is not None and cancel.cancelled:
+                # 取消时断开的连接不计入服务的失败
+                raise RequestCancelled("请求已取消") from e
+            # 读取流式响应时连接中断
+            connected = False
+            raise
+        finally:
+            # 无论是否读完都关闭响应,使连接及时归还连接池
+            response.close()
+            self._endpoints.release(server, connected, time.perf_counter() - started, route_model)
+
     def _make_request(
             self,
             endpoint: str,
             data: Optional[Dict] = None,
             method: str = "POST",
-            stream: bool = True
-    ) -> requests.Response:
-        """发送HTTP请求到指定的endpoint"""
-        url = f"{self.base_url}/{endpoint}"
+            stream: bool = True,
+            body: Optional[StreamingJSONBody] = None,
+            server: Optional[Endpoint] = None,
+            cancel: Optional[CancellationToken] = None,
+            target: Optional[Endpoint] = None
+    ) -> "requests.Response":
+        """
+        发送HTTP请求到指定的endpoint,指定body时以分块传输发送流式请求体
+
+        非流式请求在这里记录耗时,流式请求由读取响应的一方在读完后记录。
+        未指定server时在这里选择服务并按重试策略重试,流式请求需要由调用方通过_request发送,
+        使服务的负载计数覆盖读取响应的整个过程。target为要求处理请求的服务,未指定时按负载选择。
+        """
+        if server is None:
+            model = (data.get("model") or "") if data and endpoint == GENERATE_ENDPOINT else ""
+            response, server, started = self._send(endpoint, data, method, stream, body, model, cancel, target)
+            self._endpoints.release(server, True, time.perf_counter() - started, model)
+            return response
+
+        import requests
+
+        url = f"{server.url}/{endpoint}"
+        metrics = self._metrics
+        model = (data.get("model") or data.get("name") or "") if data else ""
+        if metrics:
+            metrics.requests.inc(model, endpoint)
+        # 非流式的对话和预加载在完成前不发送任何数据,长时间的生成不能按读取超时中断
+        timeout = self._http.timeout
+        if not stream and endpoint in (CHAT_ENDPOINT, GENERATE_ENDPOINT):
+            timeout = (timeout[0], None)
+        started = time.perf_counter()
         try:
             if method == "GET":
-                response = requests.get(url)
+                stream = False
+                response = self._http.request("GET", url, cancel=cancel)
+            elif body is not None:
+                response = self._http.request(
+                    "POST", url, cancel=cancel, data=iter(body), stream=stream, timeout=timeout,
+                    headers={"Content-Type": "application/json"}
+                )
+                if metrics:
+                    metrics.payload_bytes.observe(body.bytes_sent, model, endpoint)
             else:
-                response = requests.post(url, json=data, stream=stream)
+                payload = json.dumps(data).encode("utf-8")
+                if metrics:
+                    metrics.payload_bytes.observe(len(payload), model, endpoint)
+                response = self._http.request(
+                    "POST", url, cancel=cancel, data=payload, stream=stream, timeout=timeout,
+                    headers={"Content-Type": "application/json"}
+                )
 
             if not response.ok:
                 error_msg = response.text
@@ -146,11 +453,21 @@ class OllamaVisionClient:
                         error_msg = error_data['error']
                 except:
                     pass
-                raise APIError(f"API错误 ({response.status_code}): {error_msg}")
+                response.close()
+                error = APIError(f"API错误 ({response.status_code}): {error_msg}", status_code=response.status_code)
+                if metrics:
+                    metrics.record_error(model, endpoint, error)
+                raise error
+            if metrics and not stream:
+                metrics.latency.observe(time.perf_counter() - started, model, endpoint)
             return response
         except requests.RequestException as e:
+            if cancel is not None and cancel.cancelled:
+                raise RequestCancelled("请求已取消") from e
             self._last_error = str(e)
-            raise APIError(f"请求失败: {str(e)}")
+            if metrics:
+                metrics.record_error(model, endpoint, e)
+            raise APIError(f"请求失败: {str(e)}") from e
 
     def get_models(self, force_refresh: bool = False) -> List[ModelInfo]:
         """
@@ -165,73 +482,270 @@ class OllamaVisionClient:
         if not force_refresh and self._models_cache:
             return self._models_cache
 
-        try:
-            # 获取所有模型列表
-            response = self._make_request("api/tags", method="GET")
-            data = response.json()
-
-            logger.debug(f"Found {len(data.get('models', []))} total models")
-
-            models = []
-            for model_data in data.get('models', []):
-                name = model_data.get('name', '')
-
-                # 获取模型详细信息
-                model_info = self._make_request(
-                    "api/show",
-                    data={"name": name},
-                    method="POST",
-                    stream=False
-                ).json()
-
-                logger.debug(f"Model details for {name}: {json.dumps(model_info, indent=2)}")
-
-                # 创建模型信息对象
-                model = ModelInfo(
-                    name=name,
-                    description=model_info.get("description", ""),
-                    format=model_info.get("format", ""),
-                    family=model_info.get("families", [""])[0],
-                    size=model_info.get("size", 0),
-                    capabilities=model_info.get("capabilities", {}),
-                    parameters=model_info.get("parameters", {})
-                )
+        tags, sources = self._fetch_tags()
+        logger.debug(f"Found {len(tags)} total models")
+
+        # 先查磁盘缓存,只有新增或变化的模型才需要调用api/show
+        all_models, to_fetch = split_cached(self._model_cache, tags)
+
+        # 并发获取模型详细信息,单个模型失败时跳过该模型
+        if to_fetch:
+            workers = max(1, min(self.show_workers, len(to_fetch)))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ollama-show") as executor:
+                # api/show发送到列出该模型的服务,其他服务可能没有安装
+                futures = {
+                    executor.submit(self._fetch_model_info, *item, target=sources[item[0]]): item[0]
+                    for item in to_fetch
+                }
+                for future in as_completed(futures):
+                    name = futures[future]
+                    try:
+                        model = future.result()
+                    except Exception as e:
+                        self._last_error = str(e)
+                        logger.warning(f"Skipped model {name}, failed to get details: {e}")
+                        continue
+                    all_models.append(model)
+                    if self._model_cache:
+                        self._model_cache.put(model)
 
-                # 使用改进后的视觉能力检测
-                if model.supports_vision:
-                    models.append(model)
-                    logger.info(f"Added vision-capable model: {model.name}")
-                else:
-                    logger.debug(f"Skipped non-vision model: {model.name}")
+        if self._model_cache:
+            self._model_cache.retain(model_data['name'] for model_data in tags)
+            self._model_cache.save()
 
-            # 按照family和name排序
-            models.sort(key=lambda m: (m.family or "zzzz", m.name))
-            self._models_cache = models
+        models = select_vision_models(all_models)
+        self._models_cache = models
+        return models
 
-            logger.info(f"Found {len(models)} vision-capable models")
-            return models
+    def cached_models(self) -> List[ModelInfo]:
+        """
+        返回上一次已知的模型列表,不发送任何请求
 
-        except Exception as e:
-            self._last_error = str(e)
-            logger.error(f"Error getting models: {e}")
-            raise APIError(f"获取模型列表失败: {str(e)}")
+        优先返回本次运行中get_models的结果,其次是磁盘缓存中保存的模型,
+        供界面启动时在后台刷新完成前先显示。
+
+        Returns:
+            支持vision功能的模型信息列表,没有已知模型时为空列表
+        """
+        if self._models_cache:
+            return self._models_cache
+        if self._model_cache:
+            return select_vision_models(self._model_cache.models())
+        return []
+
+    def _fetch_tags(self) -> Tuple[List[Dict[str, Any]], Dict[str, Endpoint]]:
+        """
+        向每个服务获取api/tags,记录各服务安装的模型并更新模型摘要
+
+        只查询健康的服务。各服务安装的模型可以不同,返回的模型列表为所有服务的并集。
+        同一模型在各服务上的摘要不一致时不记录摘要,该模型的请求不使用结果缓存。
+        部分服务获取失败时跳过这些服务,全部失败时抛出APIError。
+
+        Returns:
+            (模型列表, 模型名称 -> 列出该模型的第一个服务)
+        """
+        def fetch(server: Endpoint) -> List[Dict[str, Any]]:
+            response = self._make_request(TAGS_ENDPOINT, method="GET", target=server)
+            return [model_data for model_data in response.json().get('models', []) if model_data.get('name')]
+
+        servers = self._endpoints.available()
+        workers = max(1, min(self.show_workers, len(servers)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ollama-tags") as executor:
+            futures = [(server, executor.submit(fetch, server)) for server in servers]
+
+        tags: Dict[str, Dict[str, Any]] = {}
+        sources: Dict[str, Endpoint] = {}
+        digests: Dict[str, Set[str]] = {}
+        error = None
+        for server, future in futures:
+            try:
+                server_tags = future.result()
+            except Exception as e:
+                error = e
+                self._last_error = str(e)
+                logger.warning(f"Error getting models from {server.url}: {e}")
+                continue
+            self._endpoints.set_installed(
+                server, {model_data['name']: model_data.get('digest', '') for model_data in server_tags}
+            )
+            for model_data in server_tags:
+                tags.setdefault(model_data['name'], model_data)
+                sources.setdefault(model_data['name'], server)
+                digests.setdefault(model_data['name'], set()).add(model_data.get('digest', ''))
+        if not sources and error is not None:
+            logger.error(f"Error getting models: {error}")
+            raise APIError(f"获取模型列表失败: {str(error)}")
+
+        self._model_digests = {name: values.pop() if len(values) == 1 else "" for name, values in digests.items()}
+        return list(tags.values()), sources
+
+    def _fetch_model_info(
+            self,
+            name: str,
+            digest: str = "",
+            modified_at: str = "",
+            target: Optional[Endpoint] = None
+    ) -> ModelInfo:
+        """
+        通过api/show获取单个模型的详细信息
+
+        Args:
+            name: 模型名称
+            digest: api/tags返回的模型摘要
+            modified_at: api/tags返回的模型修改时间
+            target: 发送请求的服务,应为列出了该模型的服务,未指定时按负载选择
+
+        Returns:
+            模型信息对象
+        """
+        model_info = self._make_request(
+            SHOW_ENDPOINT,
+            data={"name": name},
+            method="POST",
+            stream=False,
+            target=target
+        ).json()
+
+        logger.debug(f"Model details for {name}: {json.dumps(model_info, indent=2)}")
+
+        # 创建模型信息对象
+        return ModelInfo.from_show(name, model_info, digest=digest, modified_at=modified_at)
+
+    def _model_digest(self, model_name: str) -> Optional[str]:
+        """
+        返回模型的摘要,未知时通过api/tags获取
+
+        获取失败、模型不存在或各服务上的模型版本不一致时返回None。
+        """
+        if model_name not in self._model_digests:
+            try:
+                self._fetch_tags()
+            except APIError as e:
+                logger.warning(f"Failed to get digest of model {model_name}: {e}")
+                return None
+        return self._model_digests.get(model_name) or None
+
+    def _result_key(
+            self,
+            prompt: str,
+            image_paths: Optional[List[Union[str, Path]]],
+            system_prompt: Optional[str]
+    ) -> Optional[str]:
+        """生成结果缓存键,无法确定模型版本或读取图片时返回None,本次请求不使用缓存"""
+        digest = self._model_digest(self.model)
+        if digest is None:
+            return None
+        try:
+            image_hashes = [hash_file(path) for path in image_paths or ()]
+        except OSError:
+            return None
+        preprocess = self.image_preprocess_options
+        options = {
+            "temperature": self.temperature,
+            "preprocess": preprocess.cache_tag if preprocess else None,
+        }
+        return make_result_key(self.model, digest, system_prompt, prompt, image_hashes, options)
 
-    def set_model(self, model_name: str):
+    def set_model(self, model_name: str, preload: bool = False):
         """
         切换使用的模型
 
         Args:
             model_name: 模型名称
+            preload: 是否在后台预加载该模型,使切换后的第一次请求不必等待模型加载
         """
         self.model = model_name
+        if preload:
+            self.preload_model(model_name)
+
+    def set_keep_alive(self, model_name: str, keep_alive: Optional[Union[str, int]]):
+        """
+        设置单个模型在显存中的保留时间
+
+        Args:
+            model_name: 模型名称
+            keep_alive: 保留时间(如"10m"、3600、-1),None表示恢复使用客户端的默认值
+        """
+        if keep_alive is None:
+            self._keep_alive_overrides.pop(model_name, None)
+        else:
+            self._keep_alive_overrides[model_name] = keep_alive
+
+    def keep_alive_for(self, model_name: str) -> Optional[Union[str, int]]:
+        """返回指定模型的保留时间,未设置时返回None"""
+        return self._keep_alive_overrides.get(model_name, self.keep_alive)
+
+    def preload_model(self, model_name: Optional[str] = None, background: bool = True) -> "Future[PreloadResult]":
+        """
+        预加载模型到显存
+
+        向api/generate发送不含提示词的请求,服务端只加载模型而不生成内容。
+        同一模型正在预加载时直接返回已有的任务。
+
+        Args:
+            model_name: 模型名称,默认为当前模型
+            background: 是否在后台线程中执行,为False时等待加载完成后返回
+
+        Returns:
+            结果为PreloadResult的Future,预加载失败或客户端已关闭时结果中包含错误信息
+        """
+        model_name = model_name or self.model
+        with self._preload_lock:
+            if self._closed:
+                future = Future()
+                future.set_result(PreloadResult(model=model_name, error="客户端已关闭"))
+                return future
+            future = self._preloads.get(model_name)
+            if future is None or future.done():
+                if self._preload_executor is None:
+                    self._preload_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ollama-preload")
+                future = self._preload_executor.submit(self._preload, model_name)
+                self._preloads[model_name] = future
+        if not background:
+            future.result()
+        return future
+
+    def preload_status(self, model_name: Optional[str] = None) -> Optional[PreloadResult]:
+        """
+        返回模型最近一次预加载的结果
+
+        Args:
+            model_name: 模型名称,默认为当前模型
+
+        Returns:
+            预加载结果,尚未预加载或仍在加载中时返回None
+        """
+        future = self._preloads.get(model_name or self.model)
+        if future is None or not future.done() or future.cancelled():
+            return None
+        return future.result()
+
+    def _preload(self, model_name: str) -> PreloadResult:
+        """执行预加载请求"""
+        data = {"model": model_name, "stream": False}
+        keep_alive = self.keep_alive_for(model_name)
+        if keep_alive is not None:
+            data["keep_alive"] = keep_alive
+
+        started = time.perf_counter()
+        try:
+            response = self._make_request(GENERATE_ENDPOINT, data, stream=False)
+            result = PreloadResult.from_response(model_name, response.json(), time.perf_counter() - started)
+            logger.info(f"Preloaded model {model_name} in {result.load_duration:.2f}s")
+        except Exception as e:
+            self._last_error = str(e)
+            result = PreloadResult(model=model_name, elapsed=time.perf_counter() - started, error=str(e))
+            logger.warning(f"Failed to preload model {model_name}: {e}")
+        return result
 
     def chat(
             self,
             prompt: str,
             image_paths: Optional[List[Union[str, Path]]] = None,
             system_prompt: Optional[str] = None,
-            stream: bool = True
-    ) -> Generator[str, None, None]:
+            stream: bool = True,
+            cancel: Optional[CancellationToken] = None
+    ) -> ChatResult:
         """
         与模型进行对话
 
@@ -240,39 +754,84 @@ class OllamaVisionClient:
             image_paths: 图片文件路径列表(可选)
             system_prompt: 系统提示词(可选)
             stream: 是否使用流式输出
+            cancel: 取消令牌,在其他线程取消时立即断开连接,迭代以RequestCancelled结束
 
         Returns:
-            生成器,用于获取模型的输出
+            可迭代的对话结果,逐段产出模型的输出,接收完毕后可从stats读取耗时统计
         """
-        messages = []
-
-        # 添加系统提示
-        if system_prompt:
-            messages.append({
-                "role": "system",
-                "content": system_prompt
-            })
+        def chunks() -> Generator[ChatChunk, None, None]:
+            cache = self._result_cache
+            key = self._result_key(prompt, image_paths, system_prompt) if cache is not None else None
+            if key is not None:
+                cached = cache.get(key)
+                if self._metrics:
+                    self._metrics.result_cache.inc(self.model, "hit" if cached else "miss")
+                if cached:
+                    # 命中时按流式输出的形式重放,cached标记会出现在ChatStats中
+                    text, final_data = cached
+                    if text:
+                        yield ChatChunk(content=text)
+                    yield ChatChunk(done=True, data={**final_data, "cached": True})
+                    return
+
+            # 图片在开始迭代时才编码,与发送请求一样延迟执行
+            images = None
+            if image_paths:
+                started = time.perf_counter()
+                images = encode_images(
+                    image_paths, self.image_preprocess_options, stream_from_disk=self.stream_request_body
+                )
+                if self._metrics:
+                    self._metrics.encode_time.observe(time.perf_counter() - started, self.model)
+            messages = build_chat_messages(prompt, images, system_prompt)
+            if key is None:
+                yield from self._iter_chat_chunks(messages, stream, cancel, result.mark_sent)
+                return
+
+            # 只保存完整接收的回复,出错或中途停止时不写入缓存
+            parts = []
+            for chunk in self._iter_chat_chunks(messages, stream, cancel, result.mark_sent):
+                if chunk.content:
+                    parts.append(chunk.content)
+                if chunk.done:
+                    cache.put(key, self.model, "".join(parts), chunk.data)
+                yield chunk
+
+        result = ChatResult(chunks())
+        return result
+
+    def chat_messages(
+            self,
+            messages: List[Dict[str, Any]],
+            stream: bool = True,
+            cancel: Optional[CancellationToken] = None
+    ) -> ChatResult:
+        """
+        发送已构建好的messages列表并获取模型的输出
 
-        # 处理用户消息
-        user_message = {
-            "role": "user",
-            "content": prompt
-        }
+        Args:
+            messages: api/chat格式的消息列表,图片可以是base64字符串或FileImage
+            stream: 是否使用流式输出
+            cancel: 取消令牌,在其他线程取消时立即断开连接,迭代以RequestCancelled结束
 
-        # 处理图片
-        if image_paths:
-            images = []
-            for path in image_paths:
-                try:
-                    image_data = encode_image(path)
-                    images.append(image_data)
-                except Exception as e:
-                    raise APIError(f"处理图片 {path} 失败: {str(e)}")
-            if images:
-                user_message["images"] = images
+        Returns:
+            可迭代的对话结果,逐段产出模型的输出,接收完毕后可从stats读取耗时统计
+        """
+        result = ChatResult(self._iter_chat_chunks(messages, stream, cancel, lambda started: result.mark_sent(started)))
+        return result
 
-        messages.append(user_message)
+    def _iter_chat_chunks(
+            self,
+            messages: List[Dict[str, Any]],
+            stream: bool,
+            cancel: Optional[CancellationToken] = None,
+            on_sent: Optional[Callable[[float], None]] = None
+    ) -> Generator[ChatChunk, None, None]:
+        """
+        发送对话请求,逐个产出含有文本的输出块和带完整统计数据的结束块
 
+        on_sent在发送请求前以开始时间调用,使ChatResult的耗时统计与指标使用同一起点。
+        """
         # 构建请求数据
         data = {
             "model": self.model,
@@ -280,24 +839,96 @@ class OllamaVisionClient:
             "stream": stream,
             "temperature": self.temperature
         }
-
-        # 发送请求
-        response = self._make_request(CHAT_ENDPOINT, data, stream=stream)
-
+        keep_alive = self.keep_alive_for(self.model)
+        if keep_alive is not None:
+            data["keep_alive"] = keep_alive
+
+        # 发送请求,含有FileImage时以流式请求体发送
+        body = None
+        if any(isinstance(image, FileImage) for message in messages for image in message.get("images", ())):
+            body = StreamingJSONBody(data)
+        model = self.model
+        started = time.perf_counter()
+        if on_sent is not None:
+            on_sent(started)
+        with self._request(
+                CHAT_ENDPOINT, data, stream=stream, body=body, route_model=model, cancel=cancel
+        ) as response:
+            for chunk in self._read_chat_response(response, stream, model, started):
+                # 取消前已经收到的数据不再产出
+                if cancel is not None:
+                    cancel.raise_if_cancelled()
+                yield chunk
+
+    def _read_chat_response(
+            self,
+            response: "requests.Response",
+            stream: bool,
+            model: str,
+            started: float
+    ) -> Generator[ChatChunk, None, None]:
+        """读取对话响应并记录首字延迟和总耗时,started为第一次发送请求的时间"""
+        metrics = self._metrics
         if stream:
-            for line in response.iter_lines():
-                if line:
-                    try:
-                        response_data = json.loads(line)
-                        if "message" in response_data:
-                            message = response_data["message"]
-                            if message["role"] == "assistant" and "content" in message:
-                                yield message["content"]
-                    except json.JSONDecodeError:
-                        continue
+            first_token = True
+            for chunk in iter_chat_stream(
+                    response,
+                    chunk_size=self.stream_chunk_size,
+                    coalesce_chars=self.coalesce_chars,
+                    coalesce_interval=self.coalesce_interval
+            ):
+                if chunk.error:
+                    self._last_error = chunk.error
+                    if metrics:
+                        metrics.record_error(model, CHAT_ENDPOINT, APIError(chunk.error), kind="stream")
+                    raise APIError(f"API错误: {chunk.error}")
+                if metrics:
+                    if first_token and chunk.content:
+                        first_token = False
+                        metrics.time_to_first_token.observe(time.perf_counter() - started, model, CHAT_ENDPOINT)
+                    if chunk.done:
+                        metrics.latency.observe(time.perf_counter() - started, model, CHAT_ENDPOINT)
+                        metrics.record_chat(model, chunk.data)
+                yield chunk
         else:
             response_data = response.json()
-            if "message" in response_data:
-                message = response_data["message"]
-                if message["role"] == "assistant" and "content" in message:
-                    yield message["content"]
\ No newline at end of file
+            content = extract_assistant_content(response_data)
+            if metrics:
+                metrics.time_to_first_token.observe(time.perf_counter() - started, model, CHAT_ENDPOINT)
+                metrics.record_chat(model, response_data)
+            yield ChatChunk(content=content or "", done=True, data=response_data)
+
+    def ocr_batch(
+            self,
+            image_paths: Iterable[ImageItem],
+            prompt: str,
+            system_prompt: Optional[str] = None,
+            concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+            ordered: bool = False
+    ) -> Generator[BatchResult, None, None]:
+        """
+        以有限并发批量处理图片
+
+        每个任务的错误会记录在结果中而不会抛出。concurrency应与服务端的并行槽位数
+        (OLLAMA_NUM_PARALLEL)相匹配,且不超过连接池大小。
+
+        Args:
+            image_paths: 图片路径,或每个任务一组图片路径的可迭代对象
+            prompt: 每个任务使用的提示词
+            system_prompt: 系统提示词(可选)
+            concurrency: 最大并发请求数
+            ordered: 为True时按输入顺序返回结果,否则按完成顺序返回
+
+        Returns:
+            生成器,逐个产出包含文本、错误和耗时的BatchResult
+        """
+        if concurrency > self._http.pool_size:
+            logger.warning(
+                f"Batch concurrency {concurrency} exceeds connection pool size {self._http.pool_size}, "
+                f"extra connections will not be reused"
+            )
+
+        def chat(paths: List[Union[str, Path]]) -> ChatResult:
+            return self.chat(prompt, image_paths=paths, system_prompt=system_prompt)
+
+        return run_batch(chat, image_paths, concurrency=concurrency, ordered=ordered)
@@ -1,13 +1,81 @@
 """配置参数模块"""
 
+import os
+
 # API设置
 DEFAULT_BASE_URL = "http://localhost:11434"
 DEFAULT_MODEL = "llama3.2-vision:latest"
 DEFAULT_TEMPERATURE = 0.7
+DEFAULT_KEEP_ALIVE = None  # 模型在显存中的保留时间,如"10m"、3600或-1(永久),None表示使用服务端默认值
+
+# 连接池设置
+DEFAULT_POOL_SIZE = 10  # 每个主机保留的最大连接数
+DEFAULT_CONNECT_TIMEOUT = 5.0  # 建立连接超时(秒)
+DEFAULT_READ_TIMEOUT = 300.0  # 读取超时(秒),视觉模型首次加载可能较慢;非流式的对话和预加载不限制
+DEFAULT_SHOW_WORKERS = 8  # 并发获取模型详情的最大线程数
+STREAM_CHUNK_SIZE = 64 * 1024  # 读取流式响应的缓冲区大小
+DEFAULT_BATCH_CONCURRENCY = 4  # 批量处理的默认并发数,与Ollama默认的并行槽位数一致
+
+# 多服务负载均衡设置
+ENDPOINT_HEALTH_INTERVAL = 10.0  # 健康检查(api/ps)的间隔(秒)
+ENDPOINT_FAILURE_THRESHOLD = 2  # 连续连接失败多少次后暂时移出该服务
+ENDPOINT_COLD_PENALTY = 2  # 未加载所请求模型的服务额外计入的请求数
+ENDPOINT_RESET_TIMEOUT = 5.0  # 所有服务都熔断后,经过多久放行一个试探请求(秒)
+
+# 重试设置
+RETRY_MAX_ATTEMPTS = 3  # 包括第一次在内的最多尝试次数
+RETRY_BACKOFF_BASE = 0.5  # 第一次重试前最长等待时间(秒),之后每次翻倍
+RETRY_BACKOFF_MAX = 8.0  # 重试等待时间上限(秒)
+RETRY_STATUS_CODES = (408, 429, 502, 503, 504)  # 视为暂时性错误的HTTP状态码
+
+# 多轮对话设置
+DEFAULT_SESSION_MAX_BYTES = 32 * 1024 * 1024  # 每轮发送的对话历史字节数上限
+SESSION_TRIM_RATIO = 0.75  # 超出上限时一次裁剪到上限的该比例,使之后的消息前缀保持稳定
+
+# 缓存设置
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ollama_vision")
+DEFAULT_MODEL_CACHE_PATH = os.path.join(CACHE_DIR, "models.json")  # 模型元数据缓存
+DEFAULT_RESULT_CACHE_PATH = os.path.join(CACHE_DIR, "results.sqlite3")  # 对话结果缓存
+RESULT_CACHE_MAX_BYTES = 256 * 1024 * 1024  # 对话结果缓存的文本和响应数据总大小上限
+RESULT_CACHE_TTL = 7 * 24 * 3600  # 对话结果的有效期(秒)
+
+# 指标设置
+DEFAULT_METRICS_PORT = 9464  # Prometheus导出器的默认端口
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)  # 耗时直方图区间(秒)
+PAYLOAD_BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(10))  # 请求体大小直方图区间(1KB-256MB)
+
+# 界面设置
+TOKEN_FLUSH_INTERVAL_MS = 16  # 流式输出合并刷新到界面的间隔(毫秒),约为一帧
+TRANSCRIPT_LAYOUT_CACHE_SIZE = 128  # 对话记录中保留排版结果的消息数,其余消息只保存高度
+THUMBNAIL_SIZE = 100  # 对话记录和上传预览中缩略图的边长(像素)
+THUMBNAIL_CACHE_BYTES = 64 * 1024 * 1024  # 缩略图缓存的内存上限
+GUI_TASK_MAX_WORKERS = 4  # 界面后台任务(对话、图片编码、模型加载、缩略图)共用的线程数
+GUI_TASK_SHUTDOWN_TIMEOUT = 2.0  # 关闭窗口时等待后台任务结束的最长秒数
 
 # 图片设置
 MAX_IMAGE_SIZE = 10 * 1024 * 1024  # 10MB
 SUPPORTED_IMAGE_TYPES = ['image/jpeg', 'image/png', 'image/gif', 'image/webp']
+IMAGE_CACHE_MAX_BYTES = 128 * 1024 * 1024  # 图片编码缓存的内存上限
+REQUEST_BODY_CHUNK_SIZE = 3 * 64 * 1024  # 流式请求体每次读取的图片字节数(3的倍数)
+
+# 图片预处理设置
+DEFAULT_IMAGE_MAX_DIMENSION = 1344  # 未知模型的默认最长边像素数
+DEFAULT_IMAGE_FORMAT = "JPEG"  # 重新编码的格式
+DEFAULT_IMAGE_QUALITY = 90  # 重新编码的质量,OCR场景下保留足够的文字细节
+# 各模型视觉编码器实际使用的最长边像素数,按模型名前缀匹配
+MODEL_IMAGE_MAX_DIMENSIONS = {
+    "llama3.2-vision": 1120,  # 560x560分块,最多2x2
+    "llava": 672,  # LLaVA 1.6最高672x672
+    "bakllava": 672,
+    "minicpm-v": 1344,
+    "moondream": 756,
+}
 
 # API端点
-CHAT_ENDPOINT = "api/chat"
\ No newline at end of file
+CHAT_ENDPOINT = "api/chat"
+GENERATE_ENDPOINT = "api/generate"
+TAGS_ENDPOINT = "api/tags"
+SHOW_ENDPOINT = "api/show"
+PS_ENDPOINT = "api/ps"
+# 可以安全重复发送的端点,api/generate只用于不带提示词的预加载
+IDEMPOTENT_ENDPOINTS = (TAGS_ENDPOINT, SHOW_ENDPOINT, PS_ENDPOINT, GENERATE_ENDPOINT)
@@ -0,0 +1,281 @@
+# ollama_vision/endpoints.py
+"""多个Ollama服务之间的负载均衡模块"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from ollama_vision.config import (
+    ENDPOINT_HEALTH_INTERVAL, ENDPOINT_FAILURE_THRESHOLD, ENDPOINT_COLD_PENALTY, ENDPOINT_RESET_TIMEOUT
+)
+from ollama_vision.exceptions import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class EndpointStats:
+    """单个服务的路由统计"""
+    url: str
+    healthy: bool = True  # 为False时表示熔断,不再分配请求
+    outstanding: int = 0  # 正在处理的请求数
+    requests: int = 0  # 累计分配的请求数
+    failures: int = 0  # 累计连接失败次数
+    circuit_opens: int = 0  # 累计熔断次数
+    loaded_models: List[str] = field(default_factory=list)  # 已加载到显存的模型
+    installed_models: Optional[List[str]] = None  # 已安装的模型,尚未获取api/tags时为None
+    average_latency: float = 0.0  # 已完成请求的平均耗时(秒)
+
+
+class Endpoint:
+    """一个Ollama服务及其路由状态,只能在EndpointPool的锁内修改"""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.healthy = True
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.circuit_opens = 0
+        self.opened_at = 0.0  # 最近一次熔断的时间(time.monotonic)
+        self.probing = False  # 是否有试探请求正在进行
+        self.loaded_models: Optional[Set[str]] = None  # 尚未检查过时为None
+        self.installed_models: Optional[Dict[str, str]] = None  # api/tags列出的模型名称 -> 摘要,尚未获取时为None
+        self.missing_models: Set[str] = set()  # 请求时返回404(模型不存在)的模型
+        self.completed = 0
+        self.total_latency = 0.0
+
+    def has_model(self, model: str) -> bool:
+        """服务是否可能安装了该模型,尚未获取模型列表时视为已安装"""
+        if model in self.missing_models:
+            return False
+        return self.installed_models is None or model in self.installed_models
+
+    def stats(self) -> EndpointStats:
+        return EndpointStats(
+            url=self.url,
+            healthy=self.healthy,
+            outstanding=self.outstanding,
+            requests=self.requests,
+            failures=self.failures,
+            circuit_opens=self.circuit_opens,
+            loaded_models=sorted(self.loaded_models or ()),
+            installed_models=sorted(self.installed_models) if self.installed_models is not None else None,
+            average_latency=self.total_latency / self.completed if self.completed else 0.0
+        )
+
+
+class EndpointPool:
+    """
+    按负载选择Ollama服务
+
+    每个请求分配给未完成请求数最少的健康服务,已加载所请求模型的服务优先:
+    未加载模型的服务按多出cold_penalty个请求计算,只有在已加载的服务明显更忙时才会被选中。
+    各服务安装的模型可以不同,已知模型列表(api/tags)的服务只在列出了所请求模型时才会被选中。
+
+    连续连接失败的服务会熔断(暂时移出),后台健康检查(api/ps)成功后重新加入,
+    同时刷新各服务已加载的模型列表。所有服务都熔断时请求直接以CircuitOpenError失败,
+    每个服务熔断reset_timeout秒后放行一个试探请求,成功即恢复。
+    """
+
+    def __init__(
+            self,
+            urls: Iterable[str],
+            probe: Optional[Callable[[str], Optional[Iterable[str]]]] = None,
+            health_interval: float = ENDPOINT_HEALTH_INTERVAL,
+            failure_threshold: int = ENDPOINT_FAILURE_THRESHOLD,
+            cold_penalty: int = ENDPOINT_COLD_PENALTY,
+            reset_timeout: float = ENDPOINT_RESET_TIMEOUT
+    ):
+        """
+        初始化服务列表
+
+        Args:
+            urls: 服务的基础URL列表
+            probe: 健康检查函数,参数为基础URL,返回已加载的模型名称,服务不可用时抛出异常
+            health_interval: 健康检查的间隔(秒)
+            failure_threshold: 连续失败多少次后移出该服务
+            cold_penalty: 未加载所请求模型的服务额外计入的请求数
+            reset_timeout: 所有服务都熔断时,每个服务熔断多久后放行一个试探请求(秒)
+        """
+        self._endpoints = [Endpoint(url) for url in urls]
+        if not self._endpoints:
+            raise ValueError("至少需要一个服务地址")
+        self.failure_threshold = failure_threshold
+        self.cold_penalty = cold_penalty
+        self.health_interval = health_interval
+        self.reset_timeout = reset_timeout
+        self._probe = probe
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._endpoints)
+
+    @property
+    def urls(self) -> List[str]:
+        return [endpoint.url for endpoint in self._endpoints]
+
+    def start(self):
+        """启动后台健康检查,只有一个服务时不需要"""
+        if self._probe is None or len(self._endpoints) < 2 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._health_loop, name="ollama-health", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止后台健康检查"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def available(self) -> List[Endpoint]:
+        """返回健康的服务,所有服务都熔断时返回全部服务"""
+        with self._lock:
+            return [endpoint for endpoint in self._endpoints if endpoint.healthy] or list(self._endpoints)
+
+    def acquire(self, model: str = "", endpoint: Optional[Endpoint] = None) -> Endpoint:
+        """
+        为一个请求选择服务,请求结束后必须调用release
+
+        Args:
+            model: 请求使用的模型,只选择安装了该模型的服务,并优先选择已加载该模型的服务。
+                没有健康的服务安装该模型时仍从所有健康的服务中选择,由服务端返回错误
+            endpoint: 指定处理请求的服务,不检查健康状态,如api/show需要发送到返回模型列表的服务
+
+        Returns:
+            选中的服务
+
+        Raises:
+            CircuitOpenError: 所有服务都处于熔断状态且还不到试探的时间
+        """
+        with self._lock:
+            if endpoint is not None:
+                endpoint.outstanding += 1
+                endpoint.requests += 1
+                return endpoint
+            candidates = [endpoint for endpoint in self._endpoints if endpoint.healthy]
+            if not candidates:
+                return self._acquire_trial()
+            if model:
+                candidates = [endpoint for endpoint in candidates if endpoint.has_model(model)] or candidates
+
+            def load(endpoint: Endpoint):
+                cold = model and endpoint.loaded_models is not None and model not in endpoint.loaded_models
+                return endpoint.outstanding + (self.cold_penalty if cold else 0), endpoint.requests
+
+            endpoint = min(candidates, key=load)
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def _acquire_trial(self) -> Endpoint:
+        """所有服务都熔断时,选择熔断时间最久且已过reset_timeout的服务放行一个试探请求"""
+        now = time.monotonic()
+        waiting = [endpoint for endpoint in self._endpoints if not endpoint.probing]
+        if waiting:
+            endpoint = min(waiting, key=lambda e: e.opened_at)
+            retry_after = endpoint.opened_at + self.reset_timeout - now
+            if retry_after <= 0:
+                endpoint.probing = True
+                endpoint.outstanding += 1
+                endpoint.requests += 1
+                return endpoint
+        else:
+            retry_after = self.reset_timeout
+        raise CircuitOpenError(f"所有服务均不可用,{max(retry_after, 0.0):.1f}秒后重试", retry_after=retry_after)
+
+    def _open(self, endpoint: Endpoint, reason: str):
+        """熔断一个服务,在锁内调用"""
+        endpoint.opened_at = time.monotonic()
+        if endpoint.healthy:
+            endpoint.healthy = False
+            endpoint.circuit_opens += 1
+            logger.warning(f"Endpoint {endpoint.url} marked unhealthy: {reason}")
+
+    def release(self, endpoint: Endpoint, ok: bool, elapsed: float = 0.0, model: str = ""):
+        """
+        结束一个请求
+
+        Args:
+            endpoint: acquire返回的服务
+            ok: 是否成功连接到服务(HTTP错误也算连接成功)
+            elapsed: 请求耗时(秒)
+            model: 请求使用的模型,成功时记为该服务已加载
+        """
+        with self._lock:
+            endpoint.outstanding -= 1
+            probing, endpoint.probing = endpoint.probing, False
+            if ok:
+                endpoint.consecutive_failures = 0
+                endpoint.completed += 1
+                endpoint.total_latency += elapsed
+                if model:
+                    endpoint.loaded_models = (endpoint.loaded_models or set()) | {model}
+                if not endpoint.healthy:
+                    endpoint.healthy = True
+                    logger.info(f"Endpoint {endpoint.url} recovered")
+            else:
+                endpoint.failures += 1
+                endpoint.consecutive_failures += 1
+                if probing or endpoint.consecutive_failures >= self.failure_threshold:
+                    # 试探失败时重新计时
+                    self._open(endpoint, f"{endpoint.consecutive_failures} consecutive failures")
+
+    def set_installed(self, endpoint: Endpoint, models: Dict[str, str]):
+        """
+        记录服务安装的模型,同时清除之前记录的模型不存在错误
+
+        Args:
+            endpoint: 返回api/tags的服务
+            models: 模型名称 -> 摘要
+        """
+        with self._lock:
+            endpoint.installed_models = dict(models)
+            endpoint.missing_models.clear()
+
+    def mark_missing(self, endpoint: Endpoint, model: str) -> bool:
+        """
+        记录服务没有安装模型(请求返回404),之后该模型的请求不再分配给它
+
+        Returns:
+            是否还有其他健康的服务可能安装了该模型,为True时可以换一个服务重新发送
+        """
+        with self._lock:
+            endpoint.missing_models.add(model)
+            if endpoint.installed_models is not None:
+                endpoint.installed_models.pop(model, None)
+            return any(other.healthy and other.has_model(model) for other in self._endpoints)
+
+    def stats(self) -> List[EndpointStats]:
+        """返回各服务的路由统计"""
+        with self._lock:
+            return [endpoint.stats() for endpoint in self._endpoints]
+
+    def check_health(self):
+        """对所有服务执行一次健康检查"""
+        for endpoint in self._endpoints:
+            try:
+                loaded = set(self._probe(endpoint.url) or ())
+            except Exception as e:
+                with self._lock:
+                    if endpoint.healthy:
+                        self._open(endpoint, f"health check failed: {e}")
+                continue
+            with self._lock:
+                endpoint.loaded_models = loaded
+                endpoint.consecutive_failures = 0
+                if not endpoint.healthy:
+                    endpoint.healthy = True
+                    logger.info(f"Endpoint {endpoint.url} passed health check, added back")
+
+    def _health_loop(self):
+        while True:
+            self.check_health()
+            if self._stop.wait(self.health_interval):
+                return
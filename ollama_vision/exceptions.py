@@ -1,6 +1,9 @@
 # exceptions.py
 """自定义异常类模块"""
 
+from typing import Optional
+
+
 class OllamaClientError(Exception):
     """基础异常类"""
     pass
@@ -11,6 +14,20 @@ class ImageProcessingError(OllamaClientError):
 
 class APIError(OllamaClientError):
     """API调用相关错误"""
+
+    def __init__(self, message: str = "", status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code  # HTTP状态码,连接失败等非HTTP错误时为None
+
+class CircuitOpenError(APIError):
+    """所有服务都处于熔断状态,请求未发送即失败"""
+
+    def __init__(self, message: str = "", retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after  # 距离下一次允许试探请求的时间(秒)
+
+class RequestCancelled(OllamaClientError):
+    """请求被CancellationToken取消"""
     pass
 
 class ConfigurationError(OllamaClientError):
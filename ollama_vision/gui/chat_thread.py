@@ -1,96 +1,90 @@
 # ollama_vision/gui/chat_thread.py
 
-from PyQt6.QtCore import QThread, pyqtSignal
-import time
-from ollama_vision.exceptions import OllamaClientError
+from PyQt6.QtCore import pyqtSignal
 
+from ollama_vision.client import build_chat_messages
+from ollama_vision.exceptions import OllamaClientError, RequestCancelled
+from ollama_vision.image_utils import encode_image
+from .tasks import Task, TaskPriority
 
-class UploadThread(QThread):
-    """图片上传处理线程"""
 
-    progress = pyqtSignal(int)  # 上传进度
+class UploadTask(Task):
+    """
+    图片上传处理任务
+
+    分块读取并编码图片,按实际处理的字节数报告进度。
+    一次选择多张图片时超出调度器线程数的任务排队等待。
+    """
+
+    progress = pyqtSignal(int)  # 上传进度(0-100)
     finished = pyqtSignal(str)  # 上传完成,返回base64
     error = pyqtSignal(str)  # 上传错误
 
     def __init__(self, image_path):
-        super().__init__()
+        super().__init__("upload", TaskPriority.NORMAL)
         self.image_path = image_path
+        self._percent = -1
+
+    def _report(self, done: int, total: int):
+        self.cancel_token.raise_if_cancelled()
+        percent = done * 100 // total if total else 100
+        if percent != self._percent:
+            self._percent = percent
+            self.progress.emit(percent)
 
     def run(self):
-        """执行上传任务"""
+        """执行上传任务,取消后在读完当前块时结束"""
         try:
-            # 模拟上传进度
-            for i in range(0, 101, 10):
-                self.progress.emit(i)
-                time.sleep(0.1)  # 模拟网络延迟
-
-            from ollama_vision.image_utils import encode_image
-            # 实际进行base64编码
-            encoded = encode_image(self.image_path)
-            self.progress.emit(100)
+            self.progress.emit(0)
+            encoded = encode_image(self.image_path, progress=self._report)
             self.finished.emit(encoded)
-
+        except RequestCancelled:
+            pass
         except Exception as e:
             self.error.emit(str(e))
 
 
-class ChatThread(QThread):
-    """聊天消息处理线程"""
+class ChatTask(Task):
+    """
+    聊天消息处理任务
+
+    cancel()会断开连接使服务端停止生成,任务随后很快结束。回复结束后发出done。
+    """
 
     # 定义信号
     response_received = pyqtSignal(str)  # 收到回复
     error_occurred = pyqtSignal(str)  # 发生错误
-    finished = pyqtSignal()  # 处理完成
+    stats_ready = pyqtSignal(object)  # 回复完整接收后发出ChatStats(服务端未返回统计时不发出)
 
-    def __init__(self, client, prompt, encoded_images=None):
-        super().__init__()
+    def __init__(self, client, prompt, encoded_images=None, session=None):
+        super().__init__("chat", TaskPriority.HIGH)
         self.client = client
         self.prompt = prompt
         self.encoded_images = encoded_images or []
+        self.session = session  # 多轮对话会话(可选),为None时只发送单轮消息
 
     def run(self):
-        """线程执行的任务"""
+        """执行聊天任务"""
         try:
-            # 构建消息
-            messages = [{
-                "role": "user",
-                "content": self.prompt
-            }]
-
-            if self.encoded_images:
-                messages[0]["images"] = self.encoded_images
-
-            # 发送请求
-            data = {
-                "model": self.client.model,
-                "messages": messages,
-                "stream": True,
-                "temperature": self.client.temperature
-            }
-
-            # 使用client发送请求
-            response = self.client._make_request(
-                "api/chat",
-                data=data,
-                stream=True
-            )
-
-            # 处理流式响应
-            for line in response.iter_lines():
-                if line:
-                    try:
-                        import json
-                        response_data = json.loads(line)
-                        if "message" in response_data:
-                            message = response_data["message"]
-                            if message["role"] == "assistant" and "content" in message:
-                                self.response_received.emit(message["content"])
-                    except json.JSONDecodeError:
-                        continue
-
+            # 构建消息并通过client发送,与chat()共用同一个流解码器
+            if self.session is not None:
+                stream = self.session.send(
+                    self.prompt, encoded_images=self.encoded_images, cancel=self.cancel_token
+                )
+            else:
+                messages = build_chat_messages(self.prompt, self.encoded_images)
+                stream = self.client.chat_messages(messages, stream=True, cancel=self.cancel_token)
+            for content in stream:
+                self.response_received.emit(content)
+
+            stats = self.session.last_chat_stats if self.session is not None else stream.stats
+            if stats is not None:
+                self.stats_ready.emit(stats)
+
+        except RequestCancelled:
+            # 主动取消,不作为错误显示
+            pass
         except OllamaClientError as e:
             self.error_occurred.emit(str(e))
         except Exception as e:
-            self.error_occurred.emit(f"发生未知错误: {str(e)}")
-        finally:
-            self.finished.emit()
\ No newline at end of file
+            self.error_occurred.emit(f"发生未知错误: {str(e)}")
\ No newline at end of file
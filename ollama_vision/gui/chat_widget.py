@@ -1,29 +1,40 @@
 # ollama_vision/gui/chat_widget.py
 
+import logging
+from functools import partial
+
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QTextEdit,
-    QPushButton, QScrollArea, QFrame, QFileDialog,
+    QPushButton, QFrame, QFileDialog,
     QLabel, QApplication
 )
-from PyQt6.QtCore import Qt, pyqtSignal, QTimer, QSize
-from PyQt6.QtGui import QFont, QIcon, QPixmap, QImageReader
+from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtGui import QFont, QIcon
 
 from ollama_vision.client import OllamaVisionClient
-from .message_item import MessageItem
-from .chat_thread import ChatThread, UploadThread
+from ollama_vision.config import GUI_TASK_SHUTDOWN_TIMEOUT, THUMBNAIL_SIZE
+from ollama_vision.session import ConversationSession
+from .chat_thread import ChatTask, UploadTask
+from .token_batcher import TokenBatcher
+from .transcript import TranscriptView
 from .progress_widget import CircularProgressBar
+from .tasks import get_task_scheduler
+from .thumbnails import get_thumbnail_cache
+
+logger = logging.getLogger(__name__)
 
 
 class UploadPreview(QWidget):
     """图片上传预览组件"""
 
-    upload_complete = pyqtSignal()  # 上传完成信号
+    upload_complete = pyqtSignal()  # 上传结束信号(成功或失败)
 
     def __init__(self, image_path):
         super().__init__()
         self.image_path = image_path
         self.encoded_image = None
-        self.upload_thread = None
+        self.done = False  # 编码已经结束(成功或失败)
+        self.upload_task = None
         self.init_ui()
         self.start_upload()
 
@@ -33,23 +44,22 @@ class UploadPreview(QWidget):
         layout.setContentsMargins(8, 8, 8, 8)
         layout.setSpacing(8)
 
-        # 图片预览
-        reader = QImageReader(self.image_path)
-        reader.setScaledSize(QSize(100, 100))
-        pixmap = QPixmap.fromImageReader(reader)
-
-        preview = QLabel()
-        preview.setFixedSize(100, 100)
-        preview.setPixmap(pixmap)
-        preview.setScaledContents(True)
-        preview.setStyleSheet("""
+        # 图片预览,缩略图在后台解码,完成前显示占位
+        self.preview = QLabel()
+        self.preview.setFixedSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE)
+        self.preview.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.preview.setStyleSheet("""
             QLabel {
+                background: #EEEEEE;
                 border: 1px solid #E0E0E0;
                 border-radius: 4px;
                 padding: 2px;
             }
         """)
-        layout.addWidget(preview)
+        layout.addWidget(self.preview)
+        thumbnails = get_thumbnail_cache()
+        thumbnails.thumbnail_ready.connect(self.on_thumbnail_ready)
+        self.on_thumbnail_ready(self.image_path, THUMBNAIL_SIZE)
 
         # 右侧信息区
         info_layout = QVBoxLayout()
@@ -62,7 +72,7 @@ class UploadPreview(QWidget):
 
         # 状态和进度条
         status_layout = QHBoxLayout()
-        self.status_label = QLabel("正在上传...")
+        self.status_label = QLabel("等待上传...")
         self.status_label.setStyleSheet("color: #6B7280; font-size: 12px;")
         status_layout.addWidget(self.status_label)
 
@@ -74,35 +84,51 @@ class UploadPreview(QWidget):
         layout.addLayout(info_layout)
         layout.addStretch()
 
+    def on_thumbnail_ready(self, path, size):
+        """缩略图解码完成后显示"""
+        if path != self.image_path or size != THUMBNAIL_SIZE:
+            return
+        pixmap = get_thumbnail_cache().get(path, size)
+        if pixmap is not None:
+            self.preview.setPixmap(pixmap)
+
     def start_upload(self):
         """开始上传"""
-        self.upload_thread = UploadThread(self.image_path)
-        self.upload_thread.progress.connect(self.update_progress)
-        self.upload_thread.finished.connect(self.on_upload_complete)
-        self.upload_thread.error.connect(self.on_upload_error)
-        self.upload_thread.start()
+        self.upload_task = UploadTask(self.image_path)
+        self.upload_task.progress.connect(self.update_progress)
+        self.upload_task.finished.connect(self.on_upload_complete)
+        self.upload_task.error.connect(self.on_upload_error)
+        get_task_scheduler().submit(self.upload_task)
+
+    def cancel_upload(self):
+        """取消未完成的上传"""
+        if self.upload_task is not None and not self.done:
+            self.upload_task.cancel()
 
     def update_progress(self, value):
         """更新上传进度"""
+        if value == 0:
+            self.status_label.setText("正在上传...")
         self.progress_bar.setProgress(value)
 
     def on_upload_complete(self, encoded):
         """上传完成处理"""
         self.encoded_image = encoded
+        self.done = True
         self.status_label.setText("上传完成")
         self.status_label.setStyleSheet("color: #059669; font-size: 12px;")
         self.upload_complete.emit()
 
     def on_upload_error(self, error):
         """上传错误处理"""
+        self.done = True
         self.status_label.setText(f"上传失败: {error}")
         self.status_label.setStyleSheet("color: #DC2626; font-size: 12px;")
+        self.upload_complete.emit()
 
     def closeEvent(self, event):
         """关闭事件"""
-        if self.upload_thread and self.upload_thread.isRunning():
-            self.upload_thread.terminate()
-            self.upload_thread.wait()
+        self.cancel_upload()
         super().closeEvent(event)
 
 
@@ -112,7 +138,8 @@ class ChatWidget(QWidget):
     def __init__(self, client):
         super().__init__()
         self.client = client
-        self.chat_thread = None
+        self.session = ConversationSession(client)  # 保留对话上下文
+        self.chat_task = None
         self.uploads = []  # 存储上传预览组件
         self.init_ui()
 
@@ -123,25 +150,19 @@ class ChatWidget(QWidget):
         layout.setContentsMargins(0, 0, 0, 0)
         layout.setSpacing(0)
 
-        # 消息展示区域
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.scroll_area.setStyleSheet("""
-            QScrollArea {
-                background: white;
-                border: none;
-            }
-        """)
-
-        self.message_container = QWidget()
-        self.messages_layout = QVBoxLayout(self.message_container)
-        self.messages_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
-        self.messages_layout.setSpacing(16)
-        self.messages_layout.setContentsMargins(16, 16, 16, 16)
+        # 消息展示区域,只绘制可见的消息
+        self.transcript_view = TranscriptView()
+        self.transcript = self.transcript_view.transcript
+        layout.addWidget(self.transcript_view)
 
-        self.scroll_area.setWidget(self.message_container)
-        layout.addWidget(self.scroll_area)
+        # 待发送图片的上传预览
+        self.upload_bar = QWidget()
+        self.upload_layout = QHBoxLayout(self.upload_bar)
+        self.upload_layout.setContentsMargins(16, 8, 16, 0)
+        self.upload_layout.setSpacing(8)
+        self.upload_layout.addStretch()
+        self.upload_bar.hide()
+        layout.addWidget(self.upload_bar)
 
         # 底部输入区域
         input_container = QWidget()
@@ -208,8 +229,9 @@ class ChatWidget(QWidget):
     def on_input_changed(self):
         """输入框内容改变时的处理"""
         has_text = bool(self.input_box.toPlainText().strip())
-        has_uploads = len(self.uploads) == 0 or any(upload.encoded_image for upload in self.uploads)
-        self.send_btn.setEnabled(has_text and has_uploads)
+        # 所有图片都编码结束后才能发送,失败的图片不随消息发送
+        uploads_done = all(upload.done for upload in self.uploads)
+        self.send_btn.setEnabled(has_text and uploads_done)
 
     def upload_images(self):
         """上传图片"""
@@ -219,19 +241,20 @@ class ChatWidget(QWidget):
         file_dialog.setViewMode(QFileDialog.ViewMode.List)
 
         if file_dialog.exec():
-            filenames = file_dialog.selectedFiles()
-            # 添加上传预览到消息区
-            for path in filenames:
-                preview = UploadPreview(path)
-                preview.upload_complete.connect(self.on_input_changed)
-                self.uploads.append(preview)
-                self.messages_layout.addWidget(preview)
+            self.add_uploads(file_dialog.selectedFiles())
 
-            # 检查发送按钮状态
-            self.on_input_changed()
+    def add_uploads(self, paths):
+        """为每张图片添加上传预览并开始编码"""
+        # 添加上传预览到输入框上方
+        for path in paths:
+            preview = UploadPreview(path)
+            preview.upload_complete.connect(self.on_input_changed)
+            self.uploads.append(preview)
+            self.upload_layout.insertWidget(self.upload_layout.count() - 1, preview)
+        self.upload_bar.setVisible(bool(self.uploads))
 
-            # 滚动到底部
-            self.scroll_to_bottom()
+        # 检查发送按钮状态
+        self.on_input_changed()
 
     def send_message(self):
         """发送消息"""
@@ -240,440 +263,104 @@ class ChatWidget(QWidget):
             return
 
         # 检查是否所有图片都上传完成
-        encoded_images = []
-        for upload in self.uploads:
-            if upload.encoded_image:
-                encoded_images.append(upload.encoded_image)
-            elif upload.upload_thread and upload.upload_thread.isRunning():
-                # 等待上传完成
-                return
-
-        # 添加用户消息
-        user_msg = MessageItem(text, "user", [u.image_path for u in self.uploads])
-        self.messages_layout.addWidget(user_msg)
+        if not all(upload.done for upload in self.uploads):
+            return
+        uploaded = [upload for upload in self.uploads if upload.encoded_image]
+        encoded_images = [upload.encoded_image for upload in uploaded]
 
-        # 添加助手消息框
-        assistant_msg = MessageItem("", "assistant")
-        self.messages_layout.addWidget(assistant_msg)
+        # 添加用户消息和助手消息
+        self.transcript.add_message("user", text, [upload.image_path for upload in uploaded])
+        assistant_id = self.transcript.add_message("assistant")
+        self.transcript_view.scrollToBottom()
 
         # 清空输入
         self.input_box.clear()
 
         # 清理上传组件
-        for upload in self.uploads:
-            if upload.upload_thread and upload.upload_thread.isRunning():
-                upload.upload_thread.terminate()
-                upload.upload_thread.wait()
-            upload.setParent(None)
-            upload.deleteLater()
-        self.uploads.clear()
+        self.remove_uploads()
 
-        # 创建并启动消息处理线程
-        if self.chat_thread and self.chat_thread.isRunning():
-            self.chat_thread.terminate()
-            self.chat_thread.wait()
+        # 取消上一条还在生成的回复,再提交新的消息处理任务
+        self.stop_generation()
 
-        self.chat_thread = ChatThread(
+        self.chat_task = ChatTask(
             self.client,
             text,
-            encoded_images
+            encoded_images,
+            session=self.session
         )
-        self.chat_thread.response_received.connect(assistant_msg.append_content)
-        self.chat_thread.error_occurred.connect(assistant_msg.set_error)
-        self.chat_thread.finished.connect(self.on_message_complete)
-        self.chat_thread.start()
-
-        # 滚动到底部
-        QTimer.singleShot(100, self.scroll_to_bottom)
+        # 每帧最多刷新一次回复内容,任务被取消并删除时未发出的内容随之丢弃
+        batcher = TokenBatcher(parent=self.chat_task)
+        batcher.flushed.connect(partial(self.transcript.append_text, assistant_id))
+        self.chat_task.response_received.connect(batcher.append)
+        self.chat_task.error_occurred.connect(batcher.flush)
+        self.chat_task.error_occurred.connect(partial(self.transcript.set_error, assistant_id))
+        self.chat_task.done.connect(batcher.flush)
+        self.chat_task.stats_ready.connect(partial(self.transcript.set_stats, assistant_id))
+        self.chat_task.done.connect(self.on_message_complete)
+        get_task_scheduler().submit(self.chat_task)
+
+    def stop_generation(self):
+        """取消正在生成的回复,断开连接使服务端立即停止生成"""
+        task = self.chat_task
+        if task is None:
+            return
+        self.chat_task = None
+        task.cancel()
+        # 等待任务结束,避免与下一轮对话同时修改会话上下文;取消会断开连接,通常立即结束,
+        # 最多等待GUI_TASK_SHUTDOWN_TIMEOUT秒,不让界面一直卡住
+        if task.wait(GUI_TASK_SHUTDOWN_TIMEOUT):
+            task.deleteLater()
+            return
+        logger.warning(f"Cancelled chat task did not stop within {GUI_TASK_SHUTDOWN_TIMEOUT}s")
+        # 任务仍在工作线程中执行,不再显示它的输出,结束后再删除(被取消的一轮不会计入会话上下文)
+        for signal in (task.response_received, task.error_occurred, task.stats_ready, task.done):
+            try:
+                signal.disconnect()
+            except TypeError:
+                pass  # 没有连接时PyQt抛出TypeError
+        task.done.connect(task.deleteLater)
+        if task.wait(0):
+            # 在断开连接之前就已经结束,done不会再发出
+            task.deleteLater()
 
     def on_message_complete(self):
         """消息处理完成的处理"""
-        if self.chat_thread:
-            self.chat_thread.quit()
-            self.chat_thread.wait()
-            self.chat_thread.deleteLater()
-            self.chat_thread = None
-
-        # 滚动到底部
-        self.scroll_to_bottom()
-
-    def scroll_to_bottom(self):
-        """滚动到底部"""
-        scrollbar = self.scroll_area.verticalScrollBar()
-        scrollbar.setValue(scrollbar.maximum())
+        if self.sender() is not self.chat_task:
+            # 已被stop_generation取消并清理的任务
+            return
+        self.chat_task.deleteLater()
+        self.chat_task = None
 
     def clear(self):
         """清空聊天记录"""
-        # 停止当前的聊天线程
-        if self.chat_thread and self.chat_thread.isRunning():
-            self.chat_thread.terminate()
-            self.chat_thread.wait()
-            self.chat_thread.deleteLater()
-            self.chat_thread = None
+        # 停止当前的回复
+        self.stop_generation()
+
+        # 清空对话上下文
+        self.session.reset()
 
         # 清空消息
-        while self.messages_layout.count():
-            item = self.messages_layout.takeAt(0)
-            widget = item.widget()
-            if widget:
-                widget.deleteLater()
+        self.transcript_view.clear()
 
         # 清空上传
-        for upload in self.uploads:
-            if upload.upload_thread and upload.upload_thread.isRunning():
-                upload.upload_thread.terminate()
-                upload.upload_thread.wait()
-            upload.deleteLater()
-        self.uploads.clear()
-
-    def closeEvent(self, event):
-        """关闭事件"""
-        # 停止所有线程
-        if self.chat_thread and self.chat_thread.isRunning():
-            self.chat_thread.terminate()
-            self.chat_thread.wait()
-
-        for upload in self.uploads:
-            if upload.upload_thread and upload.upload_thread.isRunning():
-                upload.upload_thread.terminate()
-                upload.upload_thread.wait()
-
-        super().closeEvent(event)# ollama_vision/gui/chat_widget.py
-
-from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QTextEdit,
-    QPushButton, QScrollArea, QFrame, QFileDialog,
-    QLabel, QApplication
-)
-from PyQt6.QtCore import Qt, pyqtSignal, QTimer, QSize
-from PyQt6.QtGui import QFont, QIcon, QPixmap, QImageReader
-
-from ollama_vision.client import OllamaVisionClient
-from .message_item import MessageItem
-from .chat_thread import ChatThread, UploadThread
-from .progress_widget import CircularProgressBar
-
-class UploadPreview(QWidget):
-    """图片上传预览组件"""
-
-    upload_complete = pyqtSignal()  # 上传完成信号
-
-    def __init__(self, image_path):
-        super().__init__()
-        self.image_path = image_path
-        self.encoded_image = None
-        self.upload_thread = None
-        self.init_ui()
-        self.start_upload()
-
-    def init_ui(self):
-        # 创建布局
-        layout = QHBoxLayout(self)
-        layout.setContentsMargins(8, 8, 8, 8)
-        layout.setSpacing(8)
-
-        # 图片预览
-        reader = QImageReader(self.image_path)
-        reader.setScaledSize(QSize(100, 100))
-        pixmap = QPixmap.fromImageReader(reader)
-
-        preview = QLabel()
-        preview.setFixedSize(100, 100)
-        preview.setPixmap(pixmap)
-        preview.setScaledContents(True)
-        preview.setStyleSheet("""
-            QLabel {
-                border: 1px solid #E0E0E0;
-                border-radius: 4px;
-                padding: 2px;
-            }
-        """)
-        layout.addWidget(preview)
-
-        # 右侧信息区
-        info_layout = QVBoxLayout()
-        info_layout.setSpacing(4)
-
-        # 文件名
-        name = QLabel(self.image_path.split("/")[-1])
-        name.setStyleSheet("color: #374151; font-weight: 500;")
-        info_layout.addWidget(name)
-
-        # 状态和进度条
-        status_layout = QHBoxLayout()
-        self.status_label = QLabel("正在上传...")
-        self.status_label.setStyleSheet("color: #6B7280; font-size: 12px;")
-        status_layout.addWidget(self.status_label)
-
-        self.progress_bar = CircularProgressBar()
-        status_layout.addWidget(self.progress_bar)
-        status_layout.addStretch()
-
-        info_layout.addLayout(status_layout)
-        layout.addLayout(info_layout)
-        layout.addStretch()
-
-    def start_upload(self):
-        """开始上传"""
-        self.upload_thread = UploadThread(self.image_path)
-        self.upload_thread.progress.connect(self.update_progress)
-        self.upload_thread.finished.connect(self.on_upload_complete)
-        self.upload_thread.error.connect(self.on_upload_error)
-        self.upload_thread.start()
-
-    def update_progress(self, value):
-        """更新上传进度"""
-        self.progress_bar.setProgress(value)
-
-    def on_upload_complete(self, encoded):
-        """上传完成处理"""
-        self.encoded_image = encoded
-        self.status_label.setText("上传完成")
-        self.status_label.setStyleSheet("color: #059669; font-size: 12px;")
-        self.upload_complete.emit()
-
-    def on_upload_error(self, error):
-        """上传错误处理"""
-        self.status_label.setText(f"上传失败: {error}")
-        self.status_label.setStyleSheet("color: #DC2626; font-size: 12px;")
-
-    def closeEvent(self, event):
-        """关闭事件"""
-        if self.upload_thread and self.upload_thread.isRunning():
-            self.upload_thread.terminate()
-            self.upload_thread.wait()
-        super().closeEvent(event)
-
-class ChatWidget(QWidget):
-    """聊天组件"""
-
-    def __init__(self, client):
-        super().__init__()
-        self.client = client
-        self.chat_thread = None
-        self.uploads = []  # 存储上传预览组件
-        self.init_ui()
-
-    def init_ui(self):
-        """初始化UI"""
-        # 创建布局
-        layout = QVBoxLayout(self)
-        layout.setContentsMargins(0, 0, 0, 0)
-        layout.setSpacing(0)
-
-        # 消息展示区域
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.scroll_area.setStyleSheet("""
-            QScrollArea {
-                background: white;
-                border: none;
-            }
-        """)
-
-        self.message_container = QWidget()
-        self.messages_layout = QVBoxLayout(self.message_container)
-        self.messages_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
-        self.messages_layout.setSpacing(16)
-        self.messages_layout.setContentsMargins(16, 16, 16, 16)
-
-        self.scroll_area.setWidget(self.message_container)
-        layout.addWidget(self.scroll_area)
-
-        # 底部输入区域
-        input_container = QWidget()
-        input_container.setMaximumHeight(120)
-        input_container.setMinimumHeight(100)
-        input_layout = QVBoxLayout(input_container)
-        input_layout.setContentsMargins(16, 8, 16, 16)
-
-        # 输入框和按钮
-        bottom_layout = QHBoxLayout()
-
-        self.input_box = QTextEdit()
-        self.input_box.setPlaceholderText("输入消息...")
-        self.input_box.setMaximumHeight(80)
-        self.input_box.textChanged.connect(self.on_input_changed)
-        bottom_layout.addWidget(self.input_box)
-
-        btn_layout = QVBoxLayout()
-        btn_layout.setSpacing(4)
-
-        self.upload_btn = QPushButton()
-        self.upload_btn.setIcon(QIcon.fromTheme("document-open"))
-        self.upload_btn.setFixedSize(36, 36)
-        self.upload_btn.setToolTip("上传图片")
-        self.upload_btn.clicked.connect(self.upload_images)
-        self.upload_btn.setStyleSheet("""
-            QPushButton {
-                background: #F3F4F6;
-                border: 1px solid #E0E0E0;
-                border-radius: 18px;
-            }
-            QPushButton:hover {
-                background: #E5E7EB;
-            }
-        """)
-        btn_layout.addWidget(self.upload_btn)
-
-        self.send_btn = QPushButton()
-        self.send_btn.setIcon(QIcon.fromTheme("document-send"))
-        self.send_btn.setFixedSize(36, 36)
-        self.send_btn.setToolTip("发送")
-        self.send_btn.setEnabled(False)
-        self.send_btn.clicked.connect(self.send_message)
-        self.send_btn.setStyleSheet("""
-            QPushButton {
-                background: #2563EB;
-                border: none;
-                border-radius: 18px;
-            }
-            QPushButton:hover {
-                background: #1D4ED8;
-            }
-            QPushButton:disabled {
-                background: #93C5FD;
-            }
-        """)
-        btn_layout.addWidget(self.send_btn)
-
-        bottom_layout.addLayout(btn_layout)
-        input_layout.addLayout(bottom_layout)
-
-        layout.addWidget(input_container)
-
-    def on_input_changed(self):
-        """输入框内容改变时的处理"""
-        has_text = bool(self.input_box.toPlainText().strip())
-        has_uploads = len(self.uploads) == 0 or any(upload.encoded_image for upload in self.uploads)
-        self.send_btn.setEnabled(has_text and has_uploads)
-
-    def upload_images(self):
-        """上传图片"""
-        file_dialog = QFileDialog(self)
-        file_dialog.setFileMode(QFileDialog.FileMode.ExistingFiles)
-        file_dialog.setNameFilter("Images (*.png *.jpg *.jpeg *.gif *.webp)")
-        file_dialog.setViewMode(QFileDialog.ViewMode.List)
-
-        if file_dialog.exec():
-            filenames = file_dialog.selectedFiles()
-            # 添加上传预览到消息区
-            for path in filenames:
-                preview = UploadPreview(path)
-                preview.upload_complete.connect(self.on_input_changed)
-                self.uploads.append(preview)
-                self.messages_layout.addWidget(preview)
-
-            # 检查发送按钮状态
-            self.on_input_changed()
-
-            # 滚动到底部
-            self.scroll_to_bottom()
-
-    def send_message(self):
-        """发送消息"""
-        text = self.input_box.toPlainText().strip()
-        if not text:
-            return
+        self.remove_uploads()
 
-        # 检查是否所有图片都上传完成
-        encoded_images = []
-        for upload in self.uploads:
-            if upload.encoded_image:
-                encoded_images.append(upload.encoded_image)
-            elif upload.upload_thread and upload.upload_thread.isRunning():
-                # 等待上传完成
-                return
-
-        # 添加用户消息
-        user_msg = MessageItem(text, "user", [u.image_path for u in self.uploads])
-        self.messages_layout.addWidget(user_msg)
-
-        # 添加助手消息框
-        assistant_msg = MessageItem("", "assistant")
-        self.messages_layout.addWidget(assistant_msg)
-
-        # 清空输入
-        self.input_box.clear()
-
-        # 清理上传组件
+    def remove_uploads(self):
+        """取消未完成的上传并移除所有上传预览"""
         for upload in self.uploads:
-            if upload.upload_thread and upload.upload_thread.isRunning():
-                upload.upload_thread.terminate()
-                upload.upload_thread.wait()
+            upload.cancel_upload()
             upload.setParent(None)
             upload.deleteLater()
         self.uploads.clear()
-
-        # 创建并启动消息处理线程
-        if self.chat_thread and self.chat_thread.isRunning():
-            self.chat_thread.terminate()
-            self.chat_thread.wait()
-
-        self.chat_thread = ChatThread(
-            self.client,
-            text,
-            encoded_images
-        )
-        self.chat_thread.response_received.connect(assistant_msg.append_content)
-        self.chat_thread.error_occurred.connect(assistant_msg.set_error)
-        self.chat_thread.finished.connect(self.on_message_complete)
-        self.chat_thread.start()
-
-        # 滚动到底部
-        QTimer.singleShot(100, self.scroll_to_bottom)
-
-    def on_message_complete(self):
-        """消息处理完成的处理"""
-        if self.chat_thread:
-            self.chat_thread.quit()
-            self.chat_thread.wait()
-            self.chat_thread.deleteLater()
-            self.chat_thread = None
-
-        # 滚动到底部
-        self.scroll_to_bottom()
-
-    def scroll_to_bottom(self):
-        """滚动到底部"""
-        scrollbar = self.scroll_area.verticalScrollBar()
-        scrollbar.setValue(scrollbar.maximum())
-
-    def clear(self):
-        """清空聊天记录"""
-        # 停止当前的聊天线程
-        if self.chat_thread and self.chat_thread.isRunning():
-            self.chat_thread.terminate()
-            self.chat_thread.wait()
-            self.chat_thread.deleteLater()
-            self.chat_thread = None
-
-        # 清空消息
-        while self.messages_layout.count():
-            item = self.messages_layout.takeAt(0)
-            widget = item.widget()
-            if widget:
-                widget.deleteLater()
-
-        # 清空上传
-        for upload in self.uploads:
-            if upload.upload_thread and upload.upload_thread.isRunning():
-                upload.upload_thread.terminate()
-                upload.upload_thread.wait()
-            upload.deleteLater()
-        self.uploads.clear()
+        self.upload_bar.hide()
+        self.on_input_changed()
 
     def closeEvent(self, event):
         """关闭事件"""
-        # 停止所有线程
-        if self.chat_thread and self.chat_thread.isRunning():
-            self.chat_thread.terminate()
-            self.chat_thread.wait()
+        # 停止所有后台任务
+        self.stop_generation()
 
         for upload in self.uploads:
-            if upload.upload_thread and upload.upload_thread.isRunning():
-                upload.upload_thread.terminate()
-                upload.upload_thread.wait()
+            upload.cancel_upload()
 
-        super().closeEvent(event)
\ No newline at end of file
+        super().closeEvent(event)
@@ -1,5 +1,7 @@
 # ollama_vision/gui/main_window.py
 
+from typing import List, Optional
+
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QSplitter, QListWidget, QComboBox,
@@ -9,8 +11,9 @@ from PyQt6.QtCore import Qt, QSize, QEasingCurve, QPropertyAnimation, QPoint
 from PyQt6.QtGui import QIcon, QFont, QPalette, QColor
 
 from ollama_vision.client import OllamaVisionClient, ModelInfo
-from ollama_vision.exceptions import APIError
+from ollama_vision.config import GUI_TASK_SHUTDOWN_TIMEOUT
 from .chat_widget import ChatWidget
+from .tasks import CallableTask, get_task_scheduler
 
 
 class NotionComboBox(QComboBox):
@@ -120,9 +123,13 @@ class NotionListWidget(QListWidget):
 class MainWindow(QMainWindow):
     """主窗口类"""
 
-    def __init__(self):
+    def __init__(self, client: Optional[OllamaVisionClient] = None):
         super().__init__()
-        self.client = OllamaVisionClient()
+        # 传入的客户端由调用方关闭,自己创建的客户端在窗口关闭时关闭
+        self._owns_client = client is None
+        self.client = client or OllamaVisionClient()
+        self._models_task = None
+        self._selected_model: Optional[str] = None  # 模型列表中当前选中的模型名称
         self.setWindowTitle("Ollama Vision")
         self.setMinimumSize(QSize(1000, 700))
 
@@ -177,6 +184,8 @@ class MainWindow(QMainWindow):
                 """)
 
         self.init_ui()
+        # 先显示上一次已知的模型列表(读取磁盘缓存,不发送请求),再在后台刷新
+        self.show_models(self.client.cached_models())
         self.load_models()
 
     def init_ui(self):
@@ -245,10 +254,10 @@ class MainWindow(QMainWindow):
         model_layout.addWidget(self.model_combo)
 
         # 添加刷新按钮
-        refresh_btn = NotionButton("刷新模型列表")
-        refresh_btn.clicked.connect(lambda: self.load_models(force_refresh=True))
-        refresh_btn.setIcon(QIcon.fromTheme("view-refresh"))
-        model_layout.addWidget(refresh_btn)
+        self.refresh_btn = NotionButton("刷新模型列表")
+        self.refresh_btn.clicked.connect(lambda: self.load_models(force_refresh=True))
+        self.refresh_btn.setIcon(QIcon.fromTheme("view-refresh"))
+        model_layout.addWidget(self.refresh_btn)
 
         sidebar_layout.addWidget(model_section)
 
@@ -313,72 +322,126 @@ class MainWindow(QMainWindow):
         splitter.setStretchFactor(1, 1)  # 聊天区域自适应
 
     def load_models(self, force_refresh: bool = False):
-        """加载可用的模型列表"""
-        try:
-            # 显示加载状态
+        """
+        在后台加载可用的模型列表,加载完成前界面保持响应
+
+        已经显示了模型列表时保留它,刷新完成后原地更新;否则显示加载状态。
+        """
+        if self._selected_model is None:
+            self.model_combo.blockSignals(True)
             self.model_combo.setEnabled(False)
             self.model_combo.clear()
             self.model_combo.addItem("正在加载模型列表...")
-
-            # 获取模型列表
-            models = self.client.get_models(force_refresh=force_refresh)
-
-            if not models:
-                QMessageBox.warning(
-                    self,
-                    "提示",
-                    "未检测到支持视觉功能的模型。\n\n"
-                    "可能的原因：\n"
-                    "1. 模型信息获取不完整，请尝试重启Ollama服务\n"
-                    "2. 当前安装的模型不支持视觉功能\n"
-                    "3. 模型能力检测失败\n\n"
-                    "请确保您的模型支持视觉功能。\n"
-                    "如有疑问，请查看Ollama服务日志获取详细信息。"
-                )
-                return
-
-            # 更新模型列表
+            self.model_combo.blockSignals(False)
+        self.refresh_btn.setEnabled(False)
+        self.refresh_btn.setText("正在刷新...")
+
+        # 获取模型列表需要多次请求服务,在任务调度器中执行
+        self._models_task = CallableTask(self.client.get_models, force_refresh, name="load_models")
+        self._models_task.result_ready.connect(self.on_models_loaded)
+        self._models_task.error.connect(self.on_models_failed)
+        self._models_task.done.connect(self._on_models_task_done)
+        get_task_scheduler().submit(self._models_task)
+
+    def _on_models_task_done(self):
+        if self.sender() is self._models_task:
+            self.refresh_btn.setEnabled(True)
+            self.refresh_btn.setText("刷新模型列表")
+
+    def show_models(self, models: List[ModelInfo]) -> bool:
+        """
+        原地更新模型下拉框,保留当前选中的模型
+
+        当前选中的模型仍在列表中时不会触发模型切换;首次显示或选中的模型已被删除时,
+        选中客户端当前使用的模型(不存在时为第一个)并在后台预加载。
+
+        Args:
+            models: 模型信息列表
+
+        Returns:
+            是否显示了模型,列表为空时不改动下拉框并返回False
+        """
+        if not models:
+            return False
+
+        selected = self._selected_model or self.client.model
+        self.model_combo.blockSignals(True)
+        try:
             self.model_combo.clear()
             for model in models:
                 self.model_combo.addItem(
                     model.display_name,  # 显示名称
                     model.name  # 实际模型名称作为data
                 )
-
-            # 设置当前选中的模型
-            current_index = self.model_combo.findData(self.client.model)
-            if current_index >= 0:
-                self.model_combo.setCurrentIndex(current_index)
-
+            self.model_combo.setCurrentIndex(max(self.model_combo.findData(selected), 0))
             self.model_combo.setEnabled(True)
-
-        except APIError as e:
-            self.model_combo.clear()
-            self.model_combo.addItem("加载失败")
-            self.model_combo.setEnabled(False)
-
-            QMessageBox.critical(
+        finally:
+            self.model_combo.blockSignals(False)
+
+        # 列表重建后只在选中的模型确实变化时触发一次模型切换
+        if self.model_combo.currentData() != self._selected_model:
+            self.on_model_changed(self.model_combo.currentText())
+        return True
+
+    def on_models_loaded(self, models):
+        """模型列表加载完成"""
+        if self.sender() is not self._models_task:
+            # 之后又点击了刷新,忽略较早的结果
+            return
+        if not self.show_models(models):
+            QMessageBox.warning(
                 self,
-                "错误",
-                f"加载模型列表失败\n\n"
-                f"错误信息：{str(e)}\n\n"
-                f"请检查：\n"
-                f"1. Ollama服务是否正常运行\n"
-                f"2. 服务地址 {self.client.base_url} 是否正确\n"
-                f"3. 网络连接是否正常\n\n"
-                f"您可以：\n"
-                f"1. 检查Ollama服务状态\n"
-                f"2. 查看服务日志获取详细信息\n"
-                f"3. 重启Ollama服务后重试"
+                "提示",
+                "未检测到支持视觉功能的模型。\n\n"
+                "可能的原因：\n"
+                "1. 模型信息获取不完整，请尝试重启Ollama服务\n"
+                "2. 当前安装的模型不支持视觉功能\n"
+                "3. 模型能力检测失败\n\n"
+                "请确保您的模型支持视觉功能。\n"
+                "如有疑问，请查看Ollama服务日志获取详细信息。"
             )
 
+    def on_models_failed(self, error: str):
+        """模型列表加载失败"""
+        if self.sender() is not self._models_task:
+            return
+        if self._selected_model is not None:
+            # 已经显示了上一次已知的模型列表,保留它,不打断用户
+            self.model_combo.setToolTip(f"刷新模型列表失败: {error}")
+            return
+
+        self.model_combo.blockSignals(True)
+        self.model_combo.clear()
+        self.model_combo.addItem("加载失败")
+        self.model_combo.setEnabled(False)
+        self.model_combo.blockSignals(False)
+
+        QMessageBox.critical(
+            self,
+            "错误",
+            f"加载模型列表失败\n\n"
+            f"错误信息：{error}\n\n"
+            f"请检查：\n"
+            f"1. Ollama服务是否正常运行\n"
+            f"2. 服务地址 {self.client.base_url} 是否正确\n"
+            f"3. 网络连接是否正常\n\n"
+            f"您可以：\n"
+            f"1. 检查Ollama服务状态\n"
+            f"2. 查看服务日志获取详细信息\n"
+            f"3. 重启Ollama服务后重试"
+        )
+
     def on_model_changed(self, display_name: str):
         """模型选择改变时的处理"""
         # 获取实际的模型名称
         index = self.model_combo.currentIndex()
         if index >= 0:
             model_name = self.model_combo.itemData(index)
-            self.client.set_model(model_name)
+            if model_name:
+                self._selected_model = model_name
+                self.model_combo.setToolTip("")
+                # 切换时在后台预加载,第一次提问不必等待模型加载到显存
+                self.client.set_model(model_name, preload=True)
 
             # 可以在这里添加模型切换的动画效果
             # self.chat_widget.show_model_change_animation()
@@ -394,4 +457,11 @@ class MainWindow(QMainWindow):
         # 确保所有子组件的资源都被正确释放
         if self.chat_widget:
             self.chat_widget.close()
+        # 取消后台任务并等待它们结束,避免退出时工作线程仍在运行
+        scheduler = get_task_scheduler()
+        scheduler.cancel_all()
+        scheduler.wait_for_done(int(GUI_TASK_SHUTDOWN_TIMEOUT * 1000))
+        if self._owns_client:
+            # 释放预加载线程、结果缓存、健康检查线程和连接池
+            self.client.close()
         super().closeEvent(event)
\ No newline at end of file
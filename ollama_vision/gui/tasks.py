@@ -0,0 +1,231 @@
+# ollama_vision/gui/tasks.py
+
+import itertools
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Any, Callable, Dict, Optional
+
+from PyQt6 import sip
+from PyQt6.QtCore import QObject, QThreadPool, pyqtSignal
+
+from ollama_vision.cancellation import CancellationToken
+from ollama_vision.config import GUI_TASK_MAX_WORKERS
+from ollama_vision.exceptions import RequestCancelled
+from ollama_vision.metrics import MetricsRegistry, get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+
+class TaskPriority(IntEnum):
+    """任务优先级,排队的任务中优先级高的先执行"""
+    LOW = 0  # 缩略图解码等可以延后的任务
+    NORMAL = 1  # 图片编码、模型加载
+    HIGH = 2  # 对话回复
+
+
+@dataclass
+class TaskSchedulerStats:
+    """任务调度统计"""
+    submitted: int = 0  # 提交的任务数
+    completed: int = 0  # 正常结束的任务数
+    failed: int = 0  # 抛出异常的任务数
+    cancelled: int = 0  # 被取消的任务数(包括开始前取消而没有执行的)
+    queued: int = 0  # 当前排队等待的任务数
+    running: int = 0  # 当前正在执行的任务数
+    peak_queued: int = 0  # 排队任务数的最大值
+
+
+class Task(QObject):
+    """
+    在TaskScheduler中执行的任务
+
+    子类实现run(),在工作线程中执行,通过自定义信号把结果发回GUI线程。
+    任务结束后(完成、失败或取消)发出done。长时间运行的任务应定期检查cancel_token。
+    """
+
+    done = pyqtSignal()  # 任务结束
+
+    def __init__(self, name: str, priority: TaskPriority = TaskPriority.NORMAL):
+        super().__init__()
+        self.name = name
+        self.priority = priority
+        self.cancel_token = CancellationToken()
+        self._finished = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        """是否已经取消"""
+        return self.cancel_token.cancelled
+
+    def cancel(self):
+        """取消任务,尚未开始的任务不再执行"""
+        self.cancel_token.cancel()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待任务结束
+
+        Args:
+            timeout: 最长等待秒数,为None时一直等待
+
+        Returns:
+            任务是否已经结束
+        """
+        return self._finished.wait(timeout)
+
+    def run(self):
+        """任务内容,在工作线程中执行"""
+        raise NotImplementedError
+
+
+class CallableTask(Task):
+    """在工作线程中调用一个函数,返回值通过result_ready发回GUI线程"""
+
+    result_ready = pyqtSignal(object)  # 函数的返回值
+    error = pyqtSignal(str)  # 函数抛出的异常
+
+    def __init__(self, fn: Callable[..., Any], *args, name: Optional[str] = None,
+                 priority: TaskPriority = TaskPriority.NORMAL):
+        super().__init__(name or getattr(fn, "__name__", "task"), priority)
+        self._fn = fn
+        self._args = args
+
+    def run(self):
+        try:
+            result = self._fn(*self._args)
+        except RequestCancelled:
+            raise
+        except Exception as e:
+            self.error.emit(str(e))
+            raise
+        self.result_ready.emit(result)
+
+
+class TaskScheduler(QObject):
+    """
+    界面共用的任务调度器
+
+    对话回复、图片编码、模型加载和缩略图解码都在同一个有界线程池中执行,
+    不再为每个任务创建和销毁线程。排队的任务按优先级执行,开始前取消的任务直接跳过。
+    每个任务的排队时间和执行时间按任务名称记录到指标注册表中。
+    """
+
+    task_started = pyqtSignal(object)  # Task
+    task_finished = pyqtSignal(object)  # Task,完成、失败或取消
+    _released = pyqtSignal(int)  # 任务结束后在GUI线程中释放对它的引用
+
+    def __init__(self, max_workers: int = GUI_TASK_MAX_WORKERS, metrics_registry: Optional[MetricsRegistry] = None,
+                 parent=None):
+        super().__init__(parent)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max_workers)
+        self._lock = threading.Lock()
+        self._stats = TaskSchedulerStats()
+        # 排队和执行中的任务。引用只在GUI线程中释放: 任务是GUI线程的QObject,
+        # 在工作线程中析构会与发给它的排队信号冲突
+        self._active: Dict[int, Task] = {}
+        self._task_ids = itertools.count()
+        self._released.connect(self._release)
+        registry = metrics_registry or get_metrics_registry()
+        self._wait_time = registry.histogram(
+            "ollama_vision_gui_task_wait_seconds", "Time GUI tasks spend queued before a worker picks them up",
+            ("task",)
+        )
+        self._run_time = registry.histogram(
+            "ollama_vision_gui_task_run_seconds", "Time GUI tasks spend running on a worker", ("task",)
+        )
+
+    @property
+    def max_workers(self) -> int:
+        return self._pool.maxThreadCount()
+
+    def stats(self) -> TaskSchedulerStats:
+        """返回调度统计的快照"""
+        with self._lock:
+            return TaskSchedulerStats(**self._stats.__dict__)
+
+    def submit(self, task: Task) -> Task:
+        """
+        提交任务
+
+        任务可能在submit返回前就已经结束,需要的信号应在提交前连接。
+
+        Args:
+            task: 要执行的任务,执行结束前调度器保留对它的引用
+
+        Returns:
+            传入的任务
+        """
+        submitted_at = time.perf_counter()
+        task_id = next(self._task_ids)
+        with self._lock:
+            self._active[task_id] = task
+            self._stats.submitted += 1
+            self._stats.queued += 1
+            self._stats.peak_queued = max(self._stats.peak_queued, self._stats.queued)
+        self._pool.start(lambda: self._execute(task_id, submitted_at), int(task.priority))
+        return task
+
+    def _execute(self, task_id: int, submitted_at: float):
+        started_at = time.perf_counter()
+        with self._lock:
+            task = self._active[task_id]
+            self._stats.queued -= 1
+            self._stats.running += 1
+        self._wait_time.observe(started_at - submitted_at, task.name)
+
+        outcome = "cancelled"
+        try:
+            if not task.cancelled:
+                self.task_started.emit(task)
+                task.run()
+                outcome = "cancelled" if task.cancelled else "completed"
+        except RequestCancelled:
+            pass
+        except Exception as e:
+            outcome = "failed"
+            logger.exception(f"GUI task {task.name} failed: {e}")
+        finally:
+            self._run_time.observe(time.perf_counter() - started_at, task.name)
+            with self._lock:
+                self._stats.running -= 1
+                setattr(self._stats, outcome, getattr(self._stats, outcome) + 1)
+            logger.debug(
+                f"GUI task {task.name} {outcome}: waited {(started_at - submitted_at) * 1000:.1f}ms, "
+                f"ran {(time.perf_counter() - started_at) * 1000:.1f}ms"
+            )
+            task.done.emit()
+            self.task_finished.emit(task)
+            task._finished.set()
+            del task
+            self._released.emit(task_id)
+
+    def _release(self, task_id: int):
+        with self._lock:
+            self._active.pop(task_id, None)
+
+    def cancel_all(self):
+        """取消所有排队和执行中的任务,排队的任务不再执行,执行中的任务在检查取消后结束"""
+        with self._lock:
+            tasks = list(self._active.values())
+        for task in tasks:
+            task.cancel()
+
+    def wait_for_done(self, timeout_ms: int = -1) -> bool:
+        """等待所有任务结束,超时返回False"""
+        return self._pool.waitForDone(timeout_ms)
+
+
+_scheduler: Optional[TaskScheduler] = None
+
+
+def get_task_scheduler() -> TaskScheduler:
+    """返回界面共用的任务调度器,第一次调用时创建"""
+    global _scheduler
+    # QApplication被销毁时PyQt会一并删除它,之后重新创建
+    if _scheduler is None or sip.isdeleted(_scheduler):
+        _scheduler = TaskScheduler()
+    return _scheduler
@@ -0,0 +1,155 @@
+# ollama_vision/gui/thumbnails.py
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set, Tuple
+
+from PyQt6 import sip
+from PyQt6.QtCore import QObject, QSize, Qt, pyqtSignal
+from PyQt6.QtGui import QImage, QImageReader, QPixmap
+
+from ollama_vision.config import THUMBNAIL_CACHE_BYTES
+from .tasks import CallableTask, TaskPriority, TaskScheduler, get_task_scheduler
+
+ThumbnailKey = Tuple[str, int]  # (图片路径, 缩略图边长)
+
+
+@dataclass
+class ThumbnailCacheStats:
+    """缩略图缓存统计"""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    bytes: int = 0
+    pending: int = 0
+
+
+def decode_thumbnail(path: str, size: int) -> QImage:
+    """
+    按缩略图尺寸解码图片,不会先解码出原图
+
+    JPEG等格式在解码时直接缩小,大图也只占用缩略图大小的内存。可以在任意线程调用。
+
+    Args:
+        path: 图片路径
+        size: 缩略图的最大边长
+
+    Returns:
+        缩略图,无法读取时返回空图片
+    """
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    original = reader.size()
+    if original.isValid():
+        scaled = original.scaled(QSize(size, size), Qt.AspectRatioMode.KeepAspectRatio)
+        if scaled.width() < original.width():
+            reader.setScaledSize(scaled)
+    return reader.read()
+
+
+class ThumbnailCache(QObject):
+    """
+    对话记录和上传预览共用的缩略图缓存
+
+    get()命中时直接返回缩略图;未命中时返回None并以低优先级在任务调度器中解码,
+    解码完成后发出thumbnail_ready,界面收到后重新绘制。
+    缓存按字节数限制大小,超出时淘汰最久未使用的缩略图。只能在GUI线程中调用。
+    """
+
+    thumbnail_ready = pyqtSignal(str, int)  # 图片路径, 缩略图边长
+    _decoded = pyqtSignal(str, int, QImage)  # 从解码线程发回GUI线程
+
+    def __init__(self, max_bytes: int = THUMBNAIL_CACHE_BYTES, scheduler: Optional[TaskScheduler] = None,
+                 parent=None):
+        super().__init__(parent)
+        self.max_bytes = max_bytes
+        self._scheduler = scheduler or get_task_scheduler()
+        self._entries: "OrderedDict[ThumbnailKey, QPixmap]" = OrderedDict()
+        self._pending: Set[ThumbnailKey] = set()
+        self._tasks: Dict[CallableTask, ThumbnailKey] = {}  # 解码中的任务 -> 缩略图
+        self._bytes = 0
+        self._stats = ThumbnailCacheStats()
+        self._decoded.connect(self._on_decoded)
+
+    @staticmethod
+    def _pixmap_bytes(pixmap: QPixmap) -> int:
+        # 无法读取的图片也缓存一个空结果,避免重复解码
+        return max(pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8, 1)
+
+    def stats(self) -> ThumbnailCacheStats:
+        """返回缓存统计的快照"""
+        return ThumbnailCacheStats(
+            hits=self._stats.hits,
+            misses=self._stats.misses,
+            evictions=self._stats.evictions,
+            entries=len(self._entries),
+            bytes=self._bytes,
+            pending=len(self._pending)
+        )
+
+    def get(self, path: str, size: int) -> Optional[QPixmap]:
+        """
+        查找缩略图,未命中时开始后台解码
+
+        Returns:
+            缩略图(无法读取时为空QPixmap),尚未解码完成时返回None
+        """
+        key = (path, size)
+        pixmap = self._entries.get(key)
+        if pixmap is not None:
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return pixmap
+
+        if key not in self._pending:
+            self._stats.misses += 1
+            self._pending.add(key)
+            task = CallableTask(self._decode, path, size, name="thumbnail", priority=TaskPriority.LOW)
+            task.done.connect(self._on_task_done)
+            self._tasks[task] = key
+            self._scheduler.submit(task)
+        return None
+
+    def _decode(self, path: str, size: int):
+        self._decoded.emit(path, size, decode_thumbnail(path, size))
+
+    def _on_decoded(self, path: str, size: int, image: QImage):
+        key = (path, size)
+        self._pending.discard(key)
+        pixmap = QPixmap.fromImage(image) if not image.isNull() else QPixmap()
+        cost = self._pixmap_bytes(pixmap)
+        if cost <= self.max_bytes:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= self._pixmap_bytes(old)
+            self._entries[key] = pixmap
+            self._bytes += cost
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= self._pixmap_bytes(evicted)
+                self._stats.evictions += 1
+        self.thumbnail_ready.emit(path, size)
+
+    def _on_task_done(self):
+        """解码任务结束,失败或被取消时也清除等待标记,之后的get()会重新提交"""
+        key = self._tasks.pop(self.sender(), None)
+        if key is not None:
+            self._pending.discard(key)
+
+    def clear(self):
+        """清空缓存,正在解码的缩略图完成后仍会写入"""
+        self._entries.clear()
+        self._bytes = 0
+
+
+_thumbnail_cache: Optional[ThumbnailCache] = None
+
+
+def get_thumbnail_cache() -> ThumbnailCache:
+    """返回界面共用的缩略图缓存,第一次调用时创建(需要已经创建QApplication)"""
+    global _thumbnail_cache
+    # QApplication被销毁时PyQt会一并删除它,之后重新创建
+    if _thumbnail_cache is None or sip.isdeleted(_thumbnail_cache):
+        _thumbnail_cache = ThumbnailCache()
+    return _thumbnail_cache
@@ -0,0 +1,46 @@
+# ollama_vision/gui/token_batcher.py
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from ollama_vision.config import TOKEN_FLUSH_INTERVAL_MS
+
+
+class TokenBatcher(QObject):
+    """
+    合并流式输出的文本片段
+
+    ChatThread每收到一个token就发出一次信号,逐个刷新界面会让每个token都触发一次排版和重绘。
+    这里先把片段缓存起来,在第一个片段到达后的一帧时间内合并成一段发出,
+    界面每帧最多更新一次,与输出速度无关。
+    """
+
+    flushed = pyqtSignal(str)  # 合并后的文本
+
+    def __init__(self, interval_ms: int = TOKEN_FLUSH_INTERVAL_MS, parent=None):
+        super().__init__(parent)
+        self._parts = []
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self.flush)
+
+    @property
+    def pending(self) -> bool:
+        """是否有尚未发出的文本"""
+        return bool(self._parts)
+
+    def append(self, text: str):
+        """缓存一个片段,在本帧结束时发出"""
+        if not text:
+            return
+        self._parts.append(text)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self):
+        """立即发出缓存的文本,回复结束或出错时调用"""
+        self._timer.stop()
+        if self._parts:
+            text = "".join(self._parts)
+            self._parts.clear()
+            self.flushed.emit(text)
@@ -0,0 +1,382 @@
+# ollama_vision/gui/transcript.py
+
+import itertools
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, QRect, QRectF, QSize
+from PyQt6.QtGui import (
+    QAction, QColor, QFont, QFontMetrics, QGuiApplication, QKeySequence, QPainter,
+    QPainterPath, QPalette, QPen, QTextCursor, QTextDocument, QAbstractTextDocumentLayout
+)
+from PyQt6.QtWidgets import (
+    QAbstractItemView, QAbstractScrollArea, QFrame, QStyle, QStyledItemDelegate, QStyleOptionViewItem, QTreeView
+)
+
+from ollama_vision.config import TRANSCRIPT_LAYOUT_CACHE_SIZE, THUMBNAIL_SIZE
+from .thumbnails import get_thumbnail_cache
+
+_message_ids = itertools.count(1)
+
+# 消息气泡的尺寸(像素),与原来的MessageItem一致
+MARGIN = 16  # 列表四周和消息之间的间距
+PADDING_H = 16
+PADDING_V = 12
+SECTION_SPACING = 12  # 标题、图片和正文之间的间距
+THUMBNAIL_SPACING = 8
+
+
+def format_stats(stats) -> str:
+    """把ChatStats格式化为一行耗时与token统计"""
+    parts = []
+    if stats.time_to_first_token is not None:
+        parts.append(f"首字 {stats.time_to_first_token:.2f}s")
+    parts.append(f"提示词 {stats.prompt_eval_count} tokens / {stats.prompt_eval_duration:.2f}s")
+    parts.append(f"生成 {stats.eval_count} tokens / {stats.eval_rate:.1f} tok/s")
+    if stats.load_duration >= 0.1:
+        parts.append(f"加载 {stats.load_duration:.1f}s")
+    return " · ".join(parts)
+
+
+@dataclass
+class ChatMessage:
+    """对话记录中的一条消息,只保存数据,由MessageDelegate绘制"""
+    role: str
+    text: str = ""
+    images: List[str] = field(default_factory=list)  # 图片文件路径
+    stats_text: str = ""  # 回复完成后的统计信息
+    error: bool = False
+    revision: int = 0  # 文本被整体替换时递增,只追加时不变
+    id: int = field(default_factory=lambda: next(_message_ids))
+
+
+class TranscriptModel(QAbstractListModel):
+    """
+    对话记录的数据模型
+
+    消息以id标识,行号在清空前保持不变。按id更新的方法在消息已被清空时直接忽略,
+    取消的回复线程迟到的信号不会写入新的对话。
+    """
+
+    MessageRole = Qt.ItemDataRole.UserRole + 1
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._messages: List[ChatMessage] = []
+        self._rows: Dict[int, int] = {}
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._messages)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+        message = self._messages[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return message.text
+        if role == self.MessageRole:
+            return message
+        return None
+
+    def message(self, row: int) -> ChatMessage:
+        return self._messages[row]
+
+    def add_message(self, role: str, text: str = "", images: Optional[List[str]] = None) -> int:
+        """添加一条消息,返回消息id"""
+        message = ChatMessage(role=role, text=text, images=list(images or []))
+        row = len(self._messages)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._messages.append(message)
+        self._rows[message.id] = row
+        self.endInsertRows()
+        return message.id
+
+    def append_text(self, message_id: int, text: str):
+        """在消息末尾追加文本"""
+        row = self._rows.get(message_id)
+        if row is None or not text:
+            return
+        self._messages[row].text += text
+        self._changed(row)
+
+    def set_error(self, message_id: int, error_msg: str):
+        """用错误信息替换消息内容"""
+        row = self._rows.get(message_id)
+        if row is None:
+            return
+        message = self._messages[row]
+        message.text = f"发生错误: {error_msg}"
+        message.error = True
+        message.revision += 1
+        self._changed(row)
+
+    def set_stats(self, message_id: int, stats):
+        """显示回复的耗时与token统计"""
+        row = self._rows.get(message_id)
+        if row is None:
+            return
+        self._messages[row].stats_text = format_stats(stats)
+        self._changed(row)
+
+    def clear(self):
+        """清空所有消息"""
+        self.beginResetModel()
+        self._messages.clear()
+        self._rows.clear()
+        self.endResetModel()
+
+    def _changed(self, row: int):
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+
+
+class _TextLayout:
+    """一条消息正文的排版结果,追加文本时在原文档末尾插入"""
+
+    def __init__(self, font: QFont):
+        self.document = QTextDocument()
+        self.document.setDocumentMargin(0)
+        self.document.setDefaultFont(font)
+        self.cursor = QTextCursor(self.document)
+        self.revision = -1
+        self.length = 0
+
+    def update(self, message: ChatMessage, width: int):
+        if self.revision != message.revision or len(message.text) < self.length:
+            self.document.setPlainText(message.text)
+            self.cursor = QTextCursor(self.document)
+            self.revision = message.revision
+            self.length = len(message.text)
+        elif len(message.text) > self.length:
+            self.cursor.movePosition(QTextCursor.MoveOperation.End)
+            self.cursor.insertText(message.text[self.length:])
+            self.length = len(message.text)
+        if self.document.textWidth() != width:
+            self.document.setTextWidth(width)
+
+
+class MessageDelegate(QStyledItemDelegate):
+    """
+    绘制消息气泡
+
+    只有绘制或计算高度时才为消息排版,排版结果按最近使用保留layout_cache_size条,
+    滚出视图的消息只保留高度。图片缩略图来自共用的ThumbnailCache,解码完成前显示占位框。
+    """
+
+    def __init__(self, view: QAbstractScrollArea, layout_cache_size: int = TRANSCRIPT_LAYOUT_CACHE_SIZE):
+        super().__init__(view)
+        self._view = view
+        self.layout_cache_size = layout_cache_size
+        self._layouts: "OrderedDict[int, _TextLayout]" = OrderedDict()
+        # 消息id -> (宽度, revision, 文本长度, 高度)
+        self._heights: Dict[int, tuple] = {}
+
+        self.body_font = QFont("苹方", 12)
+        self.icon_font = QFont("苹方", 14)
+        self.role_font = QFont("苹方", 11)
+        self.stats_font = QFont("苹方", 10)
+        self._header_height = max(QFontMetrics(self.icon_font).height(), QFontMetrics(self.role_font).height())
+        self._thumbnails = get_thumbnail_cache()
+        self._thumbnails.thumbnail_ready.connect(self._on_thumbnail_ready)
+
+    # ---- 尺寸 ----
+
+    def _text_width(self) -> int:
+        return max(self._view.viewport().width() - 2 * MARGIN - 2 * PADDING_H, 50)
+
+    def _layout(self, message: ChatMessage) -> _TextLayout:
+        layout = self._layouts.get(message.id)
+        if layout is None:
+            layout = self._layouts[message.id] = _TextLayout(self.body_font)
+            while len(self._layouts) > self.layout_cache_size:
+                self._layouts.popitem(last=False)
+        else:
+            self._layouts.move_to_end(message.id)
+        layout.update(message, self._text_width())
+        return layout
+
+    def message_height(self, message: ChatMessage) -> int:
+        """消息气泡的高度(不含间距),未变化时直接返回缓存的结果"""
+        width = self._text_width()
+        key = (width, message.revision, len(message.text))
+        cached = self._heights.get(message.id)
+        if cached is not None and cached[:3] == key:
+            return cached[3]
+        height = PADDING_V + self._header_height + SECTION_SPACING
+        if message.images:
+            height += THUMBNAIL_SIZE + SECTION_SPACING
+        height += int(self._layout(message).document.size().height()) + PADDING_V + 4
+        self._heights[message.id] = key + (height,)
+        return height
+
+    def sizeHint(self, option: QStyleOptionViewItem, index: QModelIndex) -> QSize:
+        message = index.data(TranscriptModel.MessageRole)
+        return QSize(self._view.viewport().width(), self.message_height(message) + MARGIN)
+
+    def forget(self):
+        """清空对话后丢弃所有排版缓存"""
+        self._layouts.clear()
+        self._heights.clear()
+
+    # ---- 绘制 ----
+
+    def paint(self, painter: QPainter, option: QStyleOptionViewItem, index: QModelIndex):
+        message: ChatMessage = index.data(TranscriptModel.MessageRole)
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+        bubble = QRectF(option.rect).adjusted(MARGIN + 0.5, MARGIN + 0.5, -MARGIN - 0.5, -0.5)
+        path = QPainterPath()
+        path.addRoundedRect(bubble, 8, 8)
+        painter.fillPath(path, QColor("#F7F7F7" if message.role == "user" else "#FFFFFF"))
+        selected = bool(option.state & QStyle.StateFlag.State_Selected)
+        painter.setPen(QPen(QColor("#93C5FD" if selected else "#E0E0E0"), 1))
+        painter.drawPath(path)
+
+        left = int(bubble.left()) + PADDING_H
+        right = int(bubble.right()) - PADDING_H
+        top = int(bubble.top()) + PADDING_V
+
+        # 标题: 角色图标、名称和统计信息
+        painter.setFont(self.icon_font)
+        painter.setPen(QColor("#333333"))
+        icon = "👤" if message.role == "user" else "🤖"
+        icon_width = QFontMetrics(self.icon_font).horizontalAdvance(icon)
+        header = QRect(left, top, right - left, self._header_height)
+        painter.drawText(header, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, icon)
+        painter.setFont(self.role_font)
+        painter.setPen(QColor("#666666"))
+        painter.drawText(
+            header.adjusted(icon_width + 6, 0, 0, 0), Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
+            "用户" if message.role == "user" else "助手"
+        )
+        if message.stats_text:
+            painter.setFont(self.stats_font)
+            painter.setPen(QColor("#9CA3AF"))
+            painter.drawText(header, Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter, message.stats_text)
+        top += self._header_height + SECTION_SPACING
+
+        # 图片缩略图,放不下的显示剩余数量
+        if message.images:
+            x = left
+            for i, path in enumerate(message.images):
+                if x + THUMBNAIL_SIZE > right and i:
+                    painter.setFont(self.role_font)
+                    painter.setPen(QColor("#666666"))
+                    painter.drawText(
+                        QRect(x, top, right - x, THUMBNAIL_SIZE), Qt.AlignmentFlag.AlignVCenter,
+                        f"+{len(message.images) - i}"
+                    )
+                    break
+                self._paint_thumbnail(painter, QRect(x, top, THUMBNAIL_SIZE, THUMBNAIL_SIZE), path)
+                x += THUMBNAIL_SIZE + THUMBNAIL_SPACING
+            top += THUMBNAIL_SIZE + SECTION_SPACING
+
+        # 正文
+        layout = self._layout(message)
+        painter.translate(left, top)
+        context = QAbstractTextDocumentLayout.PaintContext()
+        context.palette.setColor(QPalette.ColorRole.Text, QColor("#DC2626" if message.error else "#333333"))
+        clip = QRectF(option.rect.intersected(self._view.viewport().rect())).translated(-left, -top)
+        context.clip = clip
+        painter.setClipRect(clip)
+        layout.document.documentLayout().draw(painter, context)
+        painter.restore()
+
+    def _paint_thumbnail(self, painter: QPainter, rect: QRect, path: str):
+        pixmap = self._thumbnails.get(path, THUMBNAIL_SIZE)
+        frame = QRectF(rect).adjusted(0.5, 0.5, -0.5, -0.5)
+        if pixmap is None:
+            # 尚未解码完成,显示占位框
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(QColor("#EEEEEE"))
+            painter.drawRoundedRect(frame, 4, 4)
+            painter.setBrush(Qt.BrushStyle.NoBrush)
+            return
+        painter.setPen(QColor("#E0E0E0"))
+        painter.drawRoundedRect(frame, 4, 4)
+        if not pixmap.isNull():
+            target = QRect(0, 0, pixmap.width(), pixmap.height())
+            target.moveCenter(rect.center())
+            painter.drawPixmap(target, pixmap)
+
+    def _on_thumbnail_ready(self, path: str, size: int):
+        if size == THUMBNAIL_SIZE:
+            self._view.viewport().update()
+
+
+class TranscriptView(QTreeView):
+    """
+    虚拟化的对话记录视图
+
+    只绘制可见的消息。停留在底部时跟随新的输出滚动,向上翻阅时保持位置。
+    右键菜单或Ctrl+C复制选中消息的文本。
+
+    使用不显示表头的QTreeView而不是QListView: QTreeView按行缓存高度,某条消息变高时只重新计算这一行,
+    QListView则会重新排列所有消息,对话越长流式输出越慢。
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.transcript = TranscriptModel(self)
+        self.setModel(self.transcript)
+        self.delegate = MessageDelegate(self)
+        self.setItemDelegate(self.delegate)
+
+        self.setHeaderHidden(True)
+        self.setRootIsDecorated(False)
+        self.setItemsExpandable(False)
+        self.setIndentation(0)
+        self.setUniformRowHeights(False)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self._laid_out_width = 0
+        # 用调色板而不是样式表设置背景,样式表会让每次重绘都经过QStyleSheetStyle
+        self.setFrameShape(QFrame.Shape.NoFrame)
+        palette = self.palette()
+        palette.setColor(QPalette.ColorRole.Base, QColor("white"))
+        # 选中状态由消息气泡的边框表示,不绘制整行高亮
+        palette.setColor(QPalette.ColorRole.Highlight, QColor("white"))
+        self.setPalette(palette)
+
+        self._follow = True
+        scrollbar = self.verticalScrollBar()
+        scrollbar.valueChanged.connect(self._on_scrolled)
+        scrollbar.rangeChanged.connect(self._on_range_changed)
+
+        copy_action = QAction("复制", self)
+        copy_action.setShortcut(QKeySequence.StandardKey.Copy)
+        copy_action.setShortcutContext(Qt.ShortcutContext.WidgetShortcut)
+        copy_action.triggered.connect(self.copy_selection)
+        self.addAction(copy_action)
+        self.setContextMenuPolicy(Qt.ContextMenuPolicy.ActionsContextMenu)
+
+    def copy_selection(self):
+        """复制选中消息的文本"""
+        indexes = self.selectedIndexes()
+        if indexes:
+            QGuiApplication.clipboard().setText(indexes[0].data(Qt.ItemDataRole.DisplayRole))
+
+    def clear(self):
+        """清空对话记录"""
+        self.transcript.clear()
+        self.delegate.forget()
+        self._follow = True
+
+    def resizeEvent(self, event):
+        # 宽度变化后换行位置改变,所有消息的高度都要重新计算
+        super().resizeEvent(event)
+        width = self.viewport().width()
+        if width != self._laid_out_width:
+            self._laid_out_width = width
+            self.scheduleDelayedItemsLayout()
+
+    def _on_scrolled(self, value: int):
+        self._follow = value >= self.verticalScrollBar().maximum() - 4
+
+    def _on_range_changed(self, minimum: int, maximum: int):
+        if self._follow:
+            self.verticalScrollBar().setValue(maximum)
@@ -0,0 +1,255 @@
+# ollama_vision/http_pool.py
+"""HTTP连接池模块"""
+
+import socket
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Optional
+
+from ollama_vision.cancellation import CancellationToken
+from ollama_vision.config import DEFAULT_POOL_SIZE, DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
+
+if TYPE_CHECKING:
+    import requests
+
+# 当前线程正在发送的请求对应的_ConnectionGuard
+_local = threading.local()
+
+
+@dataclass
+class PoolStats:
+    """连接复用统计数据类"""
+    requests: int = 0  # 已发出的请求数
+    connections_opened: int = 0  # 新建的TCP连接数
+
+    @property
+    def connections_reused(self) -> int:
+        """复用已有连接的请求数"""
+        return max(self.requests - self.connections_opened, 0)
+
+    @property
+    def reuse_ratio(self) -> float:
+        """连接复用率(0-1之间)"""
+        if not self.requests:
+            return 0.0
+        return self.connections_reused / self.requests
+
+
+class _ConnectionGuard:
+    """
+    把一个请求使用的连接与取消令牌关联
+
+    连接从urllib3连接池取出时绑定,响应读完或关闭、连接归还连接池时解除。
+    令牌取消时关闭该连接的socket,阻塞在等待响应头或读取响应体上的线程会立即返回。
+    取消时连接还没有建立(没有socket)的,在绑定连接或连接建立后立即断开,请求不会被发送出去。
+    """
+
+    def __init__(self, token: CancellationToken):
+        self._lock = threading.Lock()
+        self._conn = None
+        self._cancelled = False
+        self._unregister = token.register(self.abort)
+
+    def attach(self, conn):
+        with self._lock:
+            self._conn = conn
+            cancelled = self._cancelled
+        conn._cancel_guard = self
+        if cancelled:
+            self._shutdown(conn)
+
+    def detach(self):
+        with self._lock:
+            conn, self._conn = self._conn, None
+        if conn is not None and getattr(conn, "_cancel_guard", None) is self:
+            conn._cancel_guard = None
+        self._unregister()
+
+    def abort(self):
+        with self._lock:
+            self._cancelled = True
+            conn = self._conn
+        self._shutdown(conn)
+
+    def connected(self, conn):
+        """连接建立后调用,连接建立前已经取消时立即断开"""
+        with self._lock:
+            cancelled = self._cancelled and conn is self._conn
+        if cancelled:
+            self._shutdown(conn)
+
+    @staticmethod
+    def _shutdown(conn):
+        sock = getattr(conn, "sock", None)
+        if sock is not None:
+            try:
+                # shutdown会唤醒其他线程中阻塞的recv,close不会
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+def _counting_pool_class(base_cls: type, on_new_conn: Callable[[], None]) -> type:
+    """生成一个在新建连接时回调计数、并把取出的连接绑定到当前请求取消令牌的urllib3连接池类"""
+
+    def _new_conn(self):
+        on_new_conn()
+        conn = base_cls._new_conn(self)
+        connect = conn.connect
+
+        def guarded_connect():
+            connect()
+            # 连接建立期间取消时socket还不存在,建立后再检查一次
+            guard = getattr(conn, "_cancel_guard", None)
+            if guard is not None:
+                guard.connected(conn)
+
+        conn.connect = guarded_connect
+        return conn
+
+    def _get_conn(self, timeout=None):
+        conn = base_cls._get_conn(self, timeout)
+        guard = getattr(_local, "guard", None)
+        if guard is not None:
+            guard.attach(conn)
+        return conn
+
+    def _put_conn(self, conn):
+        guard = getattr(conn, "_cancel_guard", None)
+        if guard is not None:
+            guard.detach()
+        base_cls._put_conn(self, conn)
+
+    return type(
+        f"Counting{base_cls.__name__}", (base_cls,),
+        {"_new_conn": _new_conn, "_get_conn": _get_conn, "_put_conn": _put_conn}
+    )
+
+
+@lru_cache(maxsize=None)
+def _counting_adapter_class() -> type:
+    """返回统计新建连接数的HTTPAdapter子类,第一次调用时才导入requests"""
+    from requests.adapters import HTTPAdapter
+
+    class _CountingAdapter(HTTPAdapter):
+        """统计新建连接数的HTTPAdapter"""
+
+        def __init__(self, on_new_conn: Callable[[], None], **kwargs):
+            self._on_new_conn = on_new_conn
+            super().__init__(**kwargs)
+
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {
+                scheme: _counting_pool_class(cls, self._on_new_conn)
+                for scheme, cls in self.poolmanager.pool_classes_by_scheme.items()
+            }
+
+    return _CountingAdapter
+
+
+class ConnectionPool:
+    """
+    线程安全的HTTP长连接池
+
+    所有请求共享同一个requests.Session,底层由urllib3连接池按主机复用TCP连接。
+    Session在第一次发送请求时才创建,创建连接池本身不会导入requests。
+    """
+
+    def __init__(
+            self,
+            pool_size: int = DEFAULT_POOL_SIZE,
+            keep_alive: bool = True,
+            connect_timeout: Optional[float] = DEFAULT_CONNECT_TIMEOUT,
+            read_timeout: Optional[float] = DEFAULT_READ_TIMEOUT
+    ):
+        """
+        初始化连接池
+
+        Args:
+            pool_size: 每个主机保留的最大空闲连接数
+            keep_alive: 是否使用HTTP长连接,关闭时每个请求结束后断开连接
+            connect_timeout: 建立连接的超时时间(秒),None表示不限制
+            read_timeout: 两次读取数据之间的超时时间(秒),None表示不限制
+        """
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self.timeout = (connect_timeout, read_timeout)
+
+        self._lock = threading.Lock()
+        self._stats = PoolStats()
+        self._session: Optional["requests.Session"] = None
+
+    def _get_session(self) -> "requests.Session":
+        """按需创建会话"""
+        with self._lock:
+            if self._session is None:
+                import requests
+
+                session = requests.Session()
+                adapter = _counting_adapter_class()(
+                    self._on_new_connection,
+                    pool_connections=self.pool_size,
+                    pool_maxsize=self.pool_size
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                if not self.keep_alive:
+                    session.headers["Connection"] = "close"
+                self._session = session
+            return self._session
+
+    def _on_new_connection(self):
+        with self._lock:
+            self._stats.connections_opened += 1
+
+    @property
+    def stats(self) -> PoolStats:
+        """返回连接复用统计的快照"""
+        with self._lock:
+            return PoolStats(self._stats.requests, self._stats.connections_opened)
+
+    def request(
+            self,
+            method: str,
+            url: str,
+            cancel: Optional[CancellationToken] = None,
+            **kwargs
+    ) -> "requests.Response":
+        """
+        通过连接池发送请求
+
+        Args:
+            method: HTTP方法
+            url: 请求地址
+            cancel: 取消令牌,取消时断开该请求的连接,直到响应读完或关闭为止有效
+            **kwargs: 传递给requests.Session.request的其他参数
+
+        Returns:
+            响应对象
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        session = self._get_session()
+        with self._lock:
+            self._stats.requests += 1
+        if cancel is None:
+            return session.request(method, url, **kwargs)
+
+        cancel.raise_if_cancelled()
+        guard = _ConnectionGuard(cancel)
+        _local.guard = guard
+        try:
+            return session.request(method, url, **kwargs)
+        except Exception:
+            guard.detach()
+            raise
+        finally:
+            _local.guard = None
+
+    def close(self):
+        """关闭连接池中的所有连接"""
+        with self._lock:
+            session = self._session
+        if session is not None:
+            session.close()
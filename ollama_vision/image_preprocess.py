@@ -0,0 +1,128 @@
+# ollama_vision/image_preprocess.py
+"""图片发送前的缩放与重新编码模块"""
+
+import io
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Union
+
+from ollama_vision.config import (
+    MODEL_IMAGE_MAX_DIMENSIONS, DEFAULT_IMAGE_MAX_DIMENSION, DEFAULT_IMAGE_FORMAT, DEFAULT_IMAGE_QUALITY
+)
+from ollama_vision.exceptions import ImageProcessingError
+
+logger = logging.getLogger(__name__)
+
+# 输出格式对应的Pillow格式名和MIME类型
+_FORMATS = {
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+    "PNG": "image/png",
+}
+
+
+@dataclass(frozen=True)
+class PreprocessOptions:
+    """图片预处理参数"""
+    max_dimension: int = DEFAULT_IMAGE_MAX_DIMENSION  # 最长边的最大像素数
+    format: str = DEFAULT_IMAGE_FORMAT  # 重新编码的格式: JPEG/WEBP/PNG
+    quality: int = DEFAULT_IMAGE_QUALITY  # 有损格式的压缩质量(1-100)
+
+    def __post_init__(self):
+        if self.format.upper() not in _FORMATS:
+            raise ImageProcessingError(f"不支持的输出格式: {self.format}")
+        object.__setattr__(self, "format", self.format.upper())
+
+    @property
+    def cache_tag(self) -> str:
+        """用于区分不同预处理参数的缓存标记"""
+        return f"{self.format}:{self.max_dimension}:{self.quality}"
+
+    @classmethod
+    def for_model(cls, model_name: str) -> "PreprocessOptions":
+        """
+        根据模型名称返回匹配其视觉编码器分辨率的预处理参数
+
+        Args:
+            model_name: 模型名称,按MODEL_IMAGE_MAX_DIMENSIONS中的前缀匹配
+        """
+        base_name = model_name.split(":")[0].lower()
+        # 优先匹配最长的前缀,如llama3.2-vision优先于llama
+        for prefix in sorted(MODEL_IMAGE_MAX_DIMENSIONS, key=len, reverse=True):
+            if base_name.startswith(prefix):
+                return cls(max_dimension=MODEL_IMAGE_MAX_DIMENSIONS[prefix])
+        return cls()
+
+
+def preprocess_image(image_path: Union[str, Path], options: PreprocessOptions) -> bytes:
+    """
+    将图片缩放到目标分辨率并重新编码
+
+    图片已经足够小且格式相同时直接返回原始数据,避免有损格式的二次压缩;
+    重新编码后反而更大时同样返回原始数据。
+
+    Args:
+        image_path: 图片文件路径
+        options: 预处理参数
+
+    Returns:
+        处理后的图片数据
+
+    Raises:
+        ImageProcessingError: 未安装Pillow或图片无法解码时
+    """
+    try:
+        # Pillow是可选依赖,只有启用预处理时才需要,第一次预处理时才导入
+        from PIL import Image, ImageOps
+    except ImportError:
+        raise ImageProcessingError("图片预处理需要Pillow,请先执行 pip install Pillow")
+
+    image_path = Path(image_path)
+    try:
+        original = image_path.read_bytes()
+        with Image.open(io.BytesIO(original)) as image:
+            source_format = image.format
+            target = (options.max_dimension, options.max_dimension)
+            needs_resize = max(image.size) > options.max_dimension
+
+            if not needs_resize and source_format == options.format:
+                return original
+
+            # JPEG可以在解码阶段直接按比例缩小,大幅减少大图的解码开销
+            if needs_resize and source_format == "JPEG":
+                image.draft("RGB", target)
+
+            image = ImageOps.exif_transpose(image)
+            if needs_resize:
+                image.thumbnail(target, Image.Resampling.LANCZOS)
+
+            if options.format == "JPEG" and image.mode != "RGB":
+                # JPEG不支持透明通道,透明部分以白色背景填充
+                if image.mode in ("RGBA", "LA", "P"):
+                    image = image.convert("RGBA")
+                    background = Image.new("RGB", image.size, (255, 255, 255))
+                    background.paste(image, mask=image.getchannel("A"))
+                    image = background
+                else:
+                    image = image.convert("RGB")
+
+            output = io.BytesIO()
+            save_kwargs = {"optimize": True}
+            if options.format in ("JPEG", "WEBP"):
+                save_kwargs["quality"] = options.quality
+            image.save(output, format=options.format, **save_kwargs)
+            processed = output.getvalue()
+    except ImageProcessingError:
+        raise
+    except Exception as e:
+        raise ImageProcessingError(f"图片预处理失败: {str(e)}")
+
+    if not needs_resize and len(processed) >= len(original):
+        return original
+
+    logger.debug(
+        f"Preprocessed {image_path.name}: {len(original)} -> {len(processed)} bytes "
+        f"({options.cache_tag})"
+    )
+    return processed
@@ -2,25 +2,178 @@
 """图片处理工具模块"""
 
 import base64
+import hashlib
+import logging
 import mimetypes
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Union
+from typing import Callable, Optional, Tuple, Union
 
-from ollama_vision.config import MAX_IMAGE_SIZE, SUPPORTED_IMAGE_TYPES
+from ollama_vision.config import MAX_IMAGE_SIZE, SUPPORTED_IMAGE_TYPES, IMAGE_CACHE_MAX_BYTES
 from ollama_vision.exceptions import ImageProcessingError
+from ollama_vision.image_preprocess import PreprocessOptions, preprocess_image
+from ollama_vision.request_body import iter_base64_file
 
-def encode_image(image_path: Union[str, Path]) -> str:
+logger = logging.getLogger(__name__)
+
+# 缓存键: (解析后的绝对路径, 文件大小, 修改时间ns, 预处理参数标记)
+CacheKey = Tuple[str, int, int, str]
+
+
+@dataclass
+class ImageCacheStats:
+    """图片编码缓存统计数据类"""
+    hits: int = 0  # 内存命中次数
+    disk_hits: int = 0  # 磁盘命中次数
+    misses: int = 0  # 未命中(需要重新编码)次数
+    evictions: int = 0  # 因超出内存上限被淘汰的条目数
+    entries: int = 0  # 当前内存中的条目数
+    bytes: int = 0  # 当前内存占用(编码后的字节数)
+
+
+class EncodedImageCache:
     """
-    将图片文件编码为base64字符串
+    base64编码结果的LRU缓存
+
+    以(绝对路径, 文件大小, 修改时间)为键,文件被修改后自动失效。
+    内存部分按编码后的总字节数限制大小,可选的磁盘部分在进程重启后仍然有效。
+    """
+
+    def __init__(self, max_bytes: int = IMAGE_CACHE_MAX_BYTES, disk_dir: Optional[Union[str, Path]] = None):
+        """
+        初始化缓存
+
+        Args:
+            max_bytes: 内存中缓存的最大字节数,为0时不使用内存缓存
+            disk_dir: 磁盘缓存目录(可选)
+        """
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir).expanduser() if disk_dir else None
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[CacheKey, str]" = OrderedDict()
+        self._bytes = 0
+        self._stats = ImageCacheStats()
+
+    @property
+    def stats(self) -> ImageCacheStats:
+        """返回缓存统计的快照"""
+        with self._lock:
+            return ImageCacheStats(
+                hits=self._stats.hits,
+                disk_hits=self._stats.disk_hits,
+                misses=self._stats.misses,
+                evictions=self._stats.evictions,
+                entries=len(self._entries),
+                bytes=self._bytes
+            )
+
+    def _disk_path(self, key: CacheKey) -> Path:
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        return self.disk_dir / f"{digest}.b64"
+
+    def get(self, key: CacheKey) -> Optional[str]:
+        """查找缓存,未命中时返回None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self._stats.hits += 1
+                return value
+
+        if self.disk_dir is not None:
+            try:
+                value = self._disk_path(key).read_text(encoding="ascii")
+            except OSError:
+                value = None
+            if value is not None:
+                with self._lock:
+                    self._stats.disk_hits += 1
+                self._store(key, value)
+                return value
+
+        with self._lock:
+            self._stats.misses += 1
+        return None
+
+    def put(self, key: CacheKey, value: str):
+        """写入缓存,磁盘写入失败只记录日志"""
+        self._store(key, value)
+        if self.disk_dir is not None:
+            path = self._disk_path(key)
+            tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+            try:
+                self.disk_dir.mkdir(parents=True, exist_ok=True)
+                tmp_path.write_text(value, encoding="ascii")
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"Failed to write image cache {path}: {e}")
+
+    def _store(self, key: CacheKey, value: str):
+        """写入内存部分并按LRU淘汰超出上限的条目"""
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = value
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self._stats.evictions += 1
+
+    def clear(self):
+        """清空内存缓存(不删除磁盘缓存)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+_image_cache = EncodedImageCache()
+
+
+def get_image_cache() -> EncodedImageCache:
+    """返回encode_image使用的全局缓存"""
+    return _image_cache
+
+
+def configure_image_cache(
+        max_bytes: int = IMAGE_CACHE_MAX_BYTES,
+        disk_dir: Optional[Union[str, Path]] = None
+) -> EncodedImageCache:
+    """
+    替换encode_image使用的全局缓存
+
+    Args:
+        max_bytes: 内存中缓存的最大字节数,为0时不使用内存缓存
+        disk_dir: 磁盘缓存目录(可选)
+
+    Returns:
+        新的缓存对象
+    """
+    global _image_cache
+    _image_cache = EncodedImageCache(max_bytes=max_bytes, disk_dir=disk_dir)
+    return _image_cache
+
+
+def validate_image(image_path: Union[str, Path], allow_oversize: bool = False) -> os.stat_result:
+    """
+    检查图片文件是否存在、类型是否支持以及大小是否超出上限
 
     Args:
         image_path: 图片文件路径
+        allow_oversize: 是否允许超过MAX_IMAGE_SIZE(图片会在发送前被缩小时)
 
     Returns:
-        base64编码的图片字符串
+        文件的stat信息
 
     Raises:
-        ImageProcessingError: 当图片处理失败时
+        ImageProcessingError: 检查不通过时
     """
     image_path = Path(image_path)
     if not image_path.exists():
@@ -32,13 +185,67 @@ def encode_image(image_path: Union[str, Path]) -> str:
         raise ImageProcessingError(f"不支持的文件类型: {mime_type}")
 
     # 检查文件大小
-    file_size = image_path.stat().st_size
-    if file_size > MAX_IMAGE_SIZE:
+    stat = image_path.stat()
+    if stat.st_size > MAX_IMAGE_SIZE and not allow_oversize:
         raise ImageProcessingError(f"文件太大,请使用小于{MAX_IMAGE_SIZE / 1024 / 1024}MB的图片")
+    return stat
+
+
+def encode_image(
+        image_path: Union[str, Path],
+        use_cache: bool = True,
+        preprocess: Optional[PreprocessOptions] = None,
+        progress: Optional[Callable[[int, int], None]] = None
+) -> str:
+    """
+    将图片文件编码为base64字符串
+
+    相同文件(路径、大小和修改时间均未变化)的重复编码直接从缓存返回。
+    指定预处理参数时,图片会先缩放并重新编码,超过大小上限的图片也会被缩小而不是拒绝。
+
+    Args:
+        image_path: 图片文件路径
+        use_cache: 是否使用编码缓存
+        preprocess: 图片预处理参数(可选)
+        progress: 进度回调(可选),参数为(已处理字节数, 文件总字节数)。
+            不预处理时每读取并编码一块调用一次,回调抛出的异常会中止编码并原样抛出
+
+    Returns:
+        base64编码的图片字符串
+
+    Raises:
+        ImageProcessingError: 当图片处理失败时
+    """
+    image_path = Path(image_path)
+    stat = validate_image(image_path, allow_oversize=preprocess is not None)
+
+    cache = _image_cache if use_cache else None
+    key = (str(image_path.resolve()), stat.st_size, stat.st_mtime_ns, preprocess.cache_tag if preprocess else "")
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            if progress is not None:
+                progress(stat.st_size, stat.st_size)
+            return cached
+
+    if preprocess is not None:
+        image_data = preprocess_image(image_path, preprocess)
+        if len(image_data) > MAX_IMAGE_SIZE:
+            raise ImageProcessingError(f"预处理后图片仍然太大,请使用小于{MAX_IMAGE_SIZE / 1024 / 1024}MB的图片")
+        encoded = base64.b64encode(image_data).decode('utf-8')
+        if progress is not None:
+            progress(stat.st_size, stat.st_size)
+    else:
+        # 分块读取并编码,每块报告一次进度
+        parts = []
+        done = 0
+        for chunk in iter_base64_file(image_path):
+            parts.append(chunk)
+            done = min(done + len(chunk) // 4 * 3, stat.st_size)
+            if progress is not None:
+                progress(done, stat.st_size)
+        encoded = b"".join(parts).decode('ascii')
 
-    try:
-        with open(image_path, 'rb') as f:
-            image_data = f.read()
-            return base64.b64encode(image_data).decode('utf-8')
-    except Exception as e:
-        raise ImageProcessingError(f"读取图片失败: {str(e)}")
\ No newline at end of file
+    if cache is not None:
+        cache.put(key, encoded)
+    return encoded
\ No newline at end of file
@@ -0,0 +1,362 @@
+# ollama_vision/metrics.py
+"""进程内指标统计与导出模块"""
+
+import logging
+import threading
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+from ollama_vision.config import LATENCY_BUCKETS, PAYLOAD_BYTES_BUCKETS, DEFAULT_METRICS_PORT
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """指标基类,按标签值分别计数"""
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        """返回Prometheus文本格式的行"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        """
+        增加计数
+
+        Args:
+            labels: 按labelnames顺序给出的标签值
+            amount: 增加的数量
+        """
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        """返回指定标签的当前计数"""
+        return self._values.get(labels, 0)
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in items]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram(_Metric):
+    """按预设区间统计分布的直方图"""
+    type_name = "histogram"
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 每组标签对应[各区间计数(最后一个为+Inf), 总和, 总数]
+        self._values: Dict[Labels, list] = {}
+
+    def observe(self, value: float, *labels: str):
+        """
+        记录一个观测值
+
+        Args:
+            value: 观测值
+            labels: 按labelnames顺序给出的标签值
+        """
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, *labels: str) -> int:
+        """返回指定标签的观测次数"""
+        state = self._values.get(labels)
+        return state[2] if state else 0
+
+    def sum(self, *labels: str) -> float:
+        """返回指定标签的观测值总和"""
+        state = self._values.get(labels)
+        return state[1] if state else 0.0
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((labels, (list(state[0]), state[1], state[2])) for labels, state in self._values.items())
+        lines = []
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class MetricsRegistry:
+    """
+    指标注册表
+
+    同名指标只创建一次,多个客户端共享同一个注册表时会累加到相同的指标上。
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"指标 {name} 已注册为{metric.type_name}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """获取或创建计数器"""
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def histogram(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        """获取或创建直方图"""
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        """按名称返回已注册的指标"""
+        return self._metrics.get(name)
+
+    def clear(self):
+        """清空所有指标的数据,保留指标定义"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.clear()
+
+    def render_prometheus(self) -> str:
+        """以Prometheus文本格式输出所有指标"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class ClientMetrics:
+    """客户端使用的指标集合"""
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self.requests = registry.counter(
+            "ollama_vision_requests_total", "Requests sent to the Ollama API", ("model", "endpoint")
+        )
+        self.errors = registry.counter(
+            "ollama_vision_request_errors_total", "Failed requests by HTTP status or failure kind",
+            ("model", "endpoint", "status")
+        )
+        self.retries = registry.counter(
+            "ollama_vision_request_retries_total", "Requests re-sent after a transient failure", ("model", "endpoint")
+        )
+        self.latency = registry.histogram(
+            "ollama_vision_request_duration_seconds", "Time from sending a request to receiving the full response",
+            ("model", "endpoint")
+        )
+        self.time_to_first_token = registry.histogram(
+            "ollama_vision_time_to_first_token_seconds", "Time from sending a chat request to the first output",
+            ("model", "endpoint")
+        )
+        self.encode_time = registry.histogram(
+            "ollama_vision_image_encode_seconds", "Time spent encoding the images of a chat request", ("model",)
+        )
+        self.payload_bytes = registry.histogram(
+            "ollama_vision_request_payload_bytes", "Size of request bodies", ("model", "endpoint"),
+            buckets=PAYLOAD_BYTES_BUCKETS
+        )
+        self.eval_tokens = registry.counter(
+            "ollama_vision_eval_tokens_total", "Tokens generated by the server", ("model",)
+        )
+        self.prompt_tokens = registry.counter(
+            "ollama_vision_prompt_eval_tokens_total", "Prompt tokens (including images) evaluated by the server",
+            ("model",)
+        )
+
+        self.result_cache = registry.counter(
+            "ollama_vision_result_cache_lookups_total", "Result cache lookups by outcome (hit/miss)",
+            ("model", "result")
+        )
+
+    def record_error(self, model: str, endpoint: str, error: Exception, kind: str = "network"):
+        """按APIError的状态码记录错误,没有状态码时记为kind(如network、stream、circuit_open)"""
+        status = getattr(error, "status_code", None)
+        self.errors.inc(model, endpoint, str(status) if status else kind)
+
+    def record_chat(self, model: str, data: Optional[dict]):
+        """记录对话结束块中服务端返回的token数"""
+        if data:
+            self.eval_tokens.inc(model, amount=data.get("eval_count", 0))
+            self.prompt_tokens.inc(model, amount=data.get("prompt_eval_count", 0))
+
+
+_default_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """返回进程内共享的默认指标注册表"""
+    return _default_registry
+
+
+class MetricsExporter:
+    """
+    指标导出器基类
+
+    子类实现start/stop,例如定时推送到其他监控系统。
+    """
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry or _default_registry
+
+    def start(self):
+        raise NotImplementedError
+
+    def stop(self):
+        raise NotImplementedError
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+class PrometheusExporter(MetricsExporter):
+    """在本地HTTP端口上以Prometheus文本格式提供/metrics"""
+
+    def __init__(
+            self,
+            registry: Optional[MetricsRegistry] = None,
+            host: str = "127.0.0.1",
+            port: int = DEFAULT_METRICS_PORT
+    ):
+        """
+        初始化导出器
+
+        Args:
+            registry: 要导出的注册表,默认为共享的默认注册表
+            host: 监听地址
+            port: 监听端口,为0时自动分配
+        """
+        super().__init__(registry)
+        self.host = host
+        self.port = port
+        self._server: Optional["ThreadingHTTPServer"] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """/metrics的完整地址,启动后可用"""
+        host, port = self._server.server_address[:2] if self._server else (self.host, self.port)
+        return f"http://{host}:{port}/metrics"
+
+    def start(self):
+        """在后台线程中启动HTTP服务"""
+        if self._server is not None:
+            return
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-exporter", daemon=True)
+        self._thread.start()
+        logger.info(f"Serving metrics at {self.url}")
+
+    def stop(self):
+        """停止HTTP服务"""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+        self._thread = None
@@ -0,0 +1,162 @@
+# ollama_vision/model_cache.py
+"""模型元数据磁盘缓存模块"""
+
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, asdict, fields
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from ollama_vision.models import ModelInfo
+
+logger = logging.getLogger(__name__)
+
+CACHE_FORMAT_VERSION = 1
+
+
+@dataclass
+class CacheStats:
+    """缓存命中统计数据类"""
+    hits: int = 0
+    misses: int = 0
+
+
+class ModelMetadataCache:
+    """
+    以模型digest和modified_at为键的ModelInfo磁盘缓存
+
+    只有新增或发生变化的模型才需要重新调用api/show获取详情。
+    """
+
+    _FIELDS = {f.name for f in fields(ModelInfo)}
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        初始化缓存
+
+        Args:
+            path: 缓存文件路径(JSON格式)
+        """
+        self.path = Path(path).expanduser()
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Dict]] = None
+        self._dirty = False
+        self._stats = CacheStats()
+
+    @property
+    def stats(self) -> CacheStats:
+        """返回累计的命中统计"""
+        with self._lock:
+            return CacheStats(self._stats.hits, self._stats.misses)
+
+    def _load(self) -> Dict[str, Dict]:
+        """按需从磁盘读取缓存,文件损坏或版本不符时视为空缓存"""
+        if self._entries is None:
+            self._entries = {}
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == CACHE_FORMAT_VERSION:
+                    self._entries = data.get("models", {})
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError, AttributeError) as e:
+                logger.warning(f"Ignoring unreadable model cache {self.path}: {e}")
+        return self._entries
+
+    def _to_model(self, record: Dict) -> ModelInfo:
+        return ModelInfo(**{k: v for k, v in record.items() if k in self._FIELDS})
+
+    def get(self, name: str, digest: str, modified_at: str) -> Optional[ModelInfo]:
+        """
+        查找缓存的模型信息
+
+        Args:
+            name: 模型名称
+            digest: api/tags返回的模型摘要
+            modified_at: api/tags返回的模型修改时间
+
+        Returns:
+            digest和modified_at都一致时返回缓存的模型信息,否则返回None
+        """
+        with self._lock:
+            record = self._load().get(name)
+            if (
+                    record is not None
+                    and digest
+                    and record.get("digest") == digest
+                    and record.get("modified_at") == modified_at
+            ):
+                self._stats.hits += 1
+                return self._to_model(record)
+            self._stats.misses += 1
+            return None
+
+    def put(self, model: ModelInfo):
+        """写入(或覆盖)一个模型的信息"""
+        with self._lock:
+            self._load()[model.name] = asdict(model)
+            self._dirty = True
+
+    def retain(self, names: Iterable[str]):
+        """只保留指定名称的模型,移除已经被删除的模型"""
+        names = set(names)
+        with self._lock:
+            entries = self._load()
+            for name in [n for n in entries if n not in names]:
+                del entries[name]
+                self._dirty = True
+
+    def models(self) -> List[ModelInfo]:
+        """返回缓存中的全部模型信息(即上一次已知的模型列表)"""
+        with self._lock:
+            return [self._to_model(record) for record in self._load().values()]
+
+    def save(self):
+        """有改动时将缓存原子地写回磁盘,写入失败只记录日志"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"version": CACHE_FORMAT_VERSION, "models": self._load()}
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except OSError as e:
+                logger.warning(f"Failed to write model cache {self.path}: {e}")
+
+
+def split_cached(
+        cache: Optional[ModelMetadataCache],
+        tags: Iterable[Dict[str, Any]]
+) -> Tuple[List[ModelInfo], List[Tuple[str, str, str]]]:
+    """
+    将api/tags返回的模型分为缓存命中和需要重新查询两部分
+
+    Args:
+        cache: 模型元数据缓存,为None时全部需要查询
+        tags: api/tags返回的模型列表
+
+    Returns:
+        (缓存命中的模型信息列表, 需要调用api/show的(name, digest, modified_at)列表)
+    """
+    cached_models = []
+    to_fetch = []
+    for model_data in tags:
+        name = model_data['name']
+        digest = model_data.get('digest', '')
+        modified_at = model_data.get('modified_at', '')
+        cached = cache.get(name, digest, modified_at) if cache else None
+        if cached is not None:
+            cached_models.append(cached)
+        else:
+            to_fetch.append((name, digest, modified_at))
+
+    if cache:
+        logger.info(f"Model metadata cache: {len(cached_models)} hits, {len(to_fetch)} misses")
+    return cached_models, to_fetch
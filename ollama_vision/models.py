@@ -0,0 +1,162 @@
+# ollama_vision/models.py
+"""模型信息模块"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, Any, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PreloadResult:
+    """模型预加载结果"""
+    model: str
+    load_duration: float = 0.0  # 模型加载耗时(秒),服务端未报告时为请求耗时
+    elapsed: float = 0.0  # 预加载请求的总耗时(秒)
+    error: Optional[str] = None  # 预加载失败时的错误信息
+
+    @property
+    def ok(self) -> bool:
+        """是否预加载成功"""
+        return self.error is None
+
+    @classmethod
+    def from_response(cls, model: str, response_data: Dict[str, Any], elapsed: float) -> "PreloadResult":
+        """根据预加载请求的响应创建结果,Ollama的耗时字段单位为纳秒"""
+        load_duration = response_data.get("load_duration")
+        return cls(
+            model=model,
+            load_duration=load_duration / 1e9 if load_duration else elapsed,
+            elapsed=elapsed
+        )
+
+
+@dataclass
+class ModelInfo:
+    """模型信息数据类"""
+    name: str
+    description: str = ""
+    format: str = ""
+    family: str = ""
+    tag: str = "latest"
+    size: int = 0
+    capabilities: Dict[str, Any] = None
+    parameters: Dict[str, Any] = None
+    digest: str = ""  # api/tags返回的模型摘要
+    modified_at: str = ""  # api/tags返回的模型修改时间
+
+    VISION_CAPABLE_FAMILIES = {
+        'llama', 'llava', 'bakllava', 'mixtral', 'yi', 'qwen'  # 支持视觉的模型系列
+    }
+
+    VISION_CAPABILITY_INDICATORS = {
+        'vision', 'multimodal', 'image', 'visual', 'img', 'images'  # 可能表示视觉能力的关键字
+    }
+
+    @classmethod
+    def from_show(cls, name: str, show_data: Dict[str, Any], digest: str = "", modified_at: str = "") -> "ModelInfo":
+        """
+        根据api/show的返回数据创建模型信息对象
+
+        Args:
+            name: 模型名称
+            show_data: api/show返回的JSON数据
+            digest: api/tags返回的模型摘要
+            modified_at: api/tags返回的模型修改时间
+        """
+        return cls(
+            name=name,
+            description=show_data.get("description", ""),
+            format=show_data.get("format", ""),
+            family=show_data.get("families", [""])[0],
+            size=show_data.get("size", 0),
+            capabilities=show_data.get("capabilities", {}),
+            parameters=show_data.get("parameters", {}),
+            digest=digest,
+            modified_at=modified_at
+        )
+
+    @property
+    def display_name(self) -> str:
+        """返回用于显示的模型名称"""
+        base_name = self.name.split(":")[0]
+        family = f"[{self.family}]" if self.family else ""
+        size = f"{self.size / 1024 / 1024 / 1024:.1f}GB" if self.size else ""
+        return f"{base_name} {family} {size}".strip()
+
+    @property
+    def supports_vision(self) -> bool:
+        """检查是否支持视觉功能,使用更宽松的检测逻辑"""
+        try:
+            # 1. 检查模型家族
+            model_family = self.family.lower()
+            name_lower = self.name.lower()
+            for family in self.VISION_CAPABLE_FAMILIES:
+                if family in model_family or family in name_lower:
+                    logger.debug(f"Model {self.name} supports vision based on family/name match with {family}")
+                    return True
+
+            # 2. 检查capabilities
+            if self.capabilities:
+                for indicator in self.VISION_CAPABILITY_INDICATORS:
+                    if indicator in self.capabilities:
+                        value = self.capabilities[indicator]
+                        if isinstance(value, bool) and value:
+                            logger.debug(f"Model {self.name} supports vision based on capability {indicator}")
+                            return True
+                        elif isinstance(value, (str, dict)):
+                            logger.debug(f"Model {self.name} supports vision based on capability {indicator} presence")
+                            return True
+
+            # 3. 检查parameters
+            if self.parameters:
+                for indicator in self.VISION_CAPABILITY_INDICATORS:
+                    if indicator in self.parameters:
+                        value = self.parameters[indicator]
+                        if isinstance(value, bool) and value:
+                            logger.debug(f"Model {self.name} supports vision based on parameter {indicator}")
+                            return True
+                        elif isinstance(value, (str, dict)):
+                            logger.debug(f"Model {self.name} supports vision based on parameter {indicator} presence")
+                            return True
+
+            # 4. 检查描述
+            desc_lower = self.description.lower()
+            for indicator in self.VISION_CAPABILITY_INDICATORS:
+                if indicator in desc_lower:
+                    logger.debug(f"Model {self.name} supports vision based on description containing {indicator}")
+                    return True
+
+            logger.debug(f"Model {self.name} does not appear to support vision")
+            return False
+
+        except Exception as e:
+            logger.error(f"Error checking vision support for model {self.name}: {e}")
+            return False
+
+
+def select_vision_models(models: Iterable[ModelInfo]) -> List[ModelInfo]:
+    """
+    筛选出支持视觉功能的模型并按family和name排序
+
+    Args:
+        models: 全部模型信息
+
+    Returns:
+        支持vision功能的模型信息列表
+    """
+    selected = []
+    for model in models:
+        # 使用改进后的视觉能力检测
+        if model.supports_vision:
+            selected.append(model)
+            logger.info(f"Added vision-capable model: {model.name}")
+        else:
+            logger.debug(f"Skipped non-vision model: {model.name}")
+
+    # 按照family和name排序
+    selected.sort(key=lambda m: (m.family or "zzzz", m.name))
+
+    logger.info(f"Found {len(selected)} vision-capable models")
+    return selected
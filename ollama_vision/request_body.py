@@ -0,0 +1,98 @@
+# ollama_vision/request_body.py
+"""流式JSON请求体模块"""
+
+import base64
+import json
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Union
+
+from ollama_vision.config import REQUEST_BODY_CHUNK_SIZE
+from ollama_vision.exceptions import ImageProcessingError
+
+
+@dataclass(frozen=True)
+class FileImage:
+    """发送时才从磁盘读取并增量base64编码的图片"""
+    path: Path
+
+
+def iter_base64_file(path: Union[str, Path], chunk_size: int = REQUEST_BODY_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    分块读取文件并增量进行base64编码
+
+    每块读取的字节数都是3的倍数,各块编码结果直接拼接即为完整的base64字符串。
+
+    Args:
+        path: 文件路径
+        chunk_size: 每次读取的字节数,会向下取整为3的倍数
+
+    Returns:
+        生成器,逐块产出base64编码后的数据
+    """
+    chunk_size = max(3, chunk_size - chunk_size % 3)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    try:
+        with open(path, "rb", buffering=0) as f:
+            while True:
+                # readinto可能读不满,补齐到3的倍数之前不能编码
+                filled = 0
+                while filled < chunk_size:
+                    n = f.readinto(view[filled:])
+                    if not n:
+                        break
+                    filled += n
+                if not filled:
+                    break
+                yield base64.b64encode(view[:filled])
+                if filled < chunk_size:
+                    break
+    except OSError as e:
+        raise ImageProcessingError(f"读取图片失败: {str(e)}")
+
+
+class StreamingJSONBody:
+    """
+    分块生成的JSON请求体
+
+    payload中的FileImage在序列化时用占位符代替,发送时再从磁盘逐块编码填入,
+    因此无论图片多大、数量多少,内存中只保留一个读取块。
+    """
+
+    def __init__(self, payload: Dict[str, Any], chunk_size: int = REQUEST_BODY_CHUNK_SIZE):
+        """
+        初始化请求体
+
+        Args:
+            payload: 请求数据,其中的图片可以是base64字符串或FileImage
+            chunk_size: 读取图片文件时每块的字节数
+        """
+        self.chunk_size = chunk_size
+        self.bytes_sent = 0  # 已经生成的请求体字节数
+        self._marker = f"__ollama_vision_image_{uuid.uuid4().hex}__"
+        self._images: List[FileImage] = []
+        skeleton = json.dumps(payload, default=self._placeholder, ensure_ascii=False)
+        # 占位符序列化后带有引号,拆分后在每两段之间插入对应图片的编码数据
+        self._parts = skeleton.split(json.dumps(self._marker))
+
+    def _placeholder(self, obj: Any) -> str:
+        if isinstance(obj, FileImage):
+            self._images.append(obj)
+            return self._marker
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    def __iter__(self) -> Iterator[bytes]:
+        self.bytes_sent = 0
+        for chunk in self._iter_chunks():
+            self.bytes_sent += len(chunk)
+            yield chunk
+
+    def _iter_chunks(self) -> Iterator[bytes]:
+        prefix = self._parts[0].encode("utf-8")
+        for image, part in zip(self._images, self._parts[1:]):
+            yield prefix + b'"'
+            yield from iter_base64_file(image.path, self.chunk_size)
+            prefix = b'"' + part.encode("utf-8")
+        yield prefix
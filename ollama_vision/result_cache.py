@@ -0,0 +1,213 @@
+# ollama_vision/result_cache.py
+"""基于SQLite的对话结果缓存模块"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+from ollama_vision.config import RESULT_CACHE_MAX_BYTES, RESULT_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+# 修改缓存键的组成方式时递增,使旧的结果全部失效
+_KEY_VERSION = 1
+
+
+@dataclass
+class ResultCacheStats:
+    """结果缓存的命中统计"""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0  # 因超出容量或过期被删除的条目数
+
+
+def hash_file(path: Union[str, Path], chunk_size: int = 1024 * 1024) -> str:
+    """计算文件内容的SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_result_key(
+        model: str,
+        digest: str,
+        system_prompt: Optional[str],
+        prompt: str,
+        image_hashes: Iterable[str],
+        options: Dict[str, Any]
+) -> str:
+    """
+    生成对话结果的缓存键
+
+    Args:
+        model: 模型名称
+        digest: 模型摘要,模型更新后旧结果自然失效
+        system_prompt: 系统提示词
+        prompt: 用户提示词
+        image_hashes: 各图片内容的哈希,顺序有意义
+        options: 影响输出的参数,如temperature和图片预处理参数
+    """
+    payload = json.dumps(
+        [_KEY_VERSION, model, digest, system_prompt, prompt, list(image_hashes), options],
+        sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    持久化的对话结果缓存
+
+    以SQLite保存完整的回复文本和服务端返回的统计数据。条目超过ttl后失效,
+    总大小超过max_bytes时按最近访问时间淘汰。可以在多个线程间共享。
+    """
+
+    def __init__(
+            self,
+            path: Union[str, Path],
+            max_bytes: int = RESULT_CACHE_MAX_BYTES,
+            ttl: Optional[float] = RESULT_CACHE_TTL
+    ):
+        """
+        初始化缓存
+
+        Args:
+            path: 数据库文件路径,":memory:"表示只保存在内存中
+            max_bytes: 保存的回复文本和响应数据的总字节数上限
+            ttl: 条目的有效期(秒),为None时不过期
+        """
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._stats = ResultCacheStats()
+        self._lock = threading.Lock()
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, model TEXT, text TEXT, data TEXT, "
+            "size INTEGER, created REAL, accessed REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def stats(self) -> ResultCacheStats:
+        """返回缓存的累计命中统计"""
+        return ResultCacheStats(self._stats.hits, self._stats.misses, self._stats.evictions)
+
+    @property
+    def size(self) -> int:
+        """当前保存的回复文本和响应数据的总字节数"""
+        return self._size
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def get(self, key: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        查找缓存的结果
+
+        Args:
+            key: make_result_key生成的缓存键
+
+        Returns:
+            (回复文本, 服务端最后一块响应的数据),未命中或已过期时返回None
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT text, data, size, created FROM results WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and now - row[3] > self.ttl:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._size -= row[2]
+                self._stats.evictions += 1
+                row = None
+            if row is None:
+                self._stats.misses += 1
+                return None
+            self._conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+            self._stats.hits += 1
+        return row[0], json.loads(row[1])
+
+    def put(self, key: str, model: str, text: str, data: Optional[Dict[str, Any]] = None):
+        """
+        保存一次完整的回复
+
+        Args:
+            key: make_result_key生成的缓存键
+            model: 模型名称
+            text: 完整的回复文本
+            data: 服务端最后一块响应的数据,其中的message(非流式请求时包含完整回复)不保存
+        """
+        # 回复文本已经单独保存,不在data中重复保存一份;大小按实际写入的文本和数据计算
+        data_json = json.dumps({k: v for k, v in (data or {}).items() if k != "message"})
+        size = len(text.encode("utf-8")) + len(data_json.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, model, text, data, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, text, data_json, size, now, now)
+            )
+            self._size += size - (old[0] if old else 0)
+            if self._size > self.max_bytes:
+                self._evict(now)
+
+    def _evict(self, now: float):
+        """删除过期条目,仍然超出上限时按最近访问时间淘汰到上限的90%"""
+        if self.ttl is not None:
+            self._stats.evictions += self._conn.execute(
+                "DELETE FROM results WHERE created < ?", (now - self.ttl,)
+            ).rowcount
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+        target = int(self.max_bytes * 0.9)
+        if self._size <= target:
+            return
+        removed = 0
+        keys = []
+        cursor = self._conn.execute("SELECT key, size FROM results ORDER BY accessed")
+        for key, size in cursor:
+            if self._size - removed <= target:
+                break
+            keys.append((key,))
+            removed += size
+        cursor.close()
+        self._conn.executemany("DELETE FROM results WHERE key = ?", keys)
+        self._size -= removed
+        self._stats.evictions += len(keys)
+        logger.debug(f"Evicted {len(keys)} cached results ({removed} bytes)")
+
+    def clear(self):
+        """删除所有缓存的结果"""
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+            self._size = 0
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,65 @@
+# ollama_vision/retry.py
+"""请求重试策略模块"""
+
+import random
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from ollama_vision.config import (
+    RETRY_MAX_ATTEMPTS, RETRY_BACKOFF_BASE, RETRY_BACKOFF_MAX, RETRY_STATUS_CODES
+)
+from ollama_vision.exceptions import APIError, CircuitOpenError
+
+
+@dataclass
+class RetryStats:
+    """重试与熔断的累计统计"""
+    retries: int = 0  # 重试的次数
+    recovered: int = 0  # 经过重试后成功的请求数
+    exhausted: int = 0  # 重试次数用尽仍然失败的请求数
+    circuit_rejections: int = 0  # 因所有服务熔断而直接失败的请求数
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    请求失败时的重试策略
+
+    只在还没有读取响应内容时重试,已经开始输出的流式对话不会重复发送。
+    连接失败和retry_statuses中的状态码(服务繁忙、模型加载中)对所有请求重试;
+    读取超时等其他网络错误只对幂等的请求重试,避免让服务重复生成一次长回复。
+    两次尝试之间按指数退避并加入完全随机抖动,多个客户端同时失败时不会同时重试。
+    """
+    max_attempts: int = RETRY_MAX_ATTEMPTS  # 包括第一次在内的最多尝试次数,为1时不重试
+    backoff_base: float = RETRY_BACKOFF_BASE  # 第一次重试前等待时间的上限(秒)
+    backoff_max: float = RETRY_BACKOFF_MAX  # 等待时间上限(秒)
+    retry_statuses: Tuple[int, ...] = RETRY_STATUS_CODES
+
+    def should_retry(self, error: APIError, attempt: int, idempotent: bool) -> bool:
+        """
+        判断失败的请求是否应该重试
+
+        Args:
+            error: 请求失败的错误
+            attempt: 已经尝试的次数(从1开始)
+            idempotent: 请求是否可以安全地重复发送
+        """
+        if attempt >= self.max_attempts or isinstance(error, CircuitOpenError):
+            return False
+        if error.status_code is not None:
+            return error.status_code in self.retry_statuses
+        import requests
+
+        cause = error.__cause__
+        if isinstance(cause, requests.ConnectionError):
+            return True
+        return idempotent and isinstance(cause, requests.RequestException)
+
+    def delay(self, attempt: int, rng: Optional[random.Random] = None) -> float:
+        """
+        返回第attempt次尝试失败后的等待时间(秒)
+
+        在0到min(backoff_max, backoff_base * 2^(attempt-1))之间均匀随机取值。
+        """
+        ceiling = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        return (rng or random).uniform(0, ceiling)
@@ -0,0 +1,213 @@
+# ollama_vision/session.py
+"""多轮对话会话模块"""
+
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Generator, List, Optional, Union
+
+from ollama_vision.config import DEFAULT_SESSION_MAX_BYTES, SESSION_TRIM_RATIO
+from ollama_vision.cancellation import CancellationToken
+from ollama_vision.chat_result import ChatStats
+from ollama_vision.client import OllamaVisionClient, encode_images
+from ollama_vision.exceptions import APIError
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TurnStats:
+    """单轮对话的发送统计"""
+    bytes_sent: int = 0  # 本轮请求中messages的字节数
+    bytes_saved: int = 0  # 与每轮重发全部历史和图片相比节省的字节数
+    images_deduplicated: int = 0  # 因已在历史中而未重复附加的图片数
+    messages_dropped: int = 0  # 因超出预算被移出历史的消息数
+    images_stripped: int = 0  # 因超出预算被移出历史的图片数
+
+
+@dataclass
+class _Turn:
+    """一轮对话: 用户消息、助手回复及其附带图片的哈希"""
+    user: Dict[str, Any]
+    assistant: Optional[Dict[str, Any]] = None
+    image_hashes: List[str] = field(default_factory=list)
+
+    @property
+    def messages(self) -> List[Dict[str, Any]]:
+        return [self.user, self.assistant] if self.assistant else [self.user]
+
+    @property
+    def size(self) -> int:
+        return sum(_message_bytes(m) for m in self.messages)
+
+
+def _message_bytes(message: Dict[str, Any]) -> int:
+    """消息序列化后的大致字节数(文本按UTF-8计算,图片按base64长度计算)"""
+    return len(message["content"].encode("utf-8")) + sum(len(image) for image in message.get("images", ()))
+
+
+def _image_hash(encoded: str) -> str:
+    return hashlib.sha256(encoded.encode("ascii")).hexdigest()
+
+
+class ConversationSession:
+    """
+    保留上下文的多轮对话会话
+
+    - 同一张图片只在第一次出现时附加,后续轮次不再重复发送
+    - 历史超出字节预算时,先移除最早轮次的图片,再移除最早的轮次,一次裁剪到预算的
+      SESSION_TRIM_RATIO以下,使之后若干轮的消息前缀保持不变,服务端可以复用提示词缓存
+    - 会话对象不是线程安全的,同一时刻只能有一轮对话在进行
+    """
+
+    def __init__(
+            self,
+            client: OllamaVisionClient,
+            system_prompt: Optional[str] = None,
+            max_history_bytes: int = DEFAULT_SESSION_MAX_BYTES,
+            max_turns: Optional[int] = None
+    ):
+        """
+        初始化会话
+
+        Args:
+            client: 用于发送请求的客户端
+            system_prompt: 系统提示词(可选),始终位于消息最前面
+            max_history_bytes: 每轮发送的messages总字节数预算
+            max_turns: 保留的最多轮数(可选)
+        """
+        self.client = client
+        self.system_prompt = system_prompt
+        self.max_history_bytes = max_history_bytes
+        self.max_turns = max_turns
+        self._turns: List[_Turn] = []
+        self._naive_history_bytes = 0  # 不做任何去重和裁剪时历史的字节数
+        self.last_turn_stats: Optional[TurnStats] = None
+        self.last_chat_stats: Optional[ChatStats] = None  # 最近一轮完整回复的服务端耗时统计
+
+    @property
+    def turns(self) -> int:
+        """当前保留的轮数"""
+        return len(self._turns)
+
+    @property
+    def messages(self) -> List[Dict[str, Any]]:
+        """当前保留的完整消息列表(含系统提示词)"""
+        messages = [{"role": "system", "content": self.system_prompt}] if self.system_prompt else []
+        for turn in self._turns:
+            messages.extend(turn.messages)
+        return messages
+
+    def reset(self):
+        """清空对话历史"""
+        self._turns.clear()
+        self._naive_history_bytes = 0
+        self.last_turn_stats = None
+        self.last_chat_stats = None
+
+    def _enforce_budget(self, incoming: _Turn, stats: TurnStats):
+        """历史超出预算时按从旧到新的顺序裁剪,一次裁剪到预算的SESSION_TRIM_RATIO以下"""
+        budget = self.max_history_bytes
+        target = int(budget * SESSION_TRIM_RATIO)
+        total = sum(turn.size for turn in self._turns) + incoming.size
+
+        if total > budget:
+            # 先移除旧轮次中的图片,保留文字上下文
+            for turn in self._turns:
+                if total <= target:
+                    break
+                images = turn.user.pop("images", None)
+                if images:
+                    total -= sum(len(image) for image in images)
+                    stats.images_stripped += len(images)
+                    turn.image_hashes = []
+                    turn.user["content"] += f"\n[已省略{len(images)}张图片]"
+
+            # 仍然超出时移除最早的轮次
+            while self._turns and total > target:
+                turn = self._turns.pop(0)
+                total -= turn.size
+                stats.messages_dropped += len(turn.messages)
+
+            if total > budget:
+                logger.warning(f"Conversation turn of {total} bytes exceeds history budget of {budget} bytes")
+
+        if self.max_turns and len(self._turns) + 1 > self.max_turns:
+            keep = max(0, min(self.max_turns - 1, int(self.max_turns * SESSION_TRIM_RATIO)))
+            while len(self._turns) > keep:
+                stats.messages_dropped += len(self._turns.pop(0).messages)
+
+    def send(
+            self,
+            prompt: str,
+            image_paths: Optional[List[Union[str, Path]]] = None,
+            encoded_images: Optional[List[str]] = None,
+            cancel: Optional[CancellationToken] = None
+    ) -> Generator[str, None, None]:
+        """
+        发送一轮对话,回复完整接收后才会加入历史
+
+        Args:
+            prompt: 用户输入的提示词
+            image_paths: 图片文件路径列表(可选)
+            encoded_images: 已经base64编码的图片列表(可选)
+            cancel: 取消令牌,取消后本轮以RequestCancelled结束,不计入上下文
+
+        Raises:
+            APIError: 服务端未发送结束块就结束了输出,本轮不计入上下文
+
+        Returns:
+            生成器,用于获取模型的输出
+        """
+        images = list(encoded_images or [])
+        if image_paths:
+            images.extend(encode_images(image_paths, self.client.image_preprocess_options))
+
+        stats = TurnStats()
+        turn = _Turn(user={"role": "user", "content": prompt})
+        unique = {}
+        for image in images:
+            unique.setdefault(_image_hash(image), image)
+        stats.images_deduplicated = len(images) - len(unique)
+        if unique:
+            turn.user["images"] = list(unique.values())
+            turn.image_hashes = list(unique)
+
+        # 按附带全部图片的大小裁剪历史,再去掉仍保留在历史中的图片
+        self._enforce_budget(turn, stats)
+        known = {h for t in self._turns for h in t.image_hashes}
+        if known.intersection(turn.image_hashes):
+            kept = [(h, image) for h, image in unique.items() if h not in known]
+            stats.images_deduplicated += len(unique) - len(kept)
+            turn.image_hashes = [h for h, _ in kept]
+            if kept:
+                turn.user["images"] = [image for _, image in kept]
+            else:
+                del turn.user["images"]
+
+        messages = self.messages + [turn.user]
+        naive_turn_bytes = _message_bytes({"content": prompt, "images": images})
+        stats.bytes_sent = sum(_message_bytes(m) for m in messages)
+        stats.bytes_saved = max(
+            0,
+            (_message_bytes(messages[0]) if self.system_prompt else 0)
+            + self._naive_history_bytes + naive_turn_bytes - stats.bytes_sent
+        )
+        self.last_turn_stats = stats
+        logger.debug(f"Conversation turn {len(self._turns) + 1}: {stats}")
+
+        self.last_chat_stats = None
+        result = self.client.chat_messages(messages, cancel=cancel)
+        try:
+            yield from result
+        finally:
+            result.close()
+
+        # 回复完整接收后才加入历史,出错或中途停止时本轮不计入上下文
+        if not result.done:
+            raise APIError("回复不完整: 服务端未发送结束块就结束了输出")
+        self.last_chat_stats = result.stats
+        turn.assistant = {"role": "assistant", "content": result.text}
+        self._turns.append(turn)
+        self._naive_history_bytes += naive_turn_bytes + _message_bytes(turn.assistant)
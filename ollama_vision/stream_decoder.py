@@ -0,0 +1,188 @@
+# ollama_vision/stream_decoder.py
+"""api/chat流式响应(NDJSON)解码模块"""
+
+import json
+import logging
+import time
+from dataclasses import dataclass
+from json.decoder import scanstring
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    import orjson
+except ImportError:  # orjson是可选依赖,安装后自动使用
+    orjson = None
+
+from ollama_vision.config import STREAM_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+_loads: Callable[[bytes], Any] = orjson.loads if orjson is not None else json.loads
+
+# Ollama输出的是紧凑JSON,普通的token行可以直接定位content字段,不必解析整行
+_CONTENT_KEY = b'"content":"'
+_ASSISTANT_ROLE = b'"role":"assistant"'
+_NOT_DONE = b'"done":false'
+
+
+@dataclass
+class ChatChunk:
+    """流式响应中解码出的一段输出"""
+    content: str = ""  # 助手回复的文本
+    done: bool = False  # 是否为最后一块
+    data: Optional[Dict[str, Any]] = None  # 最后一块或错误块的完整数据
+    error: Optional[str] = None  # 服务端在流中返回的错误信息
+
+
+class NDJSONChatDecoder:
+    """
+    增量式api/chat流解码器
+
+    可以喂入任意切分的字节块,内部处理跨块的半行数据。可选地把细碎的token
+    合并成较大的文本块,减少调用方(如GUI)逐token处理的开销。
+    """
+
+    def __init__(self, coalesce_chars: int = 0, coalesce_interval: float = 0.0):
+        """
+        初始化解码器
+
+        Args:
+            coalesce_chars: 合并输出的最少字符数,为0时每个token单独输出
+            coalesce_interval: 合并等待的最长时间(秒),超过后即使字符数不足也输出
+        """
+        self.coalesce_chars = coalesce_chars
+        self.coalesce_interval = coalesce_interval
+        self.malformed_lines = 0
+        self._buffer = b""
+        self._pending: List[str] = []
+        self._pending_chars = 0
+        self._pending_since = 0.0
+
+    def _decode_line(self, line: bytes) -> Optional[ChatChunk]:
+        """解码一行,无法解析时返回None"""
+        # 快速路径: 普通token行只取出message.content
+        if _NOT_DONE in line and _ASSISTANT_ROLE in line:
+            start = line.find(_CONTENT_KEY)
+            if start >= 0:
+                try:
+                    return ChatChunk(content=scanstring(line.decode("utf-8"), start + len(_CONTENT_KEY))[0])
+                except (ValueError, UnicodeDecodeError):
+                    pass
+
+        try:
+            data = _loads(line)
+        except ValueError:
+            self.malformed_lines += 1
+            logger.debug(f"Skipped malformed stream line: {line[:200]!r}")
+            return None
+        if not isinstance(data, dict):
+            self.malformed_lines += 1
+            return None
+
+        if "error" in data:
+            return ChatChunk(done=True, data=data, error=str(data["error"]))
+
+        content = ""
+        message = data.get("message")
+        if message and message.get("role") == "assistant":
+            content = message.get("content") or ""
+        done = bool(data.get("done"))
+        return ChatChunk(content=content, done=done, data=data if done else None)
+
+    def _take_pending(self) -> Optional[ChatChunk]:
+        if not self._pending:
+            return None
+        chunk = ChatChunk(content="".join(self._pending))
+        self._pending.clear()
+        self._pending_chars = 0
+        return chunk
+
+    def feed(self, data: bytes) -> List[ChatChunk]:
+        """
+        喂入一段原始字节,返回其中完整行解码出的输出块
+
+        Args:
+            data: 从响应中读取的字节
+
+        Returns:
+            输出块列表,可能为空
+        """
+        buffer = self._buffer + data if self._buffer else data
+        lines = buffer.split(b"\n")
+        self._buffer = lines.pop()
+
+        chunks = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            chunk = self._decode_line(line)
+            if chunk is None:
+                continue
+            if self.coalesce_chars <= 0:
+                if chunk.content or chunk.done:
+                    chunks.append(chunk)
+                continue
+
+            if chunk.content:
+                if not self._pending:
+                    self._pending_since = time.monotonic()
+                self._pending.append(chunk.content)
+                self._pending_chars += len(chunk.content)
+            if chunk.done:
+                # 结束块之前先输出积累的文本
+                pending = self._take_pending()
+                if pending:
+                    chunks.append(pending)
+                chunk.content = ""
+                chunks.append(chunk)
+
+        if self._pending and (
+                self._pending_chars >= self.coalesce_chars
+                or time.monotonic() - self._pending_since >= self.coalesce_interval > 0
+        ):
+            chunks.append(self._take_pending())
+        return chunks
+
+    def flush(self) -> List[ChatChunk]:
+        """流结束时输出剩余的半行和尚未合并输出的文本"""
+        line, self._buffer = self._buffer.strip(), b""
+        tail = self._decode_line(line) if line else None
+        if tail is not None and tail.content:
+            self._pending.append(tail.content)
+            tail.content = ""
+
+        chunks = []
+        pending = self._take_pending()
+        if pending:
+            chunks.append(pending)
+        if tail is not None and tail.done:
+            chunks.append(tail)
+        return chunks
+
+
+def iter_chat_stream(
+        response,
+        chunk_size: int = STREAM_CHUNK_SIZE,
+        coalesce_chars: int = 0,
+        coalesce_interval: float = 0.0
+) -> Iterator[ChatChunk]:
+    """
+    解码requests流式响应
+
+    Args:
+        response: stream=True的requests响应对象
+        chunk_size: 每次读取的最大字节数
+        coalesce_chars: 合并输出的最少字符数,为0时每个token单独输出
+        coalesce_interval: 合并等待的最长时间(秒)
+
+    Returns:
+        生成器,逐个产出ChatChunk
+    """
+    decoder = NDJSONChatDecoder(coalesce_chars, coalesce_interval)
+    for data in response.iter_content(chunk_size=chunk_size):
+        yield from decoder.feed(data)
+    yield from decoder.flush()
+    if decoder.malformed_lines:
+        logger.warning(f"Skipped {decoder.malformed_lines} malformed lines in chat stream")